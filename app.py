@@ -1,9 +1,12 @@
 from flask import Flask, render_template, session, redirect, url_for, flash, request, send_from_directory
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import uuid
 import os
 import sqlite3
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils.alert_engine import PositionAlertEngine, channels_from_flags
+from utils.notifications import NotificationManager
 
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 DB_PATH = os.path.join(APP_ROOT, 'users.db')
@@ -91,6 +94,38 @@ def init_db():
         )
     """)
 
+    # Per-business rating aggregate, kept current by triggers on feedback
+    has_ratings = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'business_ratings'"
+    ).fetchone()
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS business_ratings (
+            business_id INTEGER PRIMARY KEY,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    if not has_ratings:
+        cur.execute("""
+            INSERT INTO business_ratings (business_id, rating_count, rating_sum)
+            SELECT business_id, COUNT(*), SUM(rating)
+            FROM feedback
+            WHERE rating BETWEEN 1 AND 5
+            GROUP BY business_id
+        """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_feedback_rating_insert
+        AFTER INSERT ON feedback
+        WHEN NEW.rating BETWEEN 1 AND 5
+        BEGIN
+            INSERT INTO business_ratings (business_id, rating_count, rating_sum)
+            VALUES (NEW.business_id, 1, NEW.rating)
+            ON CONFLICT(business_id) DO UPDATE SET
+                rating_count = rating_count + 1,
+                rating_sum = rating_sum + NEW.rating;
+        END
+    """)
+
     conn.commit()
     conn.close()
 
@@ -144,9 +179,16 @@ class Ticket:
         self.alerts_sent = False
 
 class Queue:
-    def __init__(self):
+    # The in-memory queue is a single line shared by every queue id
+    ALERT_QUEUE_KEY = 'default'
+
+    def __init__(self, notification_manager=None):
         self.tickets = {}
         self.position_counter = 0
+        self.notification_manager = notification_manager or NotificationManager()
+        self.alert_engine = PositionAlertEngine(self.send_alert)
+        # Email delivery must not hold up the request that moved the queue
+        self.alert_executor = ThreadPoolExecutor(max_workers=2)
     
     def join_queue(self, email=None):
         if 'ticket_id' in session and session['ticket_id'] in self.tickets:
@@ -157,6 +199,7 @@ class Queue:
         ticket.email = email
         ticket.eta = self.calculate_eta(ticket.position)
         self.tickets[ticket_id] = ticket
+        self.alert_engine.ticket_joined(self.ALERT_QUEUE_KEY, ticket_id)
         return ticket
 
     def leave_queue(self, ticket_id):
@@ -164,6 +207,7 @@ class Queue:
             removed_position = self.tickets[ticket_id].position
             del self.tickets[ticket_id]
             self.recalculate_positions(removed_position)
+            self.alert_engine.ticket_left(self.ALERT_QUEUE_KEY, ticket_id)
             return True
         return False
     
@@ -182,27 +226,46 @@ class Queue:
                 ticket.position -= 1
                 ticket.eta = self.calculate_eta(ticket.position)
 
-    def update_alerts(self, ticket_id, enabled, threshold, channels):
+    def update_alerts(self, ticket_id, enabled, threshold, channels, flags=None, phone=None):
+        """
+        `channels` come from the ticket page; `flags` may carry ticket-service's
+        alert_email/alert_sms/alert_push flags, which add their channels.
+        """
         if ticket_id in self.tickets:
             ticket = self.tickets[ticket_id]
+            channels = list(dict.fromkeys(list(channels) + channels_from_flags(flags or {})))
             ticket.alerts_enabled = enabled
             ticket.alert_threshold = threshold
             ticket.alert_channels = channels
+            ticket.alerts_sent = False
+            if enabled:
+                self.alert_engine.subscribe(self.ALERT_QUEUE_KEY, ticket_id, threshold,
+                                            channels, email=ticket.email, phone=phone)
+            else:
+                self.alert_engine.unsubscribe(self.ALERT_QUEUE_KEY, ticket_id)
             return True
         return False
 
-    def check_and_send_alerts(self):
-        for ticket in self.tickets.values():
-            if (ticket.alerts_enabled and 
-                ticket.position <= ticket.alert_threshold and 
-                not ticket.alerts_sent):
-                self.send_alert(ticket)
-                ticket.alerts_sent = True
-
-    def send_alert(self, ticket):
+    def send_alert(self, subscription):
+        ticket = self.tickets.get(subscription.ticket_id)
+        if not ticket:
+            return
+        ticket.alerts_sent = True
         message = f"Your turn is approaching! You are position #{ticket.position} in the queue."
-        # implement browser/email alerts if needed
-        pass
+
+        if 'email' in subscription.channels and ticket.email:
+            self.alert_executor.submit(self.notification_manager.send_email,
+                                       ticket.email, 'Queue Update', message)
+        if 'sms' in subscription.channels:
+            phone = subscription.contact.get('phone')
+            if phone:
+                self.alert_executor.submit(self.notification_manager.send_sms, phone, message)
+            else:
+                print(f"SMS alert skipped: no phone number for ticket {ticket.id}")
+        if 'browser' in subscription.channels or 'push' in subscription.channels:
+            ticket.browser_notification = self.notification_manager.send_browser_notification(
+                {'position': ticket.position}
+            )
 
 queue = Queue()
 
@@ -281,23 +344,9 @@ def businesses_list():
     if not require_login():
         return redirect(url_for('login'))
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    # Get all businesses with their active queues
-    cur.execute("""
-        SELECT b.id, b.name, b.description, b.category, b.address,
-               COUNT(DISTINCT q.id) as queue_count
-        FROM businesses b
-        LEFT JOIN queues q ON b.id = q.business_id AND q.is_active = 1
-        GROUP BY b.id
-    """)
-    businesses = [{'id': row[0], 'name': row[1], 'description': row[2],
-                   'category': row[3], 'address': row[4], 'queue_count': row[5]}
-                  for row in cur.fetchall()]
-
-    conn.close()
-    return render_template('businesses_list.html', businesses=businesses)
+    # The page fetches the directory itself, a page at a time, from
+    # /api/businesses as the user scrolls
+    return render_template('businesses_list.html')
 
 @app.route('/join-queue/<int:queue_id>')
 def join_queue_by_id(queue_id):
@@ -414,7 +463,9 @@ def show_ticket():
         'eta': ticket.eta,
         'alerts_enabled': ticket.alerts_enabled,
         'alert_threshold': ticket.alert_threshold,
-        'alert_channels': ticket.alert_channels
+        'alert_channels': ticket.alert_channels,
+        'alerts_sent': ticket.alerts_sent,
+        'notification': getattr(ticket, 'browser_notification', None)
     }
     return render_template('ticket.html', ticket=ticket_data)
 
@@ -429,8 +480,9 @@ def update_alerts():
     enabled = request.form.get('enabled') == 'true'
     threshold = int(request.form.get('threshold', 3))
     channels = request.form.getlist('channels')
+    phone = request.form.get('phone', '').strip() or None
 
-    if queue.update_alerts(ticket_id, enabled, threshold, channels):
+    if queue.update_alerts(ticket_id, enabled, threshold, channels, flags=request.form, phone=phone):
         flash('Alert preferences updated successfully', 'success')
     else:
         flash('Failed to update alert preferences', 'error')
@@ -727,8 +779,11 @@ def view_feedback(business_id):
                       'created_at': row[3], 'user_name': row[4]}
                      for row in cur.fetchall()]
 
-    # Calculate average rating
-    avg_rating = sum(f['rating'] for f in feedback_list) / len(feedback_list) if feedback_list else 0
+    # Average rating from the maintained aggregate row
+    cur.execute("SELECT rating_count, rating_sum FROM business_ratings WHERE business_id = ?",
+                (business_id,))
+    ratings = cur.fetchone()
+    avg_rating = ratings[1] / ratings[0] if ratings and ratings[0] else 0
 
     conn.close()
     return render_template('feedback_list.html', feedback=feedback_list,
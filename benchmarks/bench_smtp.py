@@ -0,0 +1,120 @@
+"""
+Benchmark for pooled SMTP delivery in NotificationManager.
+
+Starts a local SMTP stand-in that accepts and discards mail, then sends the
+same batch once with a new connection per message (the old behaviour) and
+once through NotificationManager.send_bulk_email. The stand-in can delay its
+greeting to model the network round trips, STARTTLS and login a real
+provider costs on every new connection.
+
+    python benchmarks/bench_smtp.py [--messages 500] [--connect-latency 0.2]
+"""
+import argparse
+import os
+import smtplib
+import socketserver
+import sys
+import threading
+import time
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.notifications import NotificationManager
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts every message and drops it"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        time.sleep(self.server.connect_latency)
+        self.reply("220 stand-in ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply("250 stand-in")
+            elif command == 'DATA':
+                self.reply("354 end with <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                    pass
+                with self.server.lock:
+                    self.server.received += 1
+                self.reply("250 queued")
+            elif command == 'QUIT':
+                self.reply("221 bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self.reply("250 ok")
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, connect_latency):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.connect_latency = connect_latency
+        self.received = 0
+        self.lock = threading.Lock()
+
+
+def send_unpooled(port, emails):
+    for to_email, subject, message in emails:
+        msg = MIMEText(message)
+        msg['Subject'] = subject
+        msg['From'] = 'bench@nexturn.local'
+        msg['To'] = to_email
+        with smtplib.SMTP('127.0.0.1', port) as server:
+            server.send_message(msg)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--connect-latency', type=float, default=0.2,
+                        help='seconds the stand-in waits before greeting each connection')
+    parser.add_argument('--pool-size', type=int, default=4)
+    args = parser.parse_args()
+
+    server = StandInSMTPServer(args.connect_latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    emails = [(f"user{i}@example.com", "Queue update", "You are next in line!")
+              for i in range(args.messages)]
+
+    # Per-message connections get slow quickly; a sample is enough for a rate
+    sample = emails[:min(len(emails), 20)]
+    start = time.perf_counter()
+    send_unpooled(port, sample)
+    unpooled_rate = len(sample) / (time.perf_counter() - start)
+
+    manager = NotificationManager({
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': port,
+        'SMTP_USERNAME': '',
+        'SMTP_PASSWORD': '',
+        'SMTP_FROM': 'bench@nexturn.local',
+        'SMTP_USE_TLS': False,
+        'SMTP_POOL_SIZE': args.pool_size,
+    })
+    start = time.perf_counter()
+    results = manager.send_bulk_email(emails)
+    pooled_rate = len(emails) / (time.perf_counter() - start)
+    manager.close()
+
+    print(f"connect latency {args.connect_latency * 1000:.0f} ms, pool size {args.pool_size}")
+    print(f"  connection per message: {unpooled_rate:10,.1f} msg/s ({len(sample)} messages)")
+    print(f"  pooled bulk send:       {pooled_rate:10,.1f} msg/s ({sum(results)}/{len(emails)} delivered)")
+
+    server.shutdown()
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
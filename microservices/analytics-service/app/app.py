@@ -4,21 +4,35 @@ import os
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from models import Analytics
+from feed import HistoryFeed
 from routes import init_routes
 from db.init_db import init_database
+from metrics import instrument
+from tracing import trace_app
 
 DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '../db/analytics.db'))
 PORT = int(os.getenv('ANALYTICS_SERVICE_PORT', 5006))
+QUEUE_SERVICE_URL = os.getenv('QUEUE_SERVICE_URL', '')
+HISTORY_SYNC_INTERVAL = float(os.getenv('ANALYTICS_HISTORY_SYNC_INTERVAL', 60))
 
 app = Flask(__name__)
 CORS(app)
+instrument(app)
+trace_app(app, 'analytics-service')
 
 init_database(DB_PATH)
 
 analytics_model = Analytics(DB_PATH)
-analytics_bp = init_routes(analytics_model)
+# Served tickets are pulled from queue-service on demand; without it the
+# forecast only works with an explicit avg_service_time
+history_feed = (
+    HistoryFeed(analytics_model, QUEUE_SERVICE_URL, interval=HISTORY_SYNC_INTERVAL)
+    if QUEUE_SERVICE_URL else None
+)
+analytics_bp = init_routes(analytics_model, history_feed)
 app.register_blueprint(analytics_bp, url_prefix='/')
 
 @app.route('/')
@@ -0,0 +1,58 @@
+"""
+Benchmark for the Monte Carlo queue simulator.
+
+Simulates 10,000 trajectories of a 200-person queue and fails if the median
+run takes longer than the one-second budget.
+
+    python benchmarks/bench_simulator.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from simulator import QueueSimulator
+
+TRAJECTORIES = 10000
+QUEUE_LENGTH = 200
+BUDGET_SECONDS = 1.0
+RUNS = 5
+
+
+def bench(simulator, **kwargs):
+    timings = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        simulator.simulate(QUEUE_LENGTH, trajectories=TRAJECTORIES, **kwargs)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main():
+    rng = np.random.default_rng(42)
+    simulator = QueueSimulator(
+        service_times=rng.gamma(2.0, 150.0, size=5000),
+        inter_arrivals=rng.exponential(240.0, size=5000),
+        seed=42,
+    )
+
+    cases = [
+        ("1 counter", {"servers": 1}),
+        ("2 counters", {"servers": 2}),
+        ("2 counters + 50 arrivals", {"servers": 2, "arrivals": 50}),
+    ]
+    failed = False
+    print(f"{TRAJECTORIES} trajectories x {QUEUE_LENGTH} customers, median of {RUNS} runs")
+    for label, kwargs in cases:
+        elapsed = bench(simulator, **kwargs)
+        ok = elapsed < BUDGET_SECONDS
+        failed = failed or not ok
+        print(f"  {label:<28} {elapsed * 1000:8.1f} ms  {'ok' if ok else 'OVER BUDGET'}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,9 @@
 import os
 import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
+from database import enable_wal
 
 DB_FILENAME = "analytics.db"
 
@@ -18,6 +22,8 @@ def init_database(db_path=None):
     conn = sqlite3.connect(db_path)
     cur = conn.cursor()
 
+    enable_wal(conn)
+
     # Very simple queue_history table for analytics demo
     cur.execute(
         """
@@ -26,11 +32,35 @@ def init_database(db_path=None):
             queue_id INTEGER NOT NULL,
             business_id INTEGER NOT NULL,
             wait_time_seconds REAL NOT NULL,
+            service_time_seconds REAL,
+            ticket_id TEXT,
+            left_at TIMESTAMP,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """
     )
 
+    # Older databases predate the service-time column used by the simulator
+    # and the columns the queue-service sync keys on
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(queue_history)")]
+    for name, decl in (
+        ("service_time_seconds", "REAL"),
+        ("ticket_id", "TEXT"),
+        ("left_at", "TIMESTAMP"),
+    ):
+        if name not in columns:
+            cur.execute(f"ALTER TABLE queue_history ADD COLUMN {name} {decl}")
+
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_history_queue_created ON queue_history(queue_id, created_at)"
+    )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_history_ticket ON queue_history(ticket_id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_history_queue_left ON queue_history(queue_id, left_at)"
+    )
+
     conn.commit()
     conn.close()
     print(f"[analytics-service] DB initialized at {db_path}")
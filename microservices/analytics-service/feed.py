@@ -0,0 +1,71 @@
+"""
+Served-ticket history pulled from queue-service
+"""
+import threading
+import time
+
+import requests
+
+from tracing import TracedSession
+
+
+class HistoryFeed:
+    """
+    Keeps the local queue_history table in step with queue-service.
+
+    queue-service owns the tickets; analytics only sees them through
+    GET /api/queues/<id>/history. sync(queue_id) runs on the request path
+    (traced like any other inter-service call) and pulls one page: the
+    tickets served since the last one stored, or the newest `page` on the
+    first sync. It runs at most once every `interval` seconds per queue and
+    worker, except that after a full page the next request pulls again, so
+    a backlog is caught up a page at a time without one request waiting on
+    all of it. If queue-service is unreachable, the samples already stored
+    are used.
+    """
+
+    def __init__(self, analytics_model, queue_service_url, interval=60.0, page=1000,
+                 timeout=5):
+        self.analytics_model = analytics_model
+        self.queue_service_url = queue_service_url.rstrip('/')
+        self.interval = interval
+        self.page = page
+        self.timeout = timeout
+        self.session = TracedSession()
+
+        self._synced_at = {}  # queue_id -> time.monotonic() of the last sync
+        self._lock = threading.Lock()
+
+    def sync(self, queue_id):
+        """Pull a page of new served tickets for a queue if due; returns the number stored"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._synced_at.get(queue_id, float('-inf')) < self.interval:
+                return 0
+            self._synced_at[queue_id] = now
+
+        since = self.analytics_model.get_last_synced(queue_id)
+        params = {'limit': self.page}
+        if since is not None:
+            params['since'] = since
+        try:
+            response = self.session.get(
+                f"{self.queue_service_url}/api/queues/{queue_id}/history",
+                params=params, timeout=self.timeout
+            )
+            if response.status_code == 404:
+                return 0
+            response.raise_for_status()
+            data = response.json()['data']
+        except (requests.RequestException, ValueError, KeyError) as e:
+            print(f"[analytics-service] history sync for queue {queue_id} failed: {e}")
+            return 0
+
+        tickets = data['tickets']
+        added = self.analytics_model.add_history(queue_id, data['business_id'], tickets)
+        # Pages overlap on the last leave_time (since is inclusive); a full page
+        # that still added tickets means there is more to pull
+        if len(tickets) >= self.page and added:
+            with self._lock:
+                self._synced_at.pop(queue_id, None)
+        return added
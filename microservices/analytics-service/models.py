@@ -68,3 +68,60 @@ class Analytics:
         row = cur.fetchone()
         conn.close()
         return dict(row) if row else {}
+
+    def get_last_synced(self, queue_id: int):
+        """leave_time of the latest ticket synced from queue-service, or None"""
+        conn = self._get_conn()
+        row = conn.execute(
+            "SELECT MAX(left_at) AS left_at FROM queue_history WHERE queue_id = ?",
+            (queue_id,),
+        ).fetchone()
+        conn.close()
+        return row["left_at"]
+
+    def add_history(self, queue_id: int, business_id: int, tickets):
+        """
+        Store served tickets from queue-service (see HistoryFeed); tickets
+        already stored are skipped. Returns the number added.
+        """
+        conn = self._get_conn()
+        cur = conn.executemany(
+            """
+            INSERT OR IGNORE INTO queue_history
+                (queue_id, business_id, ticket_id, wait_time_seconds,
+                 service_time_seconds, created_at, left_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            [(queue_id, business_id, t["ticket_id"], t["wait_seconds"], t["service_seconds"],
+              t["join_time"], t["leave_time"]) for t in tickets],
+        )
+        conn.commit()
+        added = cur.rowcount
+        conn.close()
+        return added
+
+    def get_simulation_samples(self, queue_id: int, limit: int = 5000):
+        """
+        Empirical (inter_arrivals, service_times) in seconds for the most
+        recent `limit` tickets of a queue, for the queue simulator.
+        """
+        conn = self._get_conn()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT strftime('%s', created_at) AS arrived_at, service_time_seconds
+            FROM queue_history
+            WHERE queue_id = ?
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            (queue_id, limit),
+        )
+        rows = cur.fetchall()
+        conn.close()
+
+        arrived = sorted(int(r["arrived_at"]) for r in rows if r["arrived_at"] is not None)
+        inter_arrivals = [b - a for a, b in zip(arrived, arrived[1:])]
+        service_times = [r["service_time_seconds"] for r in rows
+                         if r["service_time_seconds"] is not None]
+        return inter_arrivals, service_times
@@ -1,7 +1,14 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, request, jsonify
 
+from simulator import QueueSimulator
 
-def init_routes(analytics_model):
+MAX_TRAJECTORIES = 50000
+MAX_POSITION = 5000
+MAX_SERVERS = 100
+MAX_SERVER_COUNTS = 4
+
+
+def init_routes(analytics_model, history_feed=None):
     bp = Blueprint("analytics_bp", __name__)
 
     @bp.route("/health", methods=["GET"])
@@ -11,9 +18,53 @@ def init_routes(analytics_model):
     # GET /analytics/queue/{queueId}
     @bp.route("/analytics/queue/<int:queue_id>", methods=["GET"])
     def queue_analytics(queue_id):
+        if history_feed is not None:
+            history_feed.sync(queue_id)
         data = analytics_model.get_queue_analytics(queue_id)
         return jsonify(data), 200
 
+    # GET /analytics/queue/{queueId}/forecast?position=&servers=1,2
+    @bp.route("/analytics/queue/<int:queue_id>/forecast", methods=["GET"])
+    def queue_forecast(queue_id):
+        position = request.args.get("position", type=int)
+        trajectories = request.args.get(
+            "trajectories", QueueSimulator.DEFAULT_TRAJECTORIES, type=int
+        )
+        avg_service_time = request.args.get("avg_service_time", type=float)
+        try:
+            server_counts = [int(s) for s in request.args.get("servers", "1").split(",")]
+        except ValueError:
+            return jsonify({"error": "servers must be a comma-separated list of integers"}), 400
+
+        if not position or not 1 <= position <= MAX_POSITION:
+            return jsonify({"error": f"position must be between 1 and {MAX_POSITION}"}), 400
+        if not 1 <= trajectories <= MAX_TRAJECTORIES:
+            return jsonify({"error": f"trajectories must be between 1 and {MAX_TRAJECTORIES}"}), 400
+        if not 1 <= len(server_counts) <= MAX_SERVER_COUNTS:
+            return jsonify({"error": f"servers takes at most {MAX_SERVER_COUNTS} values"}), 400
+        if any(not 1 <= s <= MAX_SERVERS for s in server_counts):
+            return jsonify({"error": f"servers must be between 1 and {MAX_SERVERS}"}), 400
+
+        if history_feed is not None:
+            history_feed.sync(queue_id)
+        inter_arrivals, service_times = analytics_model.get_simulation_samples(queue_id)
+        if service_times:
+            simulator = QueueSimulator(service_times, inter_arrivals)
+        elif avg_service_time:
+            # No history yet: use the configured average (minutes, as in queue-service)
+            simulator = QueueSimulator.from_average(avg_service_time * 60, inter_arrivals)
+        else:
+            return jsonify({"error": "No service-time history for this queue"}), 404
+
+        forecasts = simulator.compare_servers(position, server_counts, trajectories)
+        return jsonify({
+            "queue_id": queue_id,
+            "position": position,
+            "trajectories": trajectories,
+            "samples": int(simulator.service_times.size),
+            "forecasts": {str(servers): stats for servers, stats in forecasts.items()},
+        }), 200
+
     # GET /analytics/business/{businessId}
     @bp.route("/analytics/business/<int:business_id>", methods=["GET"])
     def business_analytics(business_id):
@@ -8,24 +8,54 @@ import sys
 
 # Add parent directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from models import User
+from hashing import PasswordHasher
+from user_cache import UserCache
 from routes import init_routes
 from db.init_db import init_database
+from metrics import instrument
+from tracing import trace_app
+from query_profile import profile_app
+from serving import cpu_limit, web_workers
 
 # Configuration
 DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '../db/auth.db'))
 PORT = int(os.getenv('AUTH_SERVICE_PORT', 5001))
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+# Every server worker has its own hashing pool; together they fill the CPU limit
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS') or
+                            max(1, round(cpu_limit() / web_workers())))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0)) or None
+PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 300))
+USER_CACHE_WARMUP = int(os.getenv('USER_CACHE_WARMUP', 1000))
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
+instrument(app)
+trace_app(app, 'auth-service')
+profile_app(app)
 
 # Initialize database
 init_database(DB_PATH)
 
-# Initialize user model
-user_model = User(DB_PATH)
+# Initialize user model; password hashing runs in its own process pool
+hasher = PasswordHasher(
+    method=PASSWORD_HASH_METHOD,
+    salt_length=PASSWORD_SALT_LENGTH,
+    workers=PASSWORD_HASH_WORKERS,
+    max_pending=PASSWORD_HASH_MAX_PENDING,
+    timeout=PASSWORD_HASH_TIMEOUT
+)
+user_cache = UserCache(max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+user_model = User(DB_PATH, hasher, user_cache)
+if USER_CACHE_WARMUP:
+    user_model.warm_cache(min(USER_CACHE_WARMUP, USER_CACHE_SIZE))
 
 # Register routes
 auth_routes = init_routes(user_model)
@@ -44,7 +74,9 @@ def index():
             'signup': '/auth/signup',
             'login': '/auth/login',
             'verify': '/auth/verify',
-            'profile': '/auth/profile'
+            'profile': '/auth/profile',
+            'users': '/auth/users?ids=1,2',
+            'cache_stats': '/auth/cache/stats'
         }
     }
 
@@ -0,0 +1,117 @@
+"""
+Password hashing off the request thread
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing pool is saturated and a request is turned away"""
+
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _verify(stored_hash, password, method, salt_length, policy):
+    """
+    Check a password and, if it matches a hash made under an older policy,
+    return a replacement hash in the same round trip.
+    """
+    if not check_password_hash(stored_hash, password):
+        return False, None
+    if needs_rehash(stored_hash, policy, salt_length):
+        return True, _hash(password, method, salt_length)
+    return True, None
+
+
+def needs_rehash(stored_hash, policy, salt_length):
+    """True if a stored hash was made with other parameters than `policy`"""
+    parts = stored_hash.split('$')
+    return len(parts) != 3 or parts[0] != policy or len(parts[1]) != salt_length
+
+
+class PasswordHasher:
+    """
+    Runs werkzeug password hashing in a bounded process pool.
+
+    Hashing is deliberately CPU-expensive, so doing it on the Flask request
+    thread lets a login surge starve every other request of the worker (and
+    holds the GIL while it does). Here at most `max_pending` hash jobs may be
+    queued or running; beyond that callers get HasherBusy immediately instead
+    of waiting behind the backlog. `workers=0` hashes inline, which is only
+    meant for tools and benchmarks.
+
+    `method` and `salt_length` are the current cost policy. Hashes made under
+    a different policy are replaced transparently on the next good login.
+
+    Pool processes come from a forkserver rather than a fork of the server
+    worker: that worker runs other threads (request threads, the metrics
+    flush), and a fork taken while one of them holds a lock can deadlock.
+    """
+
+    def __init__(self, method='scrypt', salt_length=16, workers=None,
+                 max_pending=None, timeout=10.0):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 4
+        self.timeout = timeout
+
+        # Parameter prefix this policy writes, e.g. "scrypt:32768:8:1"
+        self.policy = _hash('', method, salt_length).split('$')[0]
+
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise HasherBusy('password hashing queue is full')
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('forkserver')
+                )
+            executor = self._executor
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HasherBusy('password hashing timed out')
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored_hash, password):
+        """
+        Returns (ok, new_hash). new_hash is set when the password matched but
+        the stored hash should be replaced because the policy changed.
+        """
+        return self._run(_verify, stored_hash, password, self.method,
+                         self.salt_length, self.policy)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -1,30 +1,42 @@
 """
 User model for authentication service
 """
-from werkzeug.security import generate_password_hash, check_password_hash
 import sys
 import os
 
 # Add shared directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 from database import Database
+from changes import ChangeFeed
+from hashing import PasswordHasher
+from user_cache import UserCache
+
+# Everything about a user except secrets; this is what gets cached
+PROFILE_COLUMNS = "id, full_name, email, organization, user_type, created_at"
 
 
 class User:
     """User model"""
 
-    def __init__(self, db_path):
+    def __init__(self, db_path, hasher=None, cache=None):
         self.db = Database(db_path)
+        self.hasher = hasher or PasswordHasher()
+        self.cache = cache or UserCache()
+        # Edits made by other worker processes, which have their own caches
+        self.changes = ChangeFeed(self.db, 'user_changes', 'user_id')
+
+    def _sync_cache(self):
+        for user_id in self.changes.poll():
+            self.cache.invalidate(user_id)
 
     def create_user(self, full_name, email, password, organization=None):
         """Create a new user"""
         # Check if user already exists
-        existing_user = self.get_user_by_email(email)
-        if existing_user:
+        if self.db.execute_query("SELECT 1 FROM users WHERE email = ?", (email,)):
             return None, 'Email already registered'
 
-        # Hash password
-        password_hash = generate_password_hash(password)
+        # Hash password (may raise HasherBusy when the hashing pool is saturated)
+        password_hash = self.hasher.hash(password)
 
         # Insert user
         query = """
@@ -33,12 +45,13 @@ class User:
         """
         try:
             user_id = self.db.execute_insert(query, (full_name, email, password_hash, organization))
+            self.cache.invalidate(user_id)
             return user_id, None
         except Exception as e:
             return None, str(e)
 
     def get_user_by_email(self, email):
-        """Get user by email"""
+        """Get user by email, password hash included (never cached)"""
         query = "SELECT * FROM users WHERE email = ?"
         results = self.db.execute_query(query, (email,))
         if results:
@@ -46,22 +59,68 @@ class User:
         return None
 
     def get_user_by_id(self, user_id):
-        """Get user by ID"""
-        query = "SELECT * FROM users WHERE id = ?"
+        """Get user profile by ID (no password hash), served from cache when warm"""
+        self._sync_cache()
+        user = self.cache.get_by_id(user_id)
+        if user is not None:
+            return user
+        query = f"SELECT {PROFILE_COLUMNS} FROM users WHERE id = ?"
         results = self.db.execute_query(query, (user_id,))
         if results:
             user = dict(results[0])
-            # Remove password hash from response
-            user.pop('password_hash', None)
+            self.cache.put(user)
             return user
         return None
 
+    def get_users_by_ids(self, user_ids):
+        """Get many profiles at once; cache misses are loaded with one query"""
+        self._sync_cache()
+        users = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            user = self.cache.get_by_id(user_id)
+            if user is not None:
+                users[user_id] = user
+            else:
+                missing.append(user_id)
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            query = (f"SELECT {PROFILE_COLUMNS} FROM users "
+                     f"WHERE id IN ({', '.join('?' * len(chunk))})")
+            for row in self.db.execute_query(query, tuple(chunk)):
+                user = dict(row)
+                self.cache.put(user)
+                users[user['id']] = user
+        return users
+
+    def warm_cache(self, limit=1000):
+        """Preload the most recently created profiles; returns how many"""
+        self.changes.mark_current()
+        query = f"SELECT {PROFILE_COLUMNS} FROM users ORDER BY id DESC LIMIT ?"
+        profiles = [dict(row) for row in self.db.execute_query(query, (limit,))]
+        self.cache.put_many(profiles)
+        return len(profiles)
+
     def verify_password(self, email, password):
-        """Verify user password"""
+        """
+        Verify user password. A hash made under an older cost policy is
+        replaced on success. May raise HasherBusy.
+        """
         user = self.get_user_by_email(email)
-        if user and check_password_hash(user['password_hash'], password):
-            return user
-        return None
+        if not user:
+            return None
+        ok, new_hash = self.hasher.verify(user['password_hash'], password)
+        if not ok:
+            return None
+        if new_hash:
+            try:
+                self.db.execute_update(
+                    "UPDATE users SET password_hash = ? WHERE id = ?", (new_hash, user['id'])
+                )
+                user['password_hash'] = new_hash
+            except Exception as e:
+                print(f"Warning: could not upgrade password hash for user {user['id']}: {e}")
+        return user
 
     def update_user(self, user_id, **kwargs):
         """Update user information"""
@@ -82,6 +141,7 @@ class User:
 
         try:
             self.db.execute_update(query, tuple(values))
+            self.cache.invalidate(user_id)
             return True
         except Exception:
             return False
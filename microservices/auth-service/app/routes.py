@@ -9,6 +9,7 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 from response import success_response, error_response, validation_error
 from auth_middleware import generate_token, token_required
+from hashing import HasherBusy
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -16,6 +17,12 @@ auth_bp = Blueprint('auth', __name__)
 def init_routes(user_model):
     """Initialize routes with user model"""
 
+    def busy_response():
+        """Shed load quickly instead of queueing behind a saturated hasher"""
+        response, status_code = error_response('Server is busy, please try again shortly', 503)
+        response.headers['Retry-After'] = '1'
+        return response, status_code
+
     @auth_bp.route('/health', methods=['GET'])
     def health():
         """Health check endpoint"""
@@ -42,12 +49,15 @@ def init_routes(user_model):
             return error_response('Passwords do not match', 400)
 
         # Create user
-        user_id, error = user_model.create_user(
-            full_name=data['full_name'],
-            email=data['email'].lower().strip(),
-            password=data['password'],
-            organization=data.get('organization', '')
-        )
+        try:
+            user_id, error = user_model.create_user(
+                full_name=data['full_name'],
+                email=data['email'].lower().strip(),
+                password=data['password'],
+                organization=data.get('organization', '')
+            )
+        except HasherBusy:
+            return busy_response()
 
         if error:
             return error_response(error, 400)
@@ -71,7 +81,10 @@ def init_routes(user_model):
             return error_response('Email and password are required', 400)
 
         # Verify credentials
-        user = user_model.verify_password(email, password)
+        try:
+            user = user_model.verify_password(email, password)
+        except HasherBusy:
+            return busy_response()
         if not user:
             return error_response('Invalid email or password', 401)
 
@@ -116,6 +129,30 @@ def init_routes(user_model):
 
         return success_response(data={'user': user})
 
+    @auth_bp.route('/users', methods=['GET'])
+    @token_required
+    def get_users():
+        """Resolve many user ids to public profiles (?ids=1,2,3)"""
+        try:
+            user_ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+        except ValueError:
+            return validation_error({'ids': 'Comma-separated list of user ids'})
+        if len(user_ids) > 500:
+            return error_response('At most 500 ids per request', 400)
+
+        users = user_model.get_users_by_ids(user_ids)
+        return success_response(data={
+            'users': [
+                {'id': u['id'], 'full_name': u['full_name']}
+                for u in (users.get(user_id) for user_id in user_ids) if u
+            ]
+        })
+
+    @auth_bp.route('/cache/stats', methods=['GET'])
+    def cache_stats():
+        """User cache size and hit ratio"""
+        return success_response(data={'user_cache': user_model.cache.stats()})
+
     @auth_bp.route('/profile', methods=['PUT'])
     @token_required
     def update_profile():
@@ -0,0 +1,78 @@
+"""
+In-process cache of user profiles
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserCache:
+    """
+    LRU cache of user profiles keyed by id.
+
+    Entries expire `ttl` seconds after they were stored and the least
+    recently used profile is evicted once `max_size` is reached. Only
+    profiles are stored; callers must strip secrets such as password_hash
+    before calling put().
+    """
+
+    def __init__(self, max_size=10000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (expires_at, profile)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _drop(self, user_id):
+        self._entries.pop(user_id, None)
+
+    def _lookup(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._drop(user_id)
+            self._misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self._hits += 1
+        return dict(entry[1])
+
+    def get_by_id(self, user_id):
+        with self._lock:
+            return self._lookup(user_id)
+
+    def put(self, profile):
+        with self._lock:
+            self._drop(profile['id'])
+            self._entries[profile['id']] = (time.monotonic() + self.ttl, dict(profile))
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._evictions += 1
+
+    def put_many(self, profiles):
+        for profile in profiles:
+            self.put(profile)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._drop(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else None
+            }
@@ -0,0 +1,75 @@
+"""
+Benchmark for password hashing cost policies.
+
+For each policy, verifies passwords from a pool of client threads through
+PasswordHasher with 1..N worker processes and reports logins per second and
+per core, plus what a saturated pool does with the excess (rejected fast).
+Use it to pick PASSWORD_HASH_METHOD for the hardware the service runs on.
+
+    python benchmarks/bench_hashing.py [logins] [method ...]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../app'))
+from hashing import HasherBusy, PasswordHasher
+
+DEFAULT_METHODS = ('scrypt', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:260000')
+
+
+def run(hasher, stored_hash, logins, clients):
+    accepted = rejected = 0
+
+    def login(_):
+        try:
+            ok, _new_hash = hasher.verify(stored_hash, 'correct horse battery staple')
+            return ok
+        except HasherBusy:
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for result in pool.map(login, range(logins)):
+            if result is None:
+                rejected += 1
+            else:
+                accepted += 1
+    return accepted, rejected, time.perf_counter() - start
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    methods = sys.argv[2:] or DEFAULT_METHODS
+    cores = os.cpu_count() or 1
+
+    for method in methods:
+        inline = PasswordHasher(method=method, workers=0)
+        stored_hash = inline.hash('correct horse battery staple')
+        print(f"\n{method}  ({stored_hash.split('$')[0]})")
+
+        accepted, _, elapsed = run(inline, stored_hash, max(10, logins // 10), clients=1)
+        print(f"  inline, request thread   {accepted / elapsed:8.1f} logins/s")
+
+        for workers in sorted({1, max(1, cores // 2), cores}):
+            hasher = PasswordHasher(method=method, workers=workers,
+                                    max_pending=logins, timeout=600)
+            run(hasher, stored_hash, workers, clients=workers)  # start the processes
+            accepted, _, elapsed = run(hasher, stored_hash, logins, clients=workers * 4)
+            rate = accepted / elapsed
+            print(f"  pool, {workers:2d} worker(s)       {rate:8.1f} logins/s "
+                  f"{rate / workers:8.1f} per core")
+            hasher.shutdown()
+
+        # A surge well beyond capacity: everything past the queue limit is shed
+        hasher = PasswordHasher(method=method, workers=cores, max_pending=cores * 4)
+        run(hasher, stored_hash, cores, clients=cores)
+        accepted, rejected, elapsed = run(hasher, stored_hash, logins, clients=logins)
+        print(f"  surge of {logins} at once    {accepted} served, {rejected} rejected "
+              f"in {elapsed:.2f}s")
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
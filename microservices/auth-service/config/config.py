@@ -10,6 +10,18 @@ class Config:
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-jwt-secret-key-change-in-production')
     DB_PATH = os.getenv('DB_PATH', '../db/auth.db')
 
+    # Password hashing cost policy; existing hashes are upgraded on login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', 16))
+    # 0 means 4 per worker
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+
+    # Profile cache; USER_CACHE_WARMUP most recent users are loaded at startup
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 300))
+    USER_CACHE_WARMUP = int(os.getenv('USER_CACHE_WARMUP', 1000))
+
 
 class DevelopmentConfig(Config):
     """Development configuration"""
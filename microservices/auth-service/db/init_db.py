@@ -4,6 +4,23 @@ Initialize authentication service database
 import sqlite3
 import os
 
+# Profile edits and deletions, read by every worker process to drop its
+# cached copy of the user (see User._sync_cache)
+CHANGE_TRIGGERS = {
+    'users_changes_au': """
+        AFTER UPDATE OF full_name, email, organization, user_type ON users
+        BEGIN
+            INSERT INTO user_changes (user_id) VALUES (old.id);
+        END
+    """,
+    'users_changes_ad': """
+        AFTER DELETE ON users
+        BEGIN
+            INSERT INTO user_changes (user_id) VALUES (old.id);
+        END
+    """,
+}
+
 
 def init_database(db_path):
     """Initialize the users database"""
@@ -26,6 +43,17 @@ def init_database(db_path):
         )
     """)
 
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("DELETE FROM user_changes WHERE changed_at < datetime('now', '-7 days')")
+    for name, body in CHANGE_TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
     conn.commit()
     conn.close()
     print(f"Authentication database initialized at {db_path}")
@@ -0,0 +1,153 @@
+"""
+Concurrent fan-out to other services for business statistics
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from requests.adapters import HTTPAdapter
+
+from tracing import TracedSession
+
+
+class TTLCache:
+    """Small thread-safe key/value cache with per-entry expiry"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class StatsAggregator:
+    """
+    Fetches business statistics from queue, analytics and feedback services.
+
+    All sources are queried concurrently over one pooled HTTP session and
+    share a single deadline, so a call costs roughly the latency of the
+    slowest dependency. Sources that miss the deadline or fail are reported
+    as unavailable instead of failing the whole result. Successful values are
+    cached per business with a short per-source TTL.
+    """
+
+    def __init__(self, queue_service_url, analytics_service_url, feedback_service_url,
+                 deadline=1.5, max_workers=8):
+        self.deadline = deadline
+        self.cache = TTLCache()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='stats-fanout')
+
+        self.session = TracedSession()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        # source name -> (fetch function, cache TTL in seconds)
+        self.sources = {
+            'queue': (self._fetch_total_queues, 10),
+            'analytics': (self._fetch_customers_served, 30),
+            'feedback': (self._fetch_average_rating, 30),
+        }
+        self.queue_service_url = queue_service_url
+        self.analytics_service_url = analytics_service_url
+        self.feedback_service_url = feedback_service_url
+
+    def _get_json(self, url, timeout):
+        response = self.session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_total_queues(self, business_id, timeout):
+        data = self._get_json(
+            f"{self.queue_service_url}/api/queues/business/{business_id}", timeout
+        )
+        return {'total_queues': len(data['data']['queues'])}
+
+    def _fetch_customers_served(self, business_id, timeout):
+        data = self._get_json(
+            f"{self.analytics_service_url}/analytics/business/{business_id}", timeout
+        )
+        return {'total_customers_served': int(data.get('tickets') or 0)}
+
+    def _fetch_average_rating(self, business_id, timeout):
+        data = self._get_json(
+            f"{self.feedback_service_url}/feedback/business/{business_id}/average", timeout
+        )
+        return {'average_rating': float(data.get('average_rating') or 0.0)}
+
+    def queue_sizes(self, business_ids):
+        """
+        Active queue and waiting-ticket counts for many businesses in one
+        queue-service call, keyed by business id as a string.
+        """
+        ids = ','.join(str(business_id) for business_id in business_ids)
+        data = self._get_json(
+            f"{self.queue_service_url}/api/queues/sizes?business_ids={ids}", self.deadline
+        )
+        return data['data']['sizes']
+
+    def _cache_result(self, name, business_id):
+        def store(future):
+            if not future.cancelled() and future.exception() is None:
+                self.cache.set((name, business_id), future.result(), self.sources[name][1])
+        return store
+
+    def collect(self, business_id):
+        """
+        Gather stats for a business from every source.
+
+        Returns (values, unavailable) where values merges every source that
+        answered in time and unavailable lists the sources that did not.
+        """
+        values = {}
+        pending = {}
+        started = time.monotonic()
+
+        for name, (fetch, _ttl) in self.sources.items():
+            cached = self.cache.get((name, business_id))
+            if cached is not None:
+                values.update(cached)
+            else:
+                # Run in a copy of this context so the call joins the request's trace
+                future = self.executor.submit(contextvars.copy_context().run,
+                                              fetch, business_id, self.deadline)
+                # Late answers still warm the cache for the next caller
+                future.add_done_callback(self._cache_result(name, business_id))
+                pending[future] = name
+
+        unavailable = []
+        if pending:
+            remaining = max(0.0, self.deadline - (time.monotonic() - started))
+            done, not_done = wait(pending, timeout=remaining)
+            for future in done:
+                name = pending[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Warning: {name} stats unavailable for business {business_id}: {e}")
+                    unavailable.append(name)
+                    continue
+                values.update(result)
+            for future in not_done:
+                unavailable.append(pending[future])
+
+        return values, sorted(unavailable)
@@ -8,25 +8,39 @@ import sys
 
 # Add parent directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from models import Business
+from serving import on_worker_start
 from routes import init_routes
 from db.init_db import init_database
+from metrics import instrument
+from tracing import trace_app
+from query_profile import profile_app
 
 # Configuration
 DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '../db/business.db'))
 PORT = int(os.getenv('BUSINESS_SERVICE_PORT', 5002))
 QUEUE_SERVICE_URL = os.getenv('QUEUE_SERVICE_URL', 'http://localhost:5003')
+ANALYTICS_SERVICE_URL = os.getenv('ANALYTICS_SERVICE_URL', 'http://localhost:5006')
+FEEDBACK_SERVICE_URL = os.getenv('FEEDBACK_SERVICE_URL', 'http://localhost:5005')
+OUTBOX_RELAY_ENABLED = os.getenv('OUTBOX_RELAY_ENABLED', 'true').lower() == 'true'
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
+instrument(app)
+trace_app(app, 'business-service')
+profile_app(app)
 
 # Initialize database
 init_database(DB_PATH)
 
 # Initialize business model
-business_model = Business(DB_PATH, QUEUE_SERVICE_URL)
+business_model = Business(DB_PATH, QUEUE_SERVICE_URL, ANALYTICS_SERVICE_URL, FEEDBACK_SERVICE_URL)
+business_model.build_suggest_index()
+if OUTBOX_RELAY_ENABLED:
+    on_worker_start(business_model.outbox_relay.start)
 
 # Register routes
 business_routes = init_routes(business_model)
@@ -43,12 +57,15 @@ def index():
         'endpoints': {
             'health': '/api/health',
             'create_business': '/api/businesses [POST]',
-            'get_all_businesses': '/api/businesses [GET]',
+            'get_all_businesses': '/api/businesses?limit=&cursor=&category= [GET]',
+            'suggest_businesses': '/api/businesses/suggest?q= [GET]',
+            'nearby_businesses': '/api/businesses/nearby?lat=&lon=&radius= [GET]',
             'get_business': '/api/businesses/<id> [GET]',
             'my_businesses': '/api/businesses/my-businesses [GET]',
             'update_business': '/api/businesses/<id> [PUT]',
             'delete_business': '/api/businesses/<id> [DELETE]',
-            'business_stats': '/api/businesses/<id>/stats [GET]'
+            'business_stats': '/api/businesses/<id>/stats [GET]',
+            'outbox_status': '/api/outbox/status [GET]'
         }
     }
 
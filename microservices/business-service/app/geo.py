@@ -0,0 +1,42 @@
+"""
+Distance helpers for nearby search
+"""
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_boxes(lat, lon, radius_km):
+    """
+    Latitude/longitude boxes that together contain every point within
+    `radius_km` of (lat, lon): one box normally, two when the circle crosses
+    the antimeridian, and a full band of longitudes near the poles.
+    Each box is (min_lat, max_lat, min_lon, max_lon).
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    if min_lat == -90.0 or max_lat == 90.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+
+    # Widest at the edge of the box nearest a pole
+    widest = max(abs(min_lat), abs(max_lat))
+    dlon = dlat / math.cos(math.radians(widest))
+    if dlon >= 180.0:
+        return [(min_lat, max_lat, -180.0, 180.0)]
+
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180.0:
+        return [(min_lat, max_lat, min_lon + 360.0, 180.0), (min_lat, max_lat, -180.0, max_lon)]
+    if max_lon > 180.0:
+        return [(min_lat, max_lat, min_lon, 180.0), (min_lat, max_lat, -180.0, max_lon - 360.0)]
+    return [(min_lat, max_lat, min_lon, max_lon)]
@@ -3,56 +3,95 @@ Business model for business service
 """
 import sys
 import os
-import requests
 
 # Add shared directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 from database import Database
+from changes import ChangeFeed
+from aggregator import StatsAggregator
+from outbox import CREATE_DEFAULT_QUEUE, OutboxRelay, add_event
+from suggest import SuggestIndex
+from geo import bounding_boxes, haversine_km
+
+# Columns returned by the directory listing in its summary view
+SUMMARY_COLUMNS = "id, name, category, address, substr(description, 1, 160) AS description, created_at"
+FULL_COLUMNS = "id, name, description, category, address, owner_id, latitude, longitude, created_at"
 
 
 class Business:
     """Business model"""
 
-    def __init__(self, db_path, queue_service_url=None):
+    def __init__(self, db_path, queue_service_url=None, analytics_service_url=None,
+                 feedback_service_url=None):
         self.db = Database(db_path)
         self.queue_service_url = queue_service_url or os.getenv('QUEUE_SERVICE_URL', 'http://localhost:5003')
-
-    def create_business(self, name, description, category, address, owner_id):
+        self.stats_aggregator = StatsAggregator(
+            queue_service_url=self.queue_service_url,
+            analytics_service_url=analytics_service_url or os.getenv('ANALYTICS_SERVICE_URL', 'http://localhost:5006'),
+            feedback_service_url=feedback_service_url or os.getenv('FEEDBACK_SERVICE_URL', 'http://localhost:5005'),
+            deadline=float(os.getenv('STATS_DEADLINE_SECONDS', 1.5))
+        )
+        self.outbox_relay = OutboxRelay(
+            self.db,
+            self.queue_service_url,
+            poll_interval=float(os.getenv('OUTBOX_POLL_INTERVAL', 5))
+        )
+        self.suggest_index = SuggestIndex()
+        # Changes made by other worker processes, which have their own index
+        self.changes = ChangeFeed(self.db, 'business_changes', 'business_id')
+
+    def build_suggest_index(self):
+        """Load every business name into the autocomplete index"""
+        self.changes.mark_current()
+        results = self.db.execute_query("SELECT id, name, category FROM businesses")
+        self.suggest_index.rebuild(dict(row) for row in results)
+        return len(self.suggest_index)
+
+    def _sync_suggest_index(self):
+        changed = self.changes.poll()
+        for i in range(0, len(changed), 500):
+            chunk = changed[i:i + 500]
+            query = (f"SELECT id, name, category FROM businesses "
+                     f"WHERE id IN ({', '.join('?' * len(chunk))})")
+            found = {row['id']: dict(row) for row in self.db.execute_query(query, tuple(chunk))}
+            for business_id in chunk:
+                if business_id in found:
+                    self.suggest_index.add(found[business_id])
+                else:
+                    self.suggest_index.remove(business_id)
+
+    def suggest_businesses(self, query, limit=10):
+        """Businesses whose name, a word of the name, or category starts with `query`"""
+        self._sync_suggest_index()
+        return self.suggest_index.suggest(query, limit)
+
+    def create_business(self, name, description, category, address, owner_id,
+                        latitude=None, longitude=None):
         """Create a new business"""
         query = """
-            INSERT INTO businesses (name, description, category, address, owner_id)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO businesses (name, description, category, address, owner_id, latitude, longitude)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
         """
         try:
-            business_id = self.db.execute_insert(
-                query,
-                (name, description, category, address, owner_id)
-            )
-
-            # Create default queue for this business via Queue Service
-            self._create_default_queue(business_id)
-
-            return business_id, None
-        except Exception as e:
-            return None, str(e)
-
-    def _create_default_queue(self, business_id):
-        """Create a default queue for a new business"""
-        try:
-            # Call Queue Service to create default queue
-            response = requests.post(
-                f"{self.queue_service_url}/api/queues",
-                json={
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(query, (name, description, category, address, owner_id,
+                                       latitude, longitude))
+                business_id = cursor.lastrowid
+
+                # The default queue is created in Queue Service by the outbox
+                # relay; recording it here commits atomically with the business
+                add_event(conn, CREATE_DEFAULT_QUEUE, {
                     'business_id': business_id,
                     'name': 'Main Queue',
                     'avg_service_time': 5
-                },
-                timeout=5
-            )
-            return response.status_code == 201
+                })
+
+            self.outbox_relay.wake()
+            self.suggest_index.add({'id': business_id, 'name': name, 'category': category})
+            return business_id, None
         except Exception as e:
-            print(f"Warning: Could not create default queue: {e}")
-            return False
+            return None, str(e)
 
     def get_business_by_id(self, business_id):
         """Get business by ID"""
@@ -62,16 +101,75 @@ class Business:
             return dict(results[0])
         return None
 
-    def get_all_businesses(self):
-        """Get all businesses"""
-        query = """
-            SELECT id, name, description, category, address, owner_id, created_at
+    def list_businesses(self, limit=20, before=None, category=None, summary=True):
+        """
+        One page of the directory, newest first. `before` is the
+        (created_at, id) of the last business on the previous page; with
+        `category` the page comes from the (category, created_at, id) index.
+        """
+        conditions = []
+        params = []
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if before is not None:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(before)
+
+        query = f"""
+            SELECT {SUMMARY_COLUMNS if summary else FULL_COLUMNS}
             FROM businesses
-            ORDER BY created_at DESC
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ?
         """
-        results = self.db.execute_query(query)
+        params.append(limit)
+        results = self.db.execute_query(query, tuple(params))
         return [dict(row) for row in results]
 
+    def find_nearby(self, lat, lon, radius_km, limit=20, include_queues=False):
+        """
+        Businesses within `radius_km` of (lat, lon), nearest first.
+
+        The R*Tree narrows the search to a bounding box around the circle;
+        only those candidates get an exact great-circle distance. With
+        `include_queues`, live queue sizes for the page come from one bulk
+        queue-service call. Returns (businesses, unavailable).
+        """
+        box_query = """
+            SELECT b.id, b.name, b.category, b.address, b.latitude, b.longitude
+            FROM business_locations l
+            JOIN businesses b ON b.id = l.id
+            WHERE l.max_lat >= ? AND l.min_lat <= ? AND l.max_lon >= ? AND l.min_lon <= ?
+        """
+        boxes = bounding_boxes(lat, lon, radius_km)
+        query = " UNION ALL ".join([box_query] * len(boxes))
+        params = tuple(value for box in boxes for value in box)
+
+        nearby = []
+        for row in self.db.execute_query(query, params):
+            distance = haversine_km(lat, lon, row['latitude'], row['longitude'])
+            if distance <= radius_km:
+                business = dict(row)
+                business['distance_km'] = round(distance, 3)
+                nearby.append(business)
+        nearby.sort(key=lambda b: (b['distance_km'], b['id']))
+        nearby = nearby[:limit]
+
+        unavailable = []
+        if include_queues and nearby:
+            try:
+                sizes = self.stats_aggregator.queue_sizes([b['id'] for b in nearby])
+            except Exception as e:
+                print(f"Warning: queue sizes unavailable for nearby search: {e}")
+                unavailable.append('queue')
+            else:
+                for business in nearby:
+                    size = sizes.get(str(business['id']), {})
+                    business['active_queues'] = size.get('queues', 0)
+                    business['waiting'] = size.get('waiting', 0)
+        return nearby, unavailable
+
     def get_businesses_by_owner(self, owner_id):
         """Get businesses owned by a specific user"""
         query = """
@@ -90,7 +188,7 @@ class Business:
         if not business or business['owner_id'] != owner_id:
             return False, 'Unauthorized or business not found'
 
-        allowed_fields = ['name', 'description', 'category', 'address']
+        allowed_fields = ['name', 'description', 'category', 'address', 'latitude', 'longitude']
         updates = []
         values = []
 
@@ -107,10 +205,17 @@ class Business:
 
         try:
             self.db.execute_update(query, tuple(values))
-            return True, None
         except Exception as e:
             return False, str(e)
 
+        # The row may have been deleted since the update; don't suggest it then
+        updated = self.get_business_by_id(business_id)
+        if updated:
+            self.suggest_index.add(updated)
+        else:
+            self.suggest_index.remove(business_id)
+        return True, None
+
     def delete_business(self, business_id, owner_id):
         """Delete a business"""
         # Verify ownership
@@ -121,20 +226,24 @@ class Business:
         query = "DELETE FROM businesses WHERE id = ?"
         try:
             self.db.execute_update(query, (business_id,))
-            return True, None
         except Exception as e:
             return False, str(e)
 
+        self.suggest_index.remove(business_id)
+        return True, None
+
     def get_business_stats(self, business_id):
-        """Get business statistics (placeholder for future analytics)"""
+        """Get business statistics aggregated from queue, analytics and feedback services"""
         business = self.get_business_by_id(business_id)
         if not business:
             return None
 
-        # In the future, this could aggregate data from Queue Service
+        values, unavailable = self.stats_aggregator.collect(business_id)
         return {
             'business_id': business_id,
-            'total_queues': 0,  # To be fetched from Queue Service
-            'total_customers_served': 0,  # To be fetched from Analytics Service
-            'average_rating': 0.0  # To be fetched from Feedback Service
+            'total_queues': values.get('total_queues'),
+            'total_customers_served': values.get('total_customers_served'),
+            'average_rating': values.get('average_rating'),
+            'partial': bool(unavailable),
+            'unavailable': unavailable
         }
@@ -0,0 +1,211 @@
+"""
+Local outbox for calls to other services
+"""
+import json
+import random
+import threading
+import uuid
+
+import requests
+
+CREATE_DEFAULT_QUEUE = 'queue.create_default'
+
+
+def add_event(conn, event_type, payload):
+    """
+    Record an event on an open connection, so it commits (or rolls back)
+    together with whatever else the caller wrote in that transaction.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO outbox (event_type, payload) VALUES (?, ?)",
+        (event_type, json.dumps(payload))
+    )
+    return cursor.lastrowid
+
+
+class OutboxRelay:
+    """
+    Background worker that delivers outbox events to other services.
+
+    Events are claimed in batches (so several workers can share a database),
+    delivered, and either marked delivered or rescheduled with exponential
+    backoff and jitter. After `max_attempts` an event is marked dead and left
+    for an operator. Claims older than `claim_timeout` are released, which
+    covers a worker that died mid-batch. The claim is renewed before each
+    event, and an event whose claim another worker has taken over is skipped.
+    By default `claim_timeout` outlasts a whole batch against a slow
+    queue-service (two calls per event at `timeout` each), so events are
+    not released while they are still being delivered.
+    """
+
+    def __init__(self, db, queue_service_url, poll_interval=5.0, batch_size=50,
+                 max_attempts=10, base_backoff=2.0, max_backoff=300.0,
+                 timeout=5.0, claim_timeout=None):
+        self.db = db
+        self.queue_service_url = queue_service_url
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.claim_timeout = (batch_size * 2 * timeout + 60 if claim_timeout is None
+                              else claim_timeout)
+
+        self.session = requests.Session()
+        self.handlers = {
+            CREATE_DEFAULT_QUEUE: self._create_default_queue,
+        }
+
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread = None
+
+    # ---- lifecycle ----
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='outbox-relay', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+
+    def wake(self):
+        """Deliver new events now instead of at the next poll"""
+        self._wakeup.set()
+
+    def _run(self):
+        while self._running:
+            try:
+                while self._running and self.deliver_pending() == self.batch_size:
+                    pass
+            except Exception as e:
+                print(f"Warning: outbox relay error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    # ---- delivery ----
+
+    def _claim(self):
+        token = uuid.uuid4().hex
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                UPDATE outbox SET status = 'pending', claim_token = NULL
+                WHERE status = 'sending'
+                  AND claimed_at <= datetime('now', ?)
+                """,
+                (f'-{int(self.claim_timeout)} seconds',)
+            )
+            cursor.execute(
+                """
+                UPDATE outbox SET status = 'sending', claim_token = ?, claimed_at = CURRENT_TIMESTAMP
+                WHERE id IN (
+                    SELECT id FROM outbox
+                    WHERE status = 'pending' AND next_attempt_at <= CURRENT_TIMESTAMP
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                """,
+                (token, self.batch_size)
+            )
+            cursor.execute("SELECT * FROM outbox WHERE claim_token = ? ORDER BY id", (token,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def deliver_pending(self):
+        """Deliver one batch of due events; returns how many were claimed"""
+        events = self._claim()
+        for event in events:
+            if not self._renew_claim(event):
+                continue
+            handler = self.handlers.get(event['event_type'])
+            try:
+                if handler is None:
+                    raise ValueError(f"no handler for {event['event_type']}")
+                handler(json.loads(event['payload']), event['attempts'])
+            except Exception as e:
+                self._failed(event, str(e))
+            else:
+                self.db.execute_update(
+                    """
+                    UPDATE outbox
+                    SET status = 'delivered', delivered_at = CURRENT_TIMESTAMP,
+                        attempts = attempts + 1, last_error = NULL, claim_token = NULL
+                    WHERE id = ?
+                    """,
+                    (event['id'],)
+                )
+        return len(events)
+
+    def _renew_claim(self, event):
+        """Restart the claim timer of an event; False if this worker no longer holds it"""
+        return self.db.execute_update(
+            """
+            UPDATE outbox SET claimed_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'sending' AND claim_token = ?
+            """,
+            (event['id'], event['claim_token'])
+        ) > 0
+
+    def _failed(self, event, error):
+        attempt = event['attempts'] + 1
+        print(f"Warning: outbox event {event['id']} ({event['event_type']}) "
+              f"attempt {attempt} failed: {error}")
+        if attempt >= self.max_attempts:
+            self.db.execute_update(
+                """
+                UPDATE outbox
+                SET status = 'dead', attempts = ?, last_error = ?, claim_token = NULL
+                WHERE id = ?
+                """,
+                (attempt, error, event['id'])
+            )
+            return
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+        delay = random.uniform(delay / 2, delay)
+        self.db.execute_update(
+            """
+            UPDATE outbox
+            SET status = 'pending', attempts = ?, last_error = ?, claim_token = NULL,
+                next_attempt_at = datetime('now', ?)
+            WHERE id = ?
+            """,
+            (attempt, error, f'+{delay:.0f} seconds', event['id'])
+        )
+
+    def counts(self):
+        rows = self.db.execute_query("SELECT status, COUNT(*) AS count FROM outbox GROUP BY status")
+        return {row['status']: row['count'] for row in rows}
+
+    # ---- handlers ----
+
+    def _create_default_queue(self, payload, attempts):
+        business_id = payload['business_id']
+        # An earlier delivery may have created the queue before failing to
+        # read the response, or a worker may have done so and died before
+        # recording it (its claim expires with attempts unchanged); either
+        # way, do not create a second one.
+        response = self.session.get(
+            f"{self.queue_service_url}/api/queues/business/{business_id}",
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        queues = response.json()['data']['queues']
+        if any(q['name'] == payload['name'] for q in queues):
+            return
+
+        response = self.session.post(
+            f"{self.queue_service_url}/api/queues",
+            json=payload,
+            timeout=self.timeout
+        )
+        if response.status_code != 201:
+            raise RuntimeError(f"queue-service answered {response.status_code}: {response.text[:200]}")
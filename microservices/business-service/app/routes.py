@@ -2,6 +2,7 @@
 Routes for business service
 """
 from flask import Blueprint, request
+import sqlite3
 import sys
 import os
 
@@ -9,9 +10,40 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 from response import success_response, error_response, validation_error
 from auth_middleware import token_required
+from cursors import decode_cursor, encode_cursor
 
 business_bp = Blueprint('business', __name__)
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 25
+DEFAULT_RADIUS_KM = 5.0
+MAX_RADIUS_KM = 50.0
+
+
+def parse_coordinates(data, errors):
+    """
+    Optional latitude/longitude from a request body. Both or neither must be
+    given; problems are added to `errors`.
+    """
+    latitude, longitude = data.get('latitude'), data.get('longitude')
+    if latitude is None and longitude is None:
+        return None, None
+    if latitude is None or longitude is None:
+        errors['location'] = 'latitude and longitude must be given together'
+        return None, None
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        errors['location'] = 'latitude and longitude must be numbers'
+        return None, None
+    if not -90 <= latitude <= 90:
+        errors['latitude'] = 'latitude must be between -90 and 90'
+    if not -180 <= longitude <= 180:
+        errors['longitude'] = 'longitude must be between -180 and 180'
+    return latitude, longitude
+
 
 def init_routes(business_model):
     """Initialize routes with business model"""
@@ -21,6 +53,11 @@ def init_routes(business_model):
         """Health check endpoint"""
         return success_response(data={'status': 'healthy', 'service': 'business-service'})
 
+    @business_bp.route('/outbox/status', methods=['GET'])
+    def outbox_status():
+        """Outbox events by status (pending, sending, delivered, dead)"""
+        return success_response(data={'outbox': business_model.outbox_relay.counts()})
+
     @business_bp.route('/businesses', methods=['POST'])
     @token_required
     def create_business():
@@ -34,6 +71,7 @@ def init_routes(business_model):
         for field in required_fields:
             if not data.get(field):
                 errors[field] = f'{field} is required'
+        latitude, longitude = parse_coordinates(data, errors)
 
         if errors:
             return validation_error(errors)
@@ -44,7 +82,9 @@ def init_routes(business_model):
             description=data.get('description', ''),
             category=data['category'],
             address=data['address'],
-            owner_id=request.user_id
+            owner_id=request.user_id,
+            latitude=latitude,
+            longitude=longitude
         )
 
         if error:
@@ -58,9 +98,64 @@ def init_routes(business_model):
 
     @business_bp.route('/businesses', methods=['GET'])
     def get_all_businesses():
-        """Get all businesses"""
-        businesses = business_model.get_all_businesses()
-        return success_response(data={'businesses': businesses})
+        """
+        Get a page of businesses, newest first
+        (?limit=20&cursor=...&category=Clinic&view=summary|full)
+        """
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        before = None
+        if request.args.get('cursor'):
+            try:
+                before = decode_cursor(request.args['cursor'])
+            except ValueError:
+                return error_response('Invalid cursor', 400)
+
+        businesses = business_model.list_businesses(
+            limit=limit,
+            before=before,
+            category=request.args.get('category') or None,
+            summary=request.args.get('view', 'summary') != 'full'
+        )
+        next_cursor = encode_cursor(businesses[-1]) if len(businesses) == limit else None
+        return success_response(data={'businesses': businesses, 'next_cursor': next_cursor})
+
+    @business_bp.route('/businesses/suggest', methods=['GET'])
+    def suggest_businesses():
+        """Autocomplete business names (?q=caf&limit=10)"""
+        limit = request.args.get('limit', DEFAULT_SUGGESTIONS, type=int)
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        suggestions = business_model.suggest_businesses(request.args.get('q', ''), limit)
+        return success_response(data={'suggestions': suggestions})
+
+    @business_bp.route('/businesses/nearby', methods=['GET'])
+    def nearby_businesses():
+        """
+        Businesses near a point, nearest first
+        (?lat=&lon=&radius=5&limit=20&include_queues=true)
+        """
+        lat = request.args.get('lat', type=float)
+        lon = request.args.get('lon', type=float)
+        if lat is None or lon is None or not -90 <= lat <= 90 or not -180 <= lon <= 180:
+            return validation_error({'location': 'lat and lon are required and must be valid coordinates'})
+        radius = request.args.get('radius', DEFAULT_RADIUS_KM, type=float)
+        radius = max(0.0, min(radius, MAX_RADIUS_KM))
+        limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        try:
+            businesses, unavailable = business_model.find_nearby(
+                lat, lon, radius, limit,
+                include_queues=request.args.get('include_queues', 'false').lower() == 'true'
+            )
+        except sqlite3.OperationalError as e:
+            return error_response(f'Nearby search unavailable: {e}', 503)
+        return success_response(data={
+            'businesses': businesses,
+            'radius_km': radius,
+            'partial': bool(unavailable),
+            'unavailable': unavailable
+        })
 
     @business_bp.route('/businesses/<int:business_id>', methods=['GET'])
     def get_business(business_id):
@@ -96,13 +191,20 @@ def init_routes(business_model):
         """Update business information"""
         data = request.get_json()
 
+        errors = {}
+        latitude, longitude = parse_coordinates(data, errors)
+        if errors:
+            return validation_error(errors)
+
         success, error = business_model.update_business(
             business_id=business_id,
             owner_id=request.user_id,
             name=data.get('name'),
             description=data.get('description'),
             category=data.get('category'),
-            address=data.get('address')
+            address=data.get('address'),
+            latitude=latitude,
+            longitude=longitude
         )
 
         if not success:
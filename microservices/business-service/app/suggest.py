@@ -0,0 +1,111 @@
+"""
+In-memory prefix index for business name autocomplete
+"""
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+
+# Match tiers, best first: the whole name starts with the query, a later word
+# of the name does, or the category does.
+NAME, WORD, CATEGORY = 0, 1, 2
+
+
+def normalize(text):
+    """Case-fold, strip accents and collapse whitespace ("  Café " -> "cafe")"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+
+def _keys(name, category):
+    name = normalize(name)
+    keys = [(NAME, name)] if name else []
+    words = name.split(' ')
+    # Every word boundary after the first, so "central bank" is found by "ba"
+    keys.extend((WORD, ' '.join(words[i:])) for i in range(1, len(words)))
+    category = normalize(category)
+    if category:
+        keys.append((CATEGORY, category))
+    return keys
+
+
+class SuggestIndex:
+    """
+    Sorted arrays of (normalized key, business id), one per match tier.
+
+    A lookup bisects to the first key >= the query in each tier and walks
+    forward while keys still start with it, stopping as soon as `limit`
+    distinct businesses are found, so its cost depends on `limit` and not
+    on how many businesses share the prefix. Within a tier, results come
+    back in key order.
+
+    The index lives in one process. It is built from the database on
+    startup and kept current by the model on create, update and delete;
+    other processes serving the same database see their own changes only
+    until they rebuild.
+    """
+
+    def __init__(self):
+        self._tiers = ([], [], [])
+        self._entries = {}  # business_id -> (name, category)
+        self._lock = threading.Lock()
+
+    def rebuild(self, businesses):
+        """Replace the index with `businesses` (dicts with id, name, category)"""
+        tiers = ([], [], [])
+        entries = {}
+        for business in businesses:
+            for tier, key in _keys(business['name'], business['category']):
+                tiers[tier].append((key, business['id']))
+            entries[business['id']] = (business['name'], business['category'])
+        for tier in tiers:
+            tier.sort()
+        with self._lock:
+            self._tiers = tiers
+            self._entries = entries
+
+    def _remove(self, business_id):
+        entry = self._entries.pop(business_id, None)
+        if entry is None:
+            return
+        for tier, key in _keys(*entry):
+            keys = self._tiers[tier]
+            i = bisect_left(keys, (key, business_id))
+            if i < len(keys) and keys[i] == (key, business_id):
+                del keys[i]
+
+    def add(self, business):
+        """Insert or replace one business"""
+        keys = _keys(business['name'], business['category'])
+        with self._lock:
+            self._remove(business['id'])
+            for tier, key in keys:
+                insort(self._tiers[tier], (key, business['id']))
+            self._entries[business['id']] = (business['name'], business['category'])
+
+    def remove(self, business_id):
+        with self._lock:
+            self._remove(business_id)
+
+    def suggest(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        found = {}
+        with self._lock:
+            for tier in self._tiers:
+                i = bisect_left(tier, (prefix,))
+                while len(found) < limit and i < len(tier) and tier[i][0].startswith(prefix):
+                    business_id = tier[i][1]
+                    if business_id not in found:
+                        name, category = self._entries[business_id]
+                        found[business_id] = {'id': business_id, 'name': name, 'category': category}
+                    i += 1
+                if len(found) >= limit:
+                    break
+        return list(found.values())
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,86 @@
+"""
+Benchmark for the business name autocomplete index.
+
+Builds a SuggestIndex over synthetic businesses and reports build time,
+memory held by the index, lookup latency percentiles for 1-4 character
+prefixes typed by customers, and the cost of incremental updates.
+
+    python benchmarks/bench_suggest.py [businesses] [lookups]
+"""
+import os
+import random
+import statistics
+import string
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../app'))
+from suggest import SuggestIndex
+
+CATEGORIES = ('Restaurant', 'Café', 'Clinic', 'Salon', 'Bank', 'Government', 'Other')
+WORDS = ('central', 'city', 'green', 'royal', 'sunrise', 'family', 'express', 'golden',
+         'corner', 'market', 'north', 'south', 'dental', 'beauty', 'kitchen', 'grill',
+         'savings', 'medical', 'office', 'studio', 'bistro', 'crédit', 'plaza', 'union')
+
+
+def make_name(rng):
+    words = rng.sample(WORDS, rng.randint(1, 3))
+    # A random syllable keeps names from collapsing onto a few dozen keys
+    words.insert(rng.randrange(len(words) + 1),
+                 ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8))))
+    return ' '.join(word.capitalize() for word in words)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))]
+    return pick(0.5), pick(0.95), pick(0.99), samples[-1]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    rng = random.Random(42)
+    businesses = [{'id': i, 'name': make_name(rng), 'category': rng.choice(CATEGORIES)}
+                  for i in range(1, count + 1)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = SuggestIndex()
+    index.rebuild(businesses)
+    build = time.perf_counter() - start
+    memory, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    keys = sum(len(tier) for tier in index._tiers)
+    print(f"{count} businesses, {keys} keys: built in {build:.2f}s, "
+          f"{memory / 2**20:.1f} MiB ({memory / count:.0f} bytes/business)")
+
+    names = [b['name'] for b in businesses]
+    for length in (1, 2, 3, 4):
+        queries = [rng.choice(rng.choice(names).split(' '))[:length] for _ in range(lookups)]
+        timings = []
+        empty = 0
+        for query in queries:
+            t = time.perf_counter()
+            if not index.suggest(query, 10):
+                empty += 1
+            timings.append(time.perf_counter() - t)
+        p50, p95, p99, worst = (v * 1e6 for v in percentiles(timings))
+        print(f"  prefix of {length}: p50 {p50:6.1f}us  p95 {p95:6.1f}us  p99 {p99:6.1f}us  "
+              f"max {worst:7.1f}us  mean {statistics.mean(timings) * 1e6:6.1f}us  ({empty} empty)")
+
+    timings = []
+    for i in range(2000):
+        business = {'id': count + i + 1, 'name': make_name(rng), 'category': rng.choice(CATEGORIES)}
+        t = time.perf_counter()
+        index.add(business)
+        index.add(dict(business, name=make_name(rng)))
+        index.remove(business['id'])
+        timings.append((time.perf_counter() - t) / 3)
+    p50, p95, p99, worst = (v * 1e6 for v in percentiles(timings))
+    print(f"  add/rename/remove: p50 {p50:6.1f}us  p95 {p95:6.1f}us  p99 {p99:6.1f}us  max {worst:7.1f}us")
+
+
+if __name__ == '__main__':
+    main()
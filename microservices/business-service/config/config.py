@@ -8,6 +8,11 @@ class Config:
     """Base configuration"""
     DB_PATH = os.getenv('DB_PATH', '../db/business.db')
     QUEUE_SERVICE_URL = os.getenv('QUEUE_SERVICE_URL', 'http://localhost:5003')
+    ANALYTICS_SERVICE_URL = os.getenv('ANALYTICS_SERVICE_URL', 'http://localhost:5006')
+    FEEDBACK_SERVICE_URL = os.getenv('FEEDBACK_SERVICE_URL', 'http://localhost:5005')
+    STATS_DEADLINE_SECONDS = float(os.getenv('STATS_DEADLINE_SECONDS', 1.5))
+    OUTBOX_RELAY_ENABLED = os.getenv('OUTBOX_RELAY_ENABLED', 'true').lower() == 'true'
+    OUTBOX_POLL_INTERVAL = float(os.getenv('OUTBOX_POLL_INTERVAL', 5))
 
 
 class DevelopmentConfig(Config):
@@ -4,6 +4,81 @@ Initialize business service database
 import sqlite3
 import os
 
+# Keep business_locations in step with businesses.latitude/longitude.
+# A business without both coordinates is simply not in the spatial index.
+LOCATION_TRIGGERS = {
+    'businesses_location_ai': """
+        AFTER INSERT ON businesses
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+        BEGIN
+            INSERT INTO business_locations
+            VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END
+    """,
+    'businesses_location_au': """
+        AFTER UPDATE OF latitude, longitude ON businesses
+        BEGIN
+            DELETE FROM business_locations WHERE id = old.id;
+            INSERT INTO business_locations
+            SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END
+    """,
+    'businesses_location_ad': """
+        AFTER DELETE ON businesses
+        BEGIN
+            DELETE FROM business_locations WHERE id = old.id;
+        END
+    """,
+}
+
+
+# Name, category and existence changes, read by every worker process to
+# keep its autocomplete index current (see Business._sync_suggest_index)
+CHANGE_TRIGGERS = {
+    'businesses_changes_ai': """
+        AFTER INSERT ON businesses
+        BEGIN
+            INSERT INTO business_changes (business_id) VALUES (new.id);
+        END
+    """,
+    'businesses_changes_au': """
+        AFTER UPDATE OF name, category ON businesses
+        BEGIN
+            INSERT INTO business_changes (business_id) VALUES (new.id);
+        END
+    """,
+    'businesses_changes_ad': """
+        AFTER DELETE ON businesses
+        BEGIN
+            INSERT INTO business_changes (business_id) VALUES (old.id);
+        END
+    """,
+}
+
+
+def _init_spatial_index(cursor):
+    has_index = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'business_locations'"
+    ).fetchone()
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS business_locations USING rtree(
+            id,
+            min_lat, max_lat,
+            min_lon, max_lon
+        )
+    """)
+    if not has_index:
+        # Index businesses that already had coordinates
+        cursor.execute("""
+            INSERT INTO business_locations
+            SELECT id, latitude, latitude, longitude, longitude
+            FROM businesses
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+    for name, body in LOCATION_TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
 
 def init_database(db_path):
     """Initialize the businesses database"""
@@ -26,11 +101,67 @@ def init_database(db_path):
         )
     """)
 
+    # Coordinates were added after the first release
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(businesses)")}
+    for column in ('latitude', 'longitude'):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE businesses ADD COLUMN {column} REAL")
+
     # Create index on owner_id for faster queries
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_owner_id ON businesses(owner_id)
     """)
 
+    # Directory pages are read newest first, optionally within one category
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_businesses_created ON businesses(created_at, id)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_businesses_category_created
+        ON businesses(category, created_at, id)
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS business_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            business_id INTEGER NOT NULL,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("DELETE FROM business_changes WHERE changed_at < datetime('now', '-7 days')")
+    for name, body in CHANGE_TRIGGERS.items():
+        cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    # Calls to other services, written in the same transaction as the change
+    # that needs them and delivered by the outbox relay
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            claim_token TEXT,
+            claimed_at TIMESTAMP,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            delivered_at TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_status_next_attempt
+        ON outbox(status, next_attempt_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_outbox_claim_token ON outbox(claim_token)
+    """)
+
+    try:
+        _init_spatial_index(cursor)
+    except sqlite3.OperationalError as e:
+        print(f"Warning: nearby search disabled, R*Tree unavailable: {e}")
+
     conn.commit()
     conn.close()
     print(f"Business database initialized at {db_path}")
@@ -5,10 +5,13 @@ import sys
 
 # Allow imports from parent folder (for db/models/routes)
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from models import Feedback
 from routes import init_routes
 from db.init_db import init_database
+from metrics import instrument
+from tracing import trace_app
 
 # Database path inside container
 DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '../db/feedback.db'))
@@ -16,6 +19,8 @@ PORT = int(os.getenv('FEEDBACK_SERVICE_PORT', 5005))  # default: 5005
 
 app = Flask(__name__)
 CORS(app)
+instrument(app)
+trace_app(app, 'feedback-service')
 
 # Create database & table
 init_database(DB_PATH)
@@ -36,8 +41,12 @@ def index():
             'health': '/health',
             'add_feedback': '/feedback [POST]',
             'get_feedback': '/feedback/<id> [GET]',
-            'list_business_feedback': '/feedback/business/<id> [GET]',
-            'average_rating': '/feedback/business/<id>/average [GET]'
+            'list_business_feedback': '/feedback/business/<id>?limit=&cursor= [GET]',
+            'export_business_feedback': '/feedback/business/<id>/export [GET]',
+            'search_business_feedback': '/feedback/business/<id>/search?q= [GET]',
+            'average_rating': '/feedback/business/<id>/average [GET]',
+            'rating_distribution': '/feedback/business/<id>/distribution [GET]',
+            'batch_ratings': '/feedback/ratings?business_ids=1,2 [GET]'
         }
     }
 
@@ -1,5 +1,35 @@
+import re
 import sqlite3
 
+# Marks matched terms in FTS snippets; control characters, never HTML, so the
+# comment text is returned as plain text for the client to escape
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+
+def split_highlights(marked: str):
+    """
+    Turn a snippet with HIGHLIGHT_START/END markers into its plain text and
+    the [start, end) offsets of the highlighted terms in that text.
+    """
+    text = []
+    highlights = []
+    length = 0
+    start = None
+    for part in re.split(f"([{HIGHLIGHT_START}{HIGHLIGHT_END}])", marked or ""):
+        if part == HIGHLIGHT_START:
+            start = length
+        elif part == HIGHLIGHT_END and start is not None:
+            highlights.append([start, length])
+            start = None
+        elif part == HIGHLIGHT_END:
+            continue
+        else:
+            text.append(part)
+            length += len(part)
+    return "".join(text), highlights
+
+
 class Feedback:
     def __init__(self, db_path: str):
         self.db_path = db_path
@@ -34,36 +64,142 @@ class Feedback:
         conn.close()
         return dict(row) if row else None
 
-    def get_feedback_for_business(self, business_id: int):
-        conn = self._get_connection()
-        cur = conn.cursor()
-        cur.execute(
+    @staticmethod
+    def _business_page_query(business_id: int, before=None):
+        if before is None:
+            return (
+                """
+                SELECT * FROM feedback
+                WHERE business_id = ?
+                ORDER BY created_at DESC, id DESC
+                """,
+                (business_id,)
+            )
+        return (
             """
             SELECT * FROM feedback
-            WHERE business_id = ?
-            ORDER BY created_at DESC
+            WHERE business_id = ? AND (created_at, id) < (?, ?)
+            ORDER BY created_at DESC, id DESC
             """,
-            (business_id,)
+            (business_id, before[0], before[1])
         )
+
+    def get_feedback_for_business(self, business_id: int, limit: int = 50, before=None):
+        """
+        One page of a business's feedback, newest first. `before` is the
+        (created_at, id) of the last row of the previous page.
+        """
+        query, params = self._business_page_query(business_id, before)
+        conn = self._get_connection()
+        cur = conn.cursor()
+        cur.execute(query + " LIMIT ?", params + (limit,))
         rows = cur.fetchall()
         conn.close()
         return [dict(r) for r in rows]
 
-    def get_average_rating_for_business(self, business_id: int):
+    def iter_feedback_for_business(self, business_id: int, before=None, chunk_size: int = 500):
+        """Yield every feedback row from the cursor on, holding one chunk in memory"""
+        query, params = self._business_page_query(business_id, before)
+        conn = self._get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                for r in rows:
+                    yield dict(r)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def to_match_query(business_id: int, text: str) -> str:
+        """
+        Turn free text into an FTS5 query over one business's comments: every
+        word must appear, as a prefix, so "slow rude" matches "slowly" and
+        "rudeness". Quoting each word keeps FTS5 operators in user input from
+        being interpreted. Returns "" when there is nothing to search for.
+        """
+        words = re.findall(r"\w+", text)
+        if not words:
+            return ""
+        terms = " ".join(f'"{w}"*' for w in words)
+        return f'business_id : "{int(business_id)}" AND comment : ({terms})'
+
+    def search_feedback(self, business_id: int, text: str, limit: int = 20, offset: int = 0):
+        """
+        Best-matching feedback of a business for `text`, ranked by BM25,
+        with a snippet of the comment: plain, unescaped text and the
+        `highlights` offsets of the matched terms. Returns (total, hits).
+        """
+        match = self.to_match_query(business_id, text)
+        if not match:
+            return 0, []
         conn = self._get_connection()
         cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) AS total FROM feedback_fts WHERE feedback_fts MATCH ?", (match,))
+        total = cur.fetchone()["total"]
+        # CROSS JOIN keeps feedback_fts as the outer loop so the MATCH runs once
         cur.execute(
             """
-            SELECT AVG(rating) AS avg_rating, COUNT(*) AS count
-            FROM feedback
-            WHERE business_id = ?
+            SELECT f.*, snippet(feedback_fts, 0, ?, ?, '...', 12) AS snippet,
+                   feedback_fts.rank AS score
+            FROM feedback_fts
+            CROSS JOIN feedback f ON f.id = feedback_fts.rowid
+            WHERE feedback_fts MATCH ?
+            ORDER BY feedback_fts.rank
+            LIMIT ? OFFSET ?
             """,
-            (business_id,)
+            (HIGHLIGHT_START, HIGHLIGHT_END, match, limit, offset)
         )
-        row = cur.fetchone()
+        rows = cur.fetchall()
         conn.close()
+        hits = []
+        for row in rows:
+            hit = dict(row)
+            hit["snippet"], hit["highlights"] = split_highlights(hit["snippet"])
+            hits.append(hit)
+        return total, hits
+
+    @staticmethod
+    def _rating_summary(business_id: int, row):
+        count = row["rating_count"] if row else 0
         return {
             "business_id": business_id,
-            "average_rating": float(row["avg_rating"]) if row["avg_rating"] is not None else None,
-            "count": int(row["count"])
+            "average_rating": row["rating_sum"] / count if count else None,
+            "count": count
         }
+
+    def get_rating_row(self, business_id: int):
+        conn = self._get_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM business_ratings WHERE business_id = ?", (business_id,))
+        row = cur.fetchone()
+        conn.close()
+        return row
+
+    def get_average_rating_for_business(self, business_id: int):
+        return self._rating_summary(business_id, self.get_rating_row(business_id))
+
+    def get_rating_distribution(self, business_id: int):
+        row = self.get_rating_row(business_id)
+        stats = self._rating_summary(business_id, row)
+        stats["distribution"] = {str(n): (row[f"stars_{n}"] if row else 0) for n in range(1, 6)}
+        return stats
+
+    def get_ratings_for_businesses(self, business_ids):
+        """Average rating and count for many businesses with one query"""
+        business_ids = list(dict.fromkeys(business_ids))
+        if not business_ids:
+            return {}
+        conn = self._get_connection()
+        cur = conn.cursor()
+        placeholders = ", ".join("?" * len(business_ids))
+        cur.execute(
+            f"SELECT * FROM business_ratings WHERE business_id IN ({placeholders})",
+            business_ids
+        )
+        rows = {r["business_id"]: r for r in cur.fetchall()}
+        conn.close()
+        return {bid: self._rating_summary(bid, rows.get(bid)) for bid in business_ids}
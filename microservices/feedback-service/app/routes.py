@@ -1,4 +1,15 @@
-from flask import Blueprint, request, jsonify
+import json
+import sqlite3
+
+from flask import Blueprint, Response, request, jsonify
+
+from cursors import decode_cursor, encode_cursor
+
+MAX_BATCH_BUSINESSES = 500
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SEARCH_PAGE_SIZE = 100
+
 
 def init_routes(feedback_model):
     feedback_bp = Blueprint("feedback_bp", __name__)
@@ -18,18 +29,92 @@ def init_routes(feedback_model):
 
         if not all([user_id, business_id, rating]):
             return jsonify({"error": "user_id, business_id, and rating required"}), 400
+        try:
+            rating = int(rating)
+        except (TypeError, ValueError):
+            rating = 0
+        if not 1 <= rating <= 5:
+            return jsonify({"error": "rating must be an integer from 1 to 5"}), 400
 
         fb = feedback_model.create_feedback(user_id, business_id, rating, comment)
         return jsonify(fb), 201
 
+    def cursor_arg():
+        cursor = request.args.get("cursor")
+        return decode_cursor(cursor) if cursor else None
+
+    # GET /feedback/business/<id>?limit=50&cursor=...
     @feedback_bp.route("/feedback/business/<int:business_id>", methods=["GET"])
     def business_feedback(business_id):
-        feedback_list = feedback_model.get_feedback_for_business(business_id)
-        return jsonify({"feedback": feedback_list}), 200
+        limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        try:
+            before = cursor_arg()
+        except ValueError:
+            return jsonify({"error": "invalid cursor"}), 400
+
+        feedback_list = feedback_model.get_feedback_for_business(business_id, limit, before)
+        next_cursor = encode_cursor(feedback_list[-1]) if len(feedback_list) == limit else None
+        return jsonify({"feedback": feedback_list, "next_cursor": next_cursor}), 200
+
+    # GET /feedback/business/<id>/export[?cursor=...]
+    # Streams every row as JSON lines; memory use does not grow with the result
+    @feedback_bp.route("/feedback/business/<int:business_id>/export", methods=["GET"])
+    def export_feedback(business_id):
+        try:
+            before = cursor_arg()
+        except ValueError:
+            return jsonify({"error": "invalid cursor"}), 400
+
+        rows = feedback_model.iter_feedback_for_business(business_id, before)
+        lines = (json.dumps(row) + "\n" for row in rows)
+        return Response(lines, mimetype="application/x-ndjson")
+
+    # GET /feedback/business/<id>/search?q=slow&limit=20&offset=0
+    @feedback_bp.route("/feedback/business/<int:business_id>/search", methods=["GET"])
+    def search_feedback(business_id):
+        q = request.args.get("q", "").strip()
+        if not q:
+            return jsonify({"error": "q required"}), 400
+        limit = max(1, min(request.args.get("limit", 20, type=int), MAX_SEARCH_PAGE_SIZE))
+        offset = max(0, request.args.get("offset", 0, type=int))
+
+        try:
+            total, hits = feedback_model.search_feedback(business_id, q, limit, offset)
+        except sqlite3.OperationalError as e:
+            return jsonify({"error": f"search unavailable: {e}"}), 503
+        next_offset = offset + len(hits) if offset + len(hits) < total else None
+        return jsonify({
+            "query": q,
+            "total": total,
+            "results": hits,
+            "next_offset": next_offset
+        }), 200
 
     @feedback_bp.route("/feedback/business/<int:business_id>/average", methods=["GET"])
     def average_rating(business_id):
         stats = feedback_model.get_average_rating_for_business(business_id)
         return jsonify(stats), 200
 
+    @feedback_bp.route("/feedback/business/<int:business_id>/distribution", methods=["GET"])
+    def rating_distribution(business_id):
+        stats = feedback_model.get_rating_distribution(business_id)
+        return jsonify(stats), 200
+
+    # GET /feedback/ratings?business_ids=1,2,3
+    @feedback_bp.route("/feedback/ratings", methods=["GET"])
+    def batch_ratings():
+        raw = request.args.get("business_ids", "")
+        try:
+            business_ids = [int(b) for b in raw.split(",") if b.strip()]
+        except ValueError:
+            return jsonify({"error": "business_ids must be a comma-separated list of integers"}), 400
+        if not business_ids:
+            return jsonify({"error": "business_ids required"}), 400
+        if len(business_ids) > MAX_BATCH_BUSINESSES:
+            return jsonify({"error": f"at most {MAX_BATCH_BUSINESSES} business_ids per request"}), 400
+
+        ratings = feedback_model.get_ratings_for_businesses(business_ids)
+        return jsonify({"ratings": {str(bid): stats for bid, stats in ratings.items()}}), 200
+
     return feedback_bp
@@ -0,0 +1,77 @@
+"""
+Benchmark for full-text search over feedback comments.
+
+Fills a database with synthetic reviews spread over a number of businesses,
+then times searches (count + first ranked page with snippets) for a few
+words against a busy business and a quiet one.
+
+    python benchmarks/bench_search.py [comments] [businesses]
+"""
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../app'))
+from db.init_db import init_database
+from models import Feedback
+
+# Filler vocabulary follows a Zipf-like curve; the searched words show up in
+# a few percent of comments each, and "service" in roughly a third of them
+# as a worst case for ranking.
+FILLER = [f"w{i}" for i in range(5000)]
+FILLER_CUM_WEIGHTS = list(itertools.accumulate(1 / (i + 1) for i in range(5000)))
+KEYWORDS = {"rude": 0.02, "slow": 0.03, "waited": 0.04, "manager": 0.01,
+            "friendly": 0.05, "service": 0.35}
+
+
+def make_comment(rng):
+    words = rng.choices(FILLER, cum_weights=FILLER_CUM_WEIGHTS, k=rng.randint(5, 25))
+    for word, p in KEYWORDS.items():
+        if rng.random() < p:
+            words.insert(rng.randrange(len(words) + 1), word)
+    return " ".join(words)
+
+
+def main():
+    comments = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    businesses = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    rng = random.Random(7)
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'feedback.db')
+    init_database(db_path)
+    model = Feedback(db_path)
+
+    start = time.perf_counter()
+    conn = model._get_connection()
+    conn.executemany(
+        "INSERT INTO feedback (user_id, business_id, rating, comment) VALUES (?, ?, ?, ?)",
+        (
+            # Business 1 is the busy one: about a third of all reviews
+            (i, 1 if i % 3 == 0 else rng.randint(2, businesses), rng.randint(1, 5),
+             make_comment(rng))
+            for i in range(comments)
+        )
+    )
+    conn.commit()
+    conn.close()
+    print(f"inserted {comments} comments (FTS index kept in sync) in "
+          f"{time.perf_counter() - start:.1f}s")
+
+    for business_id in (1, 2):
+        for q in ("rude", "slow wait", "manag", "rude friendly", "service"):
+            runs = []
+            for _ in range(5):
+                t = time.perf_counter()
+                total, hits = model.search_feedback(business_id, q, limit=20)
+                runs.append(time.perf_counter() - t)
+            runs.sort()
+            print(f"business {business_id} q={q!r:20} total={total:6d} "
+                  f"median={runs[2] * 1000:7.1f}ms best={runs[0] * 1000:7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,91 @@
 import os
 import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
+from database import enable_wal
 
 DB_FILENAME = "feedback.db"
 
+STARS = range(1, 6)
+
+# Keep business_ratings in step with feedback inside the writing transaction
+RATING_TRIGGERS = {
+    "trg_feedback_rating_insert": f"""
+        AFTER INSERT ON feedback
+        WHEN NEW.rating BETWEEN 1 AND 5
+        BEGIN
+            INSERT INTO business_ratings
+                (business_id, rating_count, rating_sum, {", ".join(f"stars_{n}" for n in STARS)})
+            VALUES (NEW.business_id, 1, NEW.rating, {", ".join(f"NEW.rating = {n}" for n in STARS)})
+            ON CONFLICT(business_id) DO UPDATE SET
+                rating_count = rating_count + 1,
+                rating_sum = rating_sum + NEW.rating,
+                {", ".join(f"stars_{n} = stars_{n} + (NEW.rating = {n})" for n in STARS)};
+        END
+    """,
+    "trg_feedback_rating_delete": f"""
+        AFTER DELETE ON feedback
+        WHEN OLD.rating BETWEEN 1 AND 5
+        BEGIN
+            UPDATE business_ratings SET
+                rating_count = rating_count - 1,
+                rating_sum = rating_sum - OLD.rating,
+                {", ".join(f"stars_{n} = stars_{n} - (OLD.rating = {n})" for n in STARS)}
+            WHERE business_id = OLD.business_id;
+        END
+    """,
+}
+
+# External-content FTS5 index over feedback.comment, synced by triggers.
+# business_id is indexed too so a search is narrowed to one business inside
+# the index instead of by joining every match back to feedback.
+SEARCH_TRIGGERS = {
+    "trg_feedback_fts_insert": """
+        AFTER INSERT ON feedback
+        BEGIN
+            INSERT INTO feedback_fts (rowid, comment, business_id)
+            VALUES (NEW.id, NEW.comment, NEW.business_id);
+        END
+    """,
+    "trg_feedback_fts_delete": """
+        AFTER DELETE ON feedback
+        BEGIN
+            INSERT INTO feedback_fts (feedback_fts, rowid, comment, business_id)
+            VALUES ('delete', OLD.id, OLD.comment, OLD.business_id);
+        END
+    """,
+    "trg_feedback_fts_update": """
+        AFTER UPDATE OF comment, business_id ON feedback
+        BEGIN
+            INSERT INTO feedback_fts (feedback_fts, rowid, comment, business_id)
+            VALUES ('delete', OLD.id, OLD.comment, OLD.business_id);
+            INSERT INTO feedback_fts (rowid, comment, business_id)
+            VALUES (NEW.id, NEW.comment, NEW.business_id);
+        END
+    """,
+}
+
+def _init_search_index(cur):
+    has_index = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'feedback_fts'"
+    ).fetchone()
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5(
+            comment,
+            business_id,
+            content = 'feedback',
+            content_rowid = 'id',
+            tokenize = 'porter unicode61'
+        );
+    """)
+    if not has_index:
+        # Rank on the comment alone, then index rows written before the table existed
+        cur.execute("INSERT INTO feedback_fts (feedback_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')")
+        cur.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+    for name, body in SEARCH_TRIGGERS.items():
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
 def _get_default_db_path():
     base_dir = os.path.dirname(__file__)
     return os.path.join(base_dir, DB_FILENAME)
@@ -15,6 +98,8 @@ def init_database(db_path=None):
 
     conn = sqlite3.connect(db_path)
     cur = conn.cursor()
+
+    enable_wal(conn)
     cur.execute("""
         CREATE TABLE IF NOT EXISTS feedback (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,6 +110,43 @@ def init_database(db_path=None):
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """)
+
+    # Listings page through a business's feedback newest first by (created_at, id)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_feedback_business_created
+        ON feedback(business_id, created_at, id)
+    """)
+
+    has_ratings = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'business_ratings'"
+    ).fetchone()
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS business_ratings (
+            business_id INTEGER PRIMARY KEY,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            {", ".join(f"stars_{n} INTEGER NOT NULL DEFAULT 0" for n in STARS)}
+        );
+    """)
+    if not has_ratings:
+        # First run against an existing database: aggregate what is there
+        cur.execute(f"""
+            INSERT INTO business_ratings
+                (business_id, rating_count, rating_sum, {", ".join(f"stars_{n}" for n in STARS)})
+            SELECT business_id, COUNT(*), SUM(rating),
+                   {", ".join(f"SUM(rating = {n})" for n in STARS)}
+            FROM feedback
+            WHERE rating BETWEEN 1 AND 5
+            GROUP BY business_id
+        """)
+    for name, body in RATING_TRIGGERS.items():
+        cur.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+
+    try:
+        _init_search_index(cur)
+    except sqlite3.OperationalError as e:
+        print(f"[feedback-service] full-text search disabled, FTS5 unavailable: {e}")
+
     conn.commit()
     conn.close()
     print(f"[feedback-service] DB initialized at {db_path}")
@@ -2,15 +2,22 @@
 Frontend Service - API Gateway and Template Server
 This service serves the frontend HTML templates and proxies requests to microservices
 """
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import (Flask, Response, render_template, request, jsonify, redirect, url_for,
+                   session, stream_with_context)
 from flask_cors import CORS
+from http.cookiejar import DefaultCookiePolicy
 import requests
 import os
 import sys
+import time
 
 # Add parent directory to path for config imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 from config.config import Config
+from directory import DirectoryComposer
+from metrics import UPSTREAM_DURATION, instrument
+from tracing import TracedSession, trace_app
 
 # Determine template and static folder paths
 # In Docker container, they are at /app/templates and /app/static
@@ -29,6 +36,8 @@ app = Flask(__name__,
             static_folder=STATIC_FOLDER)
 app.config.from_object(Config)
 CORS(app, origins=Config.CORS_ORIGINS)
+instrument(app)
+trace_app(app, 'frontend-service')
 
 # Service URLs
 AUTH_SERVICE = Config.AUTH_SERVICE_URL
@@ -36,6 +45,13 @@ BUSINESS_SERVICE = Config.BUSINESS_SERVICE_URL
 QUEUE_SERVICE = Config.QUEUE_SERVICE_URL
 FEEDBACK_SERVICE = Config.FEEDBACK_SERVICE_URL
 
+directory = DirectoryComposer(BUSINESS_SERVICE, QUEUE_SERVICE, ttl=Config.DIRECTORY_CACHE_TTL)
+
+# Outbound calls to the services; carries the request's trace to them. It
+# is shared by every user's requests, so it must never keep cookies.
+backend = TracedSession()
+backend.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
 
 def proxy_request(service_url, path, method='GET', data=None, headers=None):
     """
@@ -60,24 +76,26 @@ def proxy_request(service_url, path, method='GET', data=None, headers=None):
     if request.content_type:
         request_headers['Content-Type'] = request.content_type
 
+    started = time.perf_counter()
     try:
         if method == 'GET':
-            response = requests.get(url, headers=request_headers, timeout=10)
+            response = backend.get(url, headers=request_headers, timeout=10)
         elif method == 'POST':
             # Only send json body if data is provided and not empty
             if data:
-                response = requests.post(url, json=data, headers=request_headers, timeout=10)
+                response = backend.post(url, json=data, headers=request_headers, timeout=10)
             else:
-                response = requests.post(url, headers=request_headers, timeout=10)
+                response = backend.post(url, headers=request_headers, timeout=10)
         elif method == 'PUT':
             if data:
-                response = requests.put(url, json=data, headers=request_headers, timeout=10)
+                response = backend.put(url, json=data, headers=request_headers, timeout=10)
             else:
-                response = requests.put(url, headers=request_headers, timeout=10)
+                response = backend.put(url, headers=request_headers, timeout=10)
         elif method == 'DELETE':
-            response = requests.delete(url, headers=request_headers, timeout=10)
+            response = backend.delete(url, headers=request_headers, timeout=10)
         else:
             return jsonify({'success': False, 'message': 'Invalid method'}), 400
+        UPSTREAM_DURATION.observe((service_url, method), time.perf_counter() - started)
 
         # Handle empty responses
         try:
@@ -89,6 +107,7 @@ def proxy_request(service_url, path, method='GET', data=None, headers=None):
             # Response is not valid JSON
             return jsonify({'success': False, 'message': 'Invalid response from service'}), 500
     except requests.exceptions.RequestException as e:
+        UPSTREAM_DURATION.observe((service_url, method), time.perf_counter() - started)
         return jsonify({'success': False, 'message': f'Service unavailable: {str(e)}'}), 503
 
 
@@ -303,7 +322,7 @@ def feedback(business_id):
         }
         
         # Submit to feedback service
-        response = requests.post(
+        response = backend.post(
             f"{FEEDBACK_SERVICE}/feedback",
             json=feedback_data,
             timeout=5
@@ -358,6 +377,12 @@ def auth_profile():
         data = request.get_json()
         return proxy_request(AUTH_SERVICE, '/auth/profile', method='PUT', data=data)
 
+@app.route('/auth/users', methods=['GET'])
+def auth_users():
+    """Resolve many user ids to names (?ids=1,2,3)"""
+    query = request.query_string.decode()
+    return proxy_request(AUTH_SERVICE, f'/auth/users?{query}', method='GET')
+
 @app.route('/auth/health', methods=['GET'])
 def auth_health():
     """Check auth service health"""
@@ -368,13 +393,57 @@ def auth_health():
 
 @app.route('/api/businesses', methods=['GET', 'POST'])
 def businesses():
-    """Get all businesses or create new business"""
+    """Get a page of businesses (?limit=&cursor=&category=) or create new business"""
     if request.method == 'GET':
-        return proxy_request(BUSINESS_SERVICE, '/api/businesses', method='GET')
+        query = request.query_string.decode()
+        path = '/api/businesses' + (f'?{query}' if query else '')
+        return proxy_request(BUSINESS_SERVICE, path, method='GET')
     else:
         data = request.get_json()
         return proxy_request(BUSINESS_SERVICE, '/api/businesses', method='POST', data=data)
 
+def compose_directory(build):
+    """Run a DirectoryComposer call, passing upstream errors through like proxy_request"""
+    try:
+        return jsonify({'success': True, 'data': build()})
+    except requests.exceptions.HTTPError as e:
+        try:
+            return e.response.json(), e.response.status_code
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid response from service'}), 500
+    except requests.exceptions.RequestException as e:
+        return jsonify({'success': False, 'message': f'Service unavailable: {str(e)}'}), 503
+
+@app.route('/api/directory', methods=['GET'])
+def business_directory():
+    """A page of businesses (?limit=&cursor=&category=) with their active queues and sizes"""
+    params = {key: request.args[key] for key in ('limit', 'cursor', 'category') if request.args.get(key)}
+    return compose_directory(lambda: directory.page(params))
+
+@app.route('/api/directory/mine', methods=['GET'])
+def my_business_directory():
+    """The signed-in owner's businesses with their active queues and sizes"""
+    authorization = request.headers.get('Authorization')
+    if not authorization and 'token' in session:
+        authorization = f"Bearer {session['token']}"
+    if not authorization:
+        return jsonify({'success': False, 'message': 'Authentication required'}), 401
+    return compose_directory(lambda: directory.owned(authorization))
+
+@app.route('/api/businesses/suggest', methods=['GET'])
+def suggest_businesses():
+    """Autocomplete business names (?q=&limit=)"""
+    query = request.query_string.decode()
+    path = '/api/businesses/suggest' + (f'?{query}' if query else '')
+    return proxy_request(BUSINESS_SERVICE, path, method='GET')
+
+@app.route('/api/businesses/nearby', methods=['GET'])
+def nearby_businesses():
+    """Businesses near a point (?lat=&lon=&radius=&include_queues=)"""
+    query = request.query_string.decode()
+    path = '/api/businesses/nearby' + (f'?{query}' if query else '')
+    return proxy_request(BUSINESS_SERVICE, path, method='GET')
+
 @app.route('/api/businesses/<int:business_id>', methods=['GET', 'PUT', 'DELETE'])
 def business_detail(business_id):
     """Get, update, or delete business"""
@@ -473,14 +542,40 @@ def my_ticket_history():
 
 @app.route('/api/feedback/business/<int:business_id>', methods=['GET'])
 def get_business_feedback(business_id):
-    """Get feedback for a business"""
-    return proxy_request(FEEDBACK_SERVICE, f'/feedback/business/{business_id}', method='GET')
+    """Get a page of feedback for a business (?limit=&cursor=)"""
+    query = request.query_string.decode()
+    path = f'/feedback/business/{business_id}' + (f'?{query}' if query else '')
+    return proxy_request(FEEDBACK_SERVICE, path, method='GET')
+
+@app.route('/api/feedback/business/<int:business_id>/export', methods=['GET'])
+def export_business_feedback(business_id):
+    """Stream all feedback for a business as JSON lines, chunk by chunk"""
+    try:
+        upstream = backend.get(f'{FEEDBACK_SERVICE}/feedback/business/{business_id}/export',
+                               params=request.args, stream=True, timeout=10)
+    except requests.exceptions.RequestException as e:
+        return jsonify({'success': False, 'message': f'Service unavailable: {str(e)}'}), 503
+    return Response(stream_with_context(upstream.iter_content(chunk_size=64 * 1024)),
+                    status=upstream.status_code,
+                    content_type=upstream.headers.get('Content-Type'))
+
+@app.route('/api/feedback/business/<int:business_id>/search', methods=['GET'])
+def search_business_feedback(business_id):
+    """Full-text search over a business's feedback (?q=&limit=&offset=)"""
+    query = request.query_string.decode()
+    return proxy_request(FEEDBACK_SERVICE, f'/feedback/business/{business_id}/search?{query}', method='GET')
 
 @app.route('/api/feedback/business/<int:business_id>/average', methods=['GET'])
 def get_business_average_rating(business_id):
     """Get average rating for a business"""
     return proxy_request(FEEDBACK_SERVICE, f'/feedback/business/{business_id}/average', method='GET')
 
+@app.route('/api/feedback/ratings', methods=['GET'])
+def get_business_ratings():
+    """Get average ratings for many businesses (?business_ids=1,2,3)"""
+    query = request.query_string.decode()
+    return proxy_request(FEEDBACK_SERVICE, f'/feedback/ratings?{query}', method='GET')
+
 @app.route('/api/queue-health', methods=['GET'])
 def queue_health():
     """Check queue service health"""
@@ -0,0 +1,135 @@
+"""
+Business directory pages composed with live queue sizes
+"""
+import threading
+import time
+
+import requests
+
+from metrics import UPSTREAM_DURATION, upstream_label
+from tracing import TracedSession
+
+
+class TTLCache:
+    """Small thread-safe cache whose entries expire after a fixed number of seconds"""
+
+    def __init__(self, ttl, max_size=5000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+                if len(self._entries) >= self.max_size:
+                    self._entries.clear()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+
+class DirectoryComposer:
+    """
+    Builds a page of businesses in which every business carries its active
+    queues and their sizes.
+
+    A page costs one call to business-service and at most one bulk call to
+    queue-service for the ids on it. Public pages and per-business queue
+    sizes are cached for `ttl` seconds, so a burst of visitors scrolling the
+    same directory shares the same few upstream calls. If queue-service is
+    unavailable the businesses are still returned and the page is marked
+    partial.
+    """
+
+    def __init__(self, business_service_url, queue_service_url, ttl=2.0, timeout=5):
+        self.business_service_url = business_service_url
+        self.queue_service_url = queue_service_url
+        self.timeout = timeout
+        self.pages = TTLCache(ttl)
+        self.sizes = TTLCache(ttl)
+        self.session = TracedSession()
+
+    def _get_json(self, url, params=None, headers=None):
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        finally:
+            UPSTREAM_DURATION.observe((upstream_label(url), 'GET'), time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    def _business_page(self, params):
+        key = tuple(sorted(params.items()))
+        page = self.pages.get(key)
+        if page is None:
+            page = self._get_json(f"{self.business_service_url}/api/businesses", params=params)['data']
+            self.pages.set(key, page)
+        return page
+
+    def _queue_sizes(self, business_ids, use_cache=True):
+        found = {}
+        missing = []
+        for business_id in business_ids:
+            cached = self.sizes.get(business_id) if use_cache else None
+            if cached is None:
+                missing.append(business_id)
+            else:
+                found[business_id] = cached
+        if missing:
+            data = self._get_json(
+                f"{self.queue_service_url}/api/queues/sizes",
+                params={'business_ids': ','.join(str(business_id) for business_id in missing)}
+            )
+            for business_id in missing:
+                size = data['data']['sizes'].get(str(business_id))
+                if size is not None:
+                    self.sizes.set(business_id, size)
+                    found[business_id] = size
+        return found
+
+    def _with_queues(self, businesses, use_cache=True):
+        """Copies of `businesses` with queue details added; returns (businesses, unavailable)"""
+        businesses = [dict(business) for business in businesses]
+        if not businesses:
+            return businesses, []
+        try:
+            sizes = self._queue_sizes([business['id'] for business in businesses], use_cache)
+        except (requests.RequestException, KeyError, ValueError) as e:
+            print(f"Warning: queue sizes unavailable for directory page: {e}")
+            return businesses, ['queue']
+        for business in businesses:
+            size = sizes.get(business['id'], {})
+            business['queues'] = size.get('active_queues', [])
+            business['waiting'] = size.get('waiting', 0)
+        return businesses, []
+
+    def page(self, params):
+        """A directory page for ?limit=&cursor=&category= plus queue sizes"""
+        page = self._business_page(params)
+        businesses, unavailable = self._with_queues(page['businesses'])
+        return {
+            'businesses': businesses,
+            'next_cursor': page.get('next_cursor'),
+            'partial': bool(unavailable),
+            'unavailable': unavailable
+        }
+
+    def owned(self, authorization):
+        """The caller's own businesses plus queue sizes, always read fresh"""
+        data = self._get_json(
+            f"{self.business_service_url}/api/businesses/my-businesses",
+            headers={'Authorization': authorization}
+        )
+        businesses, unavailable = self._with_queues(data['data']['businesses'], use_cache=False)
+        return {'businesses': businesses, 'partial': bool(unavailable), 'unavailable': unavailable}
@@ -14,6 +14,9 @@ class Config:
     QUEUE_SERVICE_URL = os.getenv('QUEUE_SERVICE_URL', 'http://queue-service:5003')
     FEEDBACK_SERVICE_URL = os.getenv('FEEDBACK_SERVICE_URL', 'http://feedback-service:5005')
 
+    # Seconds directory pages and queue sizes are reused across visitors
+    DIRECTORY_CACHE_TTL = float(os.getenv('DIRECTORY_CACHE_TTL', 2))
+
     # Session Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-change-in-production')
 
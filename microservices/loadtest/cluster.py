@@ -0,0 +1,146 @@
+"""
+Every service running locally for load tests
+
+Each service is started the way its image runs it, under gunicorn with
+shared/gunicorn.conf.py, against a database in a temporary directory and
+wired to the others on consecutive ports from `base_port`, in the usual
+order (frontend +0, auth +1, business +2, ... notification +7).
+"""
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED = os.path.join(ROOT, 'shared')
+
+# name -> port offset
+SERVICES = {
+    'frontend': 0,
+    'auth': 1,
+    'business': 2,
+    'queue': 3,
+    'ticket': 4,
+    'feedback': 5,
+    'analytics': 6,
+    'notification': 7,
+}
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][\w:]*)(?:\{(.*)\})? (\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+class Cluster:
+    """
+    Starts the services on enter and stops them on exit. Server logs and
+    databases live in `workdir`, removed afterwards unless `keep` is set.
+    """
+
+    def __init__(self, base_port=5600, web_workers=None, trace=False, keep=False,
+                 startup_timeout=60):
+        self.base_port = base_port
+        self.web_workers = web_workers
+        self.trace = trace
+        self.keep = keep
+        self.startup_timeout = startup_timeout
+        self.workdir = None
+        self.processes = {}
+
+    def url(self, name):
+        return f'http://127.0.0.1:{self.base_port + SERVICES[name]}'
+
+    def _environment(self, name):
+        env = dict(os.environ)
+        env.update(
+            PORT=str(self.base_port + SERVICES[name]),
+            DB_PATH=os.path.join(self.workdir, f'{name}.db'),
+            PYTHONPATH=os.pathsep.join([os.path.join(ROOT, f'{name}-service'), SHARED]),
+            JWT_SECRET_KEY='loadtest-secret',
+            SECRET_KEY='loadtest-secret',
+            AUTH_SERVICE_URL=self.url('auth'),
+            BUSINESS_SERVICE_URL=self.url('business'),
+            QUEUE_SERVICE_URL=self.url('queue'),
+            FEEDBACK_SERVICE_URL=self.url('feedback'),
+            ANALYTICS_SERVICE_URL=self.url('analytics'),
+            NOTIFICATION_SERVICE_URL=self.url('notification'),
+            WEB_ACCESS_LOG='',
+        )
+        env.pop('METRICS_DIR', None)  # each server gets its own
+        if self.web_workers:
+            env['WEB_WORKERS'] = str(self.web_workers)
+        if self.trace:
+            env['TRACE_FILE'] = os.path.join(self.workdir, 'spans.jsonl')
+        return env
+
+    def start(self):
+        self.workdir = tempfile.mkdtemp(prefix='loadtest-')
+        for name in SERVICES:
+            service_dir = os.path.join(ROOT, f'{name}-service')
+            log = open(os.path.join(self.workdir, f'{name}.log'), 'w')
+            self.processes[name] = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '--config', os.path.join(SHARED, 'gunicorn.conf.py'),
+                 '--pythonpath', os.path.join(service_dir, 'app'), 'app:app'],
+                cwd=service_dir, env=self._environment(name), stdout=log, stderr=subprocess.STDOUT,
+                start_new_session=True
+            )
+            log.close()
+        deadline = time.monotonic() + self.startup_timeout
+        for name in SERVICES:
+            self._wait_ready(name, deadline)
+        return self
+
+    def _wait_ready(self, name, deadline):
+        while time.monotonic() < deadline:
+            if self.processes[name].poll() is not None:
+                break
+            try:
+                requests.get(f'{self.url(name)}/metrics', timeout=2)
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        with open(os.path.join(self.workdir, f'{name}.log')) as f:
+            tail = f.read()[-2000:]
+        self.stop()
+        raise RuntimeError(f'{name}-service did not start:\n{tail}')
+
+    def stop(self):
+        for process in self.processes.values():
+            if process.poll() is None:
+                os.killpg(process.pid, signal.SIGTERM)
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+        self.processes = {}
+        if self.workdir and not self.keep:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def metrics(self, name):
+        """A service's /metrics as a list of (metric, labels dict, value)"""
+        text = requests.get(f'{self.url(name)}/metrics', timeout=10).text
+        return parse_metrics(text)
+
+
+def parse_metrics(text):
+    samples = []
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            labels = {key: value.replace('\\"', '"').replace('\\\\', '\\')
+                      for key, value in _LABEL.findall(labels or '')}
+            samples.append((name, labels, float(value)))
+    return samples
@@ -0,0 +1,386 @@
+"""
+End-to-end load test of the queue flow through the frontend gateway.
+
+Starts every service (see cluster.py), sets up owners with businesses and
+queues, then for `--duration` seconds drives open-loop traffic through
+the gateway:
+
+- customers arrive as a Poisson process (`--arrival-rate` per second),
+  sign up or, once some have been served, log back in, and join a queue
+  picked with Zipf-like popularity (`--skew`) across `--queues` queues;
+- every waiting customer polls their ticket page every `--poll-interval`
+  seconds; a `--cancel-rate` share of them give up after an exponential
+  patience (`--patience` seconds on average) and cancel;
+- the owner of each queue calls serve-next at exponential intervals,
+  `--service-rate` customers per second per queue.
+
+Reports throughput and p50/p95/p99 latency per endpoint, what happened to
+the customers, and SQLite lock waits per service from /metrics: writes
+that took at least 50 ms (all but a slow disk's worth of that is waiting
+for another writer) and statements that failed with "database is locked".
+
+    python loadtest/queue_flow.py --duration 60 --arrival-rate 20 --queues 40
+"""
+import argparse
+import heapq
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cluster import Cluster
+
+# db_query_duration_seconds bucket bound above which a write counts as a lock wait
+LOCK_WAIT_SECONDS = 0.05
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+PASSWORD = 'loadtest-pass'
+
+
+class Scheduler:
+    """Runs callables at given monotonic times on a thread pool"""
+
+    def __init__(self, workers):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='client')
+        self._heap = []
+        self._order = itertools.count()
+        self._wakeup = threading.Condition()
+        self.running = True
+        self.lag = []
+
+    def at(self, when, fn, *args):
+        with self._wakeup:
+            if self.running:
+                heapq.heappush(self._heap, (when, next(self._order), fn, args))
+                self._wakeup.notify()
+
+    def after(self, delay, fn, *args):
+        self.at(time.monotonic() + delay, fn, *args)
+
+    def run_until(self, end):
+        while True:
+            with self._wakeup:
+                now = time.monotonic()
+                if now >= end:
+                    self.running = False
+                    self._heap.clear()
+                    break
+                if not self._heap or self._heap[0][0] > now:
+                    timeout = end - now if not self._heap else min(end, self._heap[0][0]) - now
+                    self._wakeup.wait(timeout)
+                    continue
+                when, _order, fn, args = heapq.heappop(self._heap)
+            self.pool.submit(self._run, when, fn, args)
+        self.pool.shutdown(wait=True)
+
+    def _run(self, when, fn, args):
+        self.lag.append(time.monotonic() - when)
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"Warning: client action failed: {e!r}", file=sys.stderr)
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, elapsed, ok):
+        with self.lock:
+            self.latencies.setdefault(endpoint, []).append(elapsed)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class Gateway:
+    """Timed calls to the frontend gateway, labelled by endpoint"""
+
+    def __init__(self, base_url, stats, pool_size):
+        self.base_url = base_url
+        self.stats = stats
+        self.session = requests.Session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+
+    def call(self, endpoint, method, path, token=None, body=None, expected=(200, 201)):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', json=body,
+                                            headers=headers, timeout=30)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, None
+        if endpoint:
+            self.stats.record(endpoint, time.perf_counter() - started, status in expected)
+        if response is None:
+            return None, None
+        try:
+            return status, response.json()
+        except ValueError:
+            return status, None
+
+    def signup_and_login(self, email, measured=True):
+        label = (lambda name: name) if measured else (lambda name: None)
+        self.call(label('POST /auth/signup'), 'POST', '/auth/signup', body={
+            'full_name': email.split('@')[0], 'email': email,
+            'password': PASSWORD, 'confirm_password': PASSWORD,
+        })
+        return self.login(email, label('POST /auth/login'))
+
+    def login(self, email, endpoint='POST /auth/login'):
+        status, body = self.call(endpoint, 'POST', '/auth/login',
+                                 body={'email': email, 'password': PASSWORD})
+        return body['data']['token'] if status == 200 else None
+
+
+class QueueFlow:
+    def __init__(self, gateway, scheduler, args):
+        self.gateway = gateway
+        self.scheduler = scheduler
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.queues = []
+        self.weights = []
+        self.returning = []
+        self.counts = {'arrived': 0, 'joined': 0, 'served': 0, 'cancelled': 0, 'join_failed': 0,
+                       'serve_empty': 0}
+        self.joined_at = {}
+        self.waits = []
+        self.lock = threading.Lock()
+        self._emails = itertools.count()
+
+    def random(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def expovariate(self, rate):
+        with self.rng_lock:
+            return self.rng.expovariate(rate)
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] += 1
+
+    # ---- setup (not measured) ----
+
+    def setup(self):
+        args = self.args
+        owners = []
+        for index in range(args.owners):
+            token = self.gateway.signup_and_login(f'owner{index}@loadtest.local', measured=False)
+            if not token:
+                raise RuntimeError('owner signup failed')
+            owners.append(token)
+        for index in range(args.queues):
+            token = owners[index % len(owners)]
+            status, body = self.gateway.call(None, 'POST', '/api/businesses', token, {
+                'name': f'Loadtest Business {index}', 'category': 'Bank',
+                'address': f'{index} Main St', 'description': 'Load test',
+            })
+            if status != 201:
+                raise RuntimeError(f'business create failed: {status} {body}')
+            status, body = self.gateway.call(None, 'POST', '/api/queues', token, {
+                'business_id': body['data']['business_id'], 'name': f'Counter {index}',
+                'avg_service_time': 5,
+            })
+            if status != 201:
+                raise RuntimeError(f'queue create failed: {status} {body}')
+            self.queues.append((body['data']['queue_id'], token))
+        # Zipf-like popularity: the k-th queue is chosen in proportion to 1 / k^skew
+        self.weights = list(itertools.accumulate(
+            1 / (rank ** args.skew) for rank in range(1, len(self.queues) + 1)
+        ))
+
+    def start(self):
+        self.scheduler.after(self.expovariate(self.args.arrival_rate), self.arrive)
+        for queue_id, token in self.queues:
+            self.scheduler.after(self.expovariate(self.args.service_rate), self.serve, queue_id, token)
+
+    # ---- customers ----
+
+    def arrive(self):
+        self.scheduler.after(self.expovariate(self.args.arrival_rate), self.arrive)
+        self.count('arrived')
+        email = None
+        with self.lock:
+            if self.returning and self.rng.random() < self.args.returning:
+                email = self.returning.pop(self.rng.randrange(len(self.returning)))
+        if email:
+            token = self.gateway.login(email)
+        else:
+            email = f'customer{next(self._emails)}@loadtest.local'
+            token = self.gateway.signup_and_login(email)
+        if not token:
+            return
+        pick = self.random() * self.weights[-1]
+        queue_id = self.queues[next(i for i, w in enumerate(self.weights) if w >= pick)][0]
+        status, body = self.gateway.call('POST /api/queues/{id}/join', 'POST',
+                                         f'/api/queues/{queue_id}/join', token)
+        if status != 201:
+            self.count('join_failed')
+            return
+        self.count('joined')
+        ticket_id = body['data']['ticket_id']
+        with self.lock:
+            self.joined_at[ticket_id] = time.monotonic()
+        give_up = None
+        if self.random() < self.args.cancel_rate:
+            give_up = time.monotonic() + self.expovariate(1 / self.args.patience)
+        self.scheduler.after(self.args.poll_interval, self.poll, email, token, ticket_id, give_up)
+
+    def poll(self, email, token, ticket_id, give_up):
+        status, body = self.gateway.call('GET /api/tickets/{id}', 'GET', f'/api/tickets/{ticket_id}',
+                                         token)
+        if status == 200 and body['data']['ticket']['status'] != 'active':
+            self.leave(email, ticket_id)
+            return
+        if give_up is not None and time.monotonic() >= give_up:
+            status, _ = self.gateway.call('POST /api/tickets/{id}/cancel', 'POST',
+                                          f'/api/tickets/{ticket_id}/cancel', token)
+            if status == 200:
+                self.count('cancelled')
+                self.leave(email, ticket_id)
+                return
+        self.scheduler.after(self.args.poll_interval, self.poll, email, token, ticket_id, give_up)
+
+    def leave(self, email, ticket_id):
+        with self.lock:
+            self.joined_at.pop(ticket_id, None)
+            self.returning.append(email)
+
+    # ---- owners ----
+
+    def serve(self, queue_id, token):
+        self.scheduler.after(self.expovariate(self.args.service_rate), self.serve, queue_id, token)
+        status, body = self.gateway.call('POST /api/queues/{id}/serve-next', 'POST',
+                                         f'/api/queues/{queue_id}/serve-next', token,
+                                         expected=(200, 400))
+        if status == 200:
+            self.count('served')
+            ticket_id = body['data']['served_ticket']['ticket_id']
+            with self.lock:
+                joined = self.joined_at.get(ticket_id)
+                if joined is not None:
+                    self.waits.append(time.monotonic() - joined)
+        elif status == 400:
+            self.count('serve_empty')
+
+
+def lock_waits(samples):
+    """(writes over LOCK_WAIT_SECONDS, statements failed as locked) from /metrics samples"""
+    slow = locked = 0
+    for name, labels, value in samples:
+        statement = labels.get('statement', '').lstrip().upper()
+        if name == 'db_query_errors_total' and labels.get('error') == 'locked':
+            locked += value
+        elif statement.startswith(WRITE_PREFIXES):
+            if name == 'db_query_duration_seconds_count':
+                slow += value
+            elif name == 'db_query_duration_seconds_bucket' and float(labels['le']) == LOCK_WAIT_SECONDS:
+                slow -= value
+    return int(slow), int(locked)
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--duration', type=float, default=60, help='seconds of measured load')
+    parser.add_argument('--arrival-rate', type=float, default=10, help='customers per second')
+    parser.add_argument('--queues', type=int, default=20)
+    parser.add_argument('--owners', type=int, default=5)
+    parser.add_argument('--service-rate', type=float, default=0.6,
+                        help='customers served per second per queue')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent of queue popularity')
+    parser.add_argument('--poll-interval', type=float, default=2.0)
+    parser.add_argument('--cancel-rate', type=float, default=0.15,
+                        help='share of customers who give up and cancel')
+    parser.add_argument('--patience', type=float, default=30, help='mean seconds before giving up')
+    parser.add_argument('--returning', type=float, default=0.5,
+                        help='share of arrivals that log back in rather than sign up')
+    parser.add_argument('--clients', type=int, default=64, help='concurrent client threads')
+    parser.add_argument('--web-workers', type=int, help='gunicorn workers per service')
+    parser.add_argument('--base-port', type=int, default=5600)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--trace', action='store_true', help='record spans (kept with --keep)')
+    parser.add_argument('--keep', action='store_true', help='keep databases, logs and spans')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    with Cluster(args.base_port, args.web_workers, trace=args.trace, keep=args.keep) as cluster:
+        print(f"services up on ports {args.base_port}-{args.base_port + 7}, files in {cluster.workdir}")
+        stats = Stats()
+        scheduler = Scheduler(args.clients)
+        flow = QueueFlow(Gateway(cluster.url('frontend'), stats, args.clients), scheduler, args)
+        flow.setup()
+        before = {name: lock_waits(cluster.metrics(name)) for name in ('auth', 'business', 'queue')}
+
+        print(f"{args.queues} queues, {args.arrival_rate:g} arrivals/s, "
+              f"{args.service_rate:g} served/s per queue, {args.duration:g}s")
+        started = time.monotonic()
+        flow.start()
+        scheduler.run_until(started + args.duration)
+        elapsed = time.monotonic() - started
+
+        after = {name: lock_waits(cluster.metrics(name)) for name in before}
+
+    report = {'duration': elapsed, 'endpoints': {}, 'customers': dict(flow.counts),
+              'lock_waits': {}}
+    print(f"\n{'endpoint':<36}{'requests':>9}{'req/s':>8}{'errors':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    total = 0
+    for endpoint, latencies in sorted(stats.latencies.items()):
+        ordered = sorted(latencies)
+        total += len(ordered)
+        row = {
+            'requests': len(ordered), 'per_second': len(ordered) / elapsed,
+            'errors': stats.errors.get(endpoint, 0),
+            'p50_ms': percentile(ordered, 0.5) * 1000, 'p95_ms': percentile(ordered, 0.95) * 1000,
+            'p99_ms': percentile(ordered, 0.99) * 1000,
+        }
+        report['endpoints'][endpoint] = row
+        print(f"{endpoint:<36}{row['requests']:>9}{row['per_second']:>8.1f}{row['errors']:>8}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+    print(f"{'total':<36}{total:>9}{total / elapsed:>8.1f}")
+    report['requests_per_second'] = total / elapsed
+
+    waits = sorted(flow.waits)
+    report['customers']['wait_p50_s'] = percentile(waits, 0.5)
+    report['customers']['wait_p95_s'] = percentile(waits, 0.95)
+    lag = sorted(scheduler.lag)
+    report['client_lag_p99_ms'] = percentile(lag, 0.99) * 1000
+    counts = flow.counts
+    print(f"\ncustomers: {counts['arrived']} arrived, {counts['joined']} joined "
+          f"({counts['join_failed']} failed), {counts['served']} served, {counts['cancelled']} cancelled; "
+          f"wait p50 {report['customers']['wait_p50_s']:.1f}s p95 {report['customers']['wait_p95_s']:.1f}s")
+    print(f"serve-next on an empty queue: {counts['serve_empty']}")
+    print(f"client scheduling lag p99: {report['client_lag_p99_ms']:.1f} ms"
+          + ('  (clients saturated: raise --clients)' if report['client_lag_p99_ms'] > 100 else ''))
+
+    print(f"\nSQLite lock waits (writes >= {LOCK_WAIT_SECONDS * 1000:.0f} ms / failed as locked):")
+    for name in before:
+        slow = after[name][0] - before[name][0]
+        locked = after[name][1] - before[name][1]
+        report['lock_waits'][name] = {'slow_writes': slow, 'locked_errors': locked}
+        print(f"  {name}-service: {slow} / {locked}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
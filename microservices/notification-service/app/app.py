@@ -4,21 +4,50 @@ import os
 import sys
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from models import NotificationStore
 from routes import init_routes
+from dispatcher import DEFAULT_HANDLERS, EmailHandler, NotificationDispatcher
 from db.init_db import init_database
+from metrics import instrument
+from tracing import trace_app
+from serving import on_worker_start
+from smtp_pool import SMTPConnectionPool
 
 DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '../db/notifications.db'))
 PORT = int(os.getenv('NOTIFICATION_SERVICE_PORT', 5007))
+DISPATCHER_ENABLED = os.getenv('NOTIFICATION_DISPATCHER_ENABLED', 'true').lower() == 'true'
+DISPATCHER_WORKERS = int(os.getenv('NOTIFICATION_DISPATCHER_WORKERS', 8))
+SMTP_SERVER = os.getenv('SMTP_SERVER', '')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 587))
+SMTP_USERNAME = os.getenv('SMTP_USERNAME', '')
+SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
+SMTP_FROM = os.getenv('SMTP_FROM', '') or SMTP_USERNAME
+SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'true').lower() == 'true'
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 4))
 
 app = Flask(__name__)
 CORS(app)
+instrument(app)
+trace_app(app, 'notification-service')
 
 init_database(DB_PATH)
 
 notif_model = NotificationStore(DB_PATH)
-notif_bp = init_routes(notif_model)
+handlers = dict(DEFAULT_HANDLERS)
+if SMTP_SERVER:
+    # Real delivery: SMTP failures are retried with backoff, then dead-lettered
+    smtp_pool = SMTPConnectionPool(SMTP_SERVER, SMTP_PORT, username=SMTP_USERNAME,
+                                   password=SMTP_PASSWORD, size=SMTP_POOL_SIZE,
+                                   use_tls=SMTP_USE_TLS)
+    handlers['email'] = EmailHandler(smtp_pool, SMTP_FROM)
+dispatcher = NotificationDispatcher(notif_model, handlers=handlers, workers=DISPATCHER_WORKERS)
+if DISPATCHER_ENABLED:
+    # Each worker runs a dispatcher; they share the work by claiming batches
+    on_worker_start(dispatcher.start)
+
+notif_bp = init_routes(notif_model, dispatcher)
 app.register_blueprint(notif_bp, url_prefix='/')
 
 @app.route('/')
@@ -0,0 +1,305 @@
+import heapq
+import random
+import smtplib
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+
+from metrics import REGISTRY, counter, histogram
+from models import TIMESTAMP_FORMAT, to_db_timestamp, utc_now
+
+# Registered with the shared registry so /notifications/outbox/metrics and
+# /metrics report every gunicorn worker's deliveries, not just one worker's.
+DELIVERIES = counter(
+    "notification_deliveries_total", "Outbox delivery attempts by outcome", ("outcome",)
+)
+DELIVERY_LATENCY = histogram(
+    "notification_delivery_latency_seconds", "Seconds from when a notification was due to its delivery",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600),
+)
+
+
+class PermanentDeliveryError(Exception):
+    """Raised by a channel handler for a failure retrying cannot fix; the row goes straight to 'dead'"""
+
+
+def log_handler(notification: dict) -> bool:
+    """Default channel handler for channels with no provider configured (email without SMTP_SERVER)"""
+    print(
+        f"[notification-service] {notification['channel']} -> user "
+        f"{notification['user_id']}: {notification['message']}"
+    )
+    return True
+
+
+DEFAULT_HANDLERS = {
+    "email": log_handler,
+    "sms": log_handler,
+    "push": log_handler,
+}
+
+
+class EmailHandler:
+    """
+    Delivers "email" notifications to their recipient address over pooled,
+    authenticated SMTP connections (see shared/smtp_pool.py). Failures raise,
+    so the dispatcher retries them with backoff and dead-letters them in the
+    end; a missing address or one the server rejects outright (5xx) is
+    permanent and dead-lettered at once.
+    """
+
+    def __init__(self, pool, sender: str, subject: str = "Queue Update"):
+        self.pool = pool
+        self.sender = sender
+        self.subject = subject
+
+    def __call__(self, notification: dict) -> bool:
+        recipient = notification.get("recipient")
+        if not recipient:
+            raise PermanentDeliveryError(f"no email address for user {notification['user_id']}")
+        msg = MIMEText(notification["message"])
+        msg["Subject"] = self.subject
+        msg["From"] = self.sender
+        msg["To"] = recipient
+        try:
+            self.pool.send_message(msg)
+        except smtplib.SMTPRecipientsRefused as e:
+            if all(code >= 500 for code, _message in e.recipients.values()):
+                raise PermanentDeliveryError(f"recipient refused: {e.recipients}") from e
+            raise
+        return True
+
+
+class NotificationDispatcher:
+    """
+    Delivers notifications stored with status='scheduled' once they are due.
+
+    Upcoming notifications (due within `lookahead` seconds) are kept in a
+    min-heap ordered by scheduled_for, so the loop sleeps exactly until the
+    next one is due instead of polling the table. When something is due the
+    dispatcher claims due rows from the database in batches (see
+    NotificationStore.claim_due), so several workers or pods can run side by
+    side without sending anything twice. Each claimed batch is delivered
+    through the channel handlers on a thread pool and its outcome written back
+    in one transaction.
+
+    The notifications table doubles as a transactional outbox: producers only
+    insert a row and return. A failed delivery is rescheduled with exponential
+    backoff and jitter (scheduled_for holds the next attempt time) until
+    `max_attempts` is reached, after which the row is moved to status 'dead'.
+    A PermanentDeliveryError, or a channel with no handler, moves it there
+    on the first attempt.
+    """
+
+    def __init__(self, store, handlers=None, workers: int = 8, batch_size: int = 500,
+                 poll_interval: float = 5.0, lookahead: float = 60.0,
+                 max_upcoming: int = 50000, claim_timeout: float = 300.0,
+                 max_attempts: int = 5, base_backoff: float = 2.0, max_backoff: float = 600.0):
+        self.store = store
+        self.handlers = dict(DEFAULT_HANDLERS if handlers is None else handlers)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lookahead = lookahead
+        self.max_upcoming = max_upcoming
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._heap = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="notif-dispatch")
+
+    # ---- lifecycle ----
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="notif-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def schedule(self, notification: dict):
+        """Let the timer know about a newly scheduled notification"""
+        due = notification.get("scheduled_for")
+        if not due:
+            return
+        horizon = to_db_timestamp(utc_now() + timedelta(seconds=self.lookahead))
+        if due <= horizon:
+            with self._lock:
+                heapq.heappush(self._heap, (due, notification["id"]))
+            self._wakeup.set()
+
+    def wake_now(self):
+        """Deliver whatever is already due without waiting for the next refresh"""
+        with self._lock:
+            heapq.heappush(self._heap, (to_db_timestamp(utc_now()), 0))
+        self._wakeup.set()
+
+    # ---- scheduling loop ----
+
+    def _refresh(self, now: datetime):
+        self.store.release_stale_claims(now - timedelta(seconds=self.claim_timeout))
+        upcoming = self.store.get_upcoming(now + timedelta(seconds=self.lookahead),
+                                           self.max_upcoming)
+        heapq.heapify(upcoming)
+        with self._lock:
+            self._heap = upcoming
+
+    def _seconds_until_next(self, now: datetime) -> float:
+        with self._lock:
+            if not self._heap:
+                return self.poll_interval
+            next_due = datetime.strptime(self._heap[0][0], TIMESTAMP_FORMAT)
+        return max(0.0, min(self.poll_interval, (next_due - now).total_seconds()))
+
+    def _pop_due(self, now: datetime) -> bool:
+        cutoff = to_db_timestamp(now)
+        popped = False
+        with self._lock:
+            while self._heap and self._heap[0][0] <= cutoff:
+                heapq.heappop(self._heap)
+                popped = True
+        return popped
+
+    def _run(self):
+        next_refresh = utc_now()
+        while self._running:
+            now = utc_now()
+            try:
+                if now >= next_refresh:
+                    self._refresh(now)
+                    next_refresh = now + timedelta(seconds=self.poll_interval)
+                if self._pop_due(now):
+                    self.dispatch_due(now)
+            except Exception as e:
+                print(f"[notification-service] dispatcher error: {e}")
+
+            self._wakeup.wait(self._seconds_until_next(utc_now()))
+            self._wakeup.clear()
+
+    # ---- delivery ----
+
+    def dispatch_due(self, now: datetime = None) -> int:
+        """Claim and deliver every notification due at `now`; returns how many"""
+        now = now or utc_now()
+        dispatched = 0
+        while True:
+            batch = self.store.claim_due(now, self.batch_size, uuid.uuid4().hex)
+            if not batch:
+                return dispatched
+
+            chunk_size = max(1, -(-len(batch) // self.workers))
+            chunks = [batch[i:i + chunk_size] for i in range(0, len(batch), chunk_size)]
+            sent, failed = [], []
+            for chunk_sent, chunk_failed in self._executor.map(self._deliver, chunks):
+                sent.extend(chunk_sent)
+                failed.extend(chunk_failed)
+
+            retries, dead = [], []
+            for notification, error, permanent in failed:
+                attempt = (notification.get("attempts") or 0) + 1
+                if permanent or attempt >= self.max_attempts:
+                    dead.append((notification["id"], error))
+                else:
+                    retries.append((notification["id"], self.next_attempt_at(attempt), error))
+            self.store.mark_dispatched([n["id"] for n in sent], retries, dead)
+            self._record(sent, len(retries), len(dead))
+            dispatched += len(batch)
+
+            if len(batch) < self.batch_size:
+                return dispatched
+
+    def next_attempt_at(self, attempt: int) -> datetime:
+        """Exponential backoff with full jitter for the given attempt number"""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** (attempt - 1))
+        return utc_now() + timedelta(seconds=random.uniform(0, delay))
+
+    def _deliver(self, notifications):
+        sent, failed = [], []
+        for notification in notifications:
+            handler = self.handlers.get(notification["channel"])
+            if handler is None:
+                failed.append((notification, f"no handler for channel {notification['channel']!r}",
+                               True))
+                continue
+            permanent = False
+            try:
+                ok = handler(notification)
+                error = None if ok else "handler reported failure"
+            except PermanentDeliveryError as e:
+                print(f"[notification-service] {notification['channel']} delivery failed for good: {e}")
+                ok, error, permanent = False, str(e), True
+            except Exception as e:
+                print(f"[notification-service] {notification['channel']} delivery failed: {e}")
+                ok, error = False, str(e)
+            if ok:
+                sent.append(notification)
+            else:
+                failed.append((notification, error, permanent))
+        return sent, failed
+
+    # ---- metrics ----
+
+    def _record(self, sent, retried: int, dead: int):
+        now = utc_now()
+        latencies = []
+        for notification in sent:
+            # Measured from when the message was due, not from when it was queued
+            try:
+                due = max(notification["created_at"], notification.get("scheduled_for") or "")
+                due = datetime.strptime(due, TIMESTAMP_FORMAT)
+            except (KeyError, TypeError, ValueError):
+                continue
+            latencies.append((now - due).total_seconds())
+        for outcome, amount in (("delivered", len(sent)), ("retried", retried), ("dead_lettered", dead)):
+            if amount:
+                DELIVERIES.inc((outcome,), amount)
+        for seconds in latencies:
+            DELIVERY_LATENCY.observe((), seconds)
+
+    def metrics(self) -> dict:
+        """
+        Delivery counters and latency summed over every worker since start.
+        Percentiles are the upper bound of the histogram bucket holding them
+        (None past the last bucket).
+        """
+        totals = REGISTRY.collect()
+        deliveries = totals.get(DELIVERIES.name, {})
+        counters = {
+            outcome: deliveries.get((outcome,), 0)
+            for outcome in ("delivered", "retried", "dead_lettered")
+        }
+        latency = {}
+        series = totals.get(DELIVERY_LATENCY.name, {}).get(())
+        if series and sum(series[:-1]):
+            for pct in (50, 95, 99):
+                latency[f"p{pct}_under"] = _quantile_bound(series, pct / 100)
+            latency["mean"] = series[-1] / sum(series[:-1])
+        counters["delivery_latency_seconds"] = latency
+        return counters
+
+
+def _quantile_bound(series, fraction):
+    """Upper bound of the latency bucket holding the given quantile, None if past the last"""
+    target = fraction * sum(series[:-1])
+    cumulative = 0
+    for bound, count in zip(DELIVERY_LATENCY.buckets, series):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return None
@@ -1,5 +1,27 @@
+import os
 import sqlite3
-from datetime import datetime
+import sys
+import uuid
+from datetime import datetime, timezone
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
+from database import BUSY_TIMEOUT
+
+# Same layout as SQLite's CURRENT_TIMESTAMP, so stored times compare as text
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_db_timestamp(value) -> str:
+    """Normalize a datetime or ISO-8601 string to a UTC TIMESTAMP_FORMAT string"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
 
 
 class NotificationStore:
@@ -7,55 +29,283 @@ class NotificationStore:
         self.db_path = db_path
 
     def _conn(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT)
         conn.row_factory = sqlite3.Row
         return conn
 
-    def send_notification(self, user_id: int, channel: str, message: str):
+    def _enqueue(self, user_id: int, channel: str, message: str, due: str,
+                 idempotency_key: str = None, recipient: str = None):
+        """
+        Add one notification to the outbox. A repeated idempotency_key
+        returns the row stored the first time instead of adding another.
+        `recipient` is the channel address (an email address for "email").
+        """
         conn = self._conn()
         cur = conn.cursor()
         cur.execute(
             """
-            INSERT INTO notifications (user_id, channel, message, status)
-            VALUES (?, ?, ?, 'sent')
+            INSERT OR IGNORE INTO notifications
+                (user_id, channel, message, status, scheduled_for, idempotency_key, recipient)
+            VALUES (?, ?, ?, 'scheduled', ?, ?, ?)
             """,
-            (user_id, channel, message),
+            (user_id, channel, message, due, idempotency_key, recipient),
         )
         conn.commit()
-        new_id = cur.lastrowid
-        cur.execute("SELECT * FROM notifications WHERE id = ?", (new_id,))
+        if cur.rowcount:
+            cur.execute("SELECT * FROM notifications WHERE id = ?", (cur.lastrowid,))
+        else:
+            cur.execute("SELECT * FROM notifications WHERE idempotency_key = ?", (idempotency_key,))
         row = cur.fetchone()
         conn.close()
         return dict(row) if row else None
 
-    def schedule_notification(self, user_id: int, channel: str, message: str, scheduled_for: str):
+    def send_notification(self, user_id: int, channel: str, message: str,
+                          idempotency_key: str = None, recipient: str = None):
+        """Enqueue for immediate delivery; the dispatcher sends it"""
+        return self._enqueue(user_id, channel, message, to_db_timestamp(utc_now()),
+                             idempotency_key, recipient)
+
+    def schedule_notification(self, user_id: int, channel: str, message: str, scheduled_for: str,
+                              idempotency_key: str = None, recipient: str = None):
+        return self._enqueue(user_id, channel, message, to_db_timestamp(scheduled_for),
+                             idempotency_key, recipient)
+
+    def create_batch(self, items, scheduled_for=None):
+        """
+        Persist many (user_id, channel, message[, idempotency_key[, recipient]])
+        notifications in a single transaction and return their ids in input
+        order. They are stored as 'scheduled' (due now unless `scheduled_for`
+        is given) so the dispatcher delivers them. Items whose key was seen
+        before resolve to the existing row; a key repeated within the batch
+        counts once.
+        """
+        if not items:
+            return []
+        due = to_db_timestamp(scheduled_for or utc_now())
+        keys = [item[3] if len(item) > 3 else None for item in items]
+        if any(keys):
+            seen = set()
+            items = [item for item, key in zip(items, keys)
+                     if not key or not (key in seen or seen.add(key))]
+            keys = [item[3] if len(item) > 3 else None for item in items]
+        recipients = [item[4] if len(item) > 4 else None for item in items]
         conn = self._conn()
         cur = conn.cursor()
-        cur.execute(
+
+        if not any(keys):
+            cur.executemany(
+                """
+                INSERT INTO notifications
+                    (user_id, channel, message, status, scheduled_for, recipient)
+                VALUES (?, ?, ?, 'scheduled', ?, ?)
+                """,
+                [(user_id, channel, message, due, recipient)
+                 for (user_id, channel, message, *_), recipient in zip(items, recipients)],
+            )
+            # The write lock is held until commit, so the batch got consecutive ids
+            last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+            conn.commit()
+            conn.close()
+            return list(range(last_id - len(items) + 1, last_id + 1))
+
+        keys = [key or uuid.uuid4().hex for key in keys]
+        cur.executemany(
             """
-            INSERT INTO notifications (user_id, channel, message, status, scheduled_for)
-            VALUES (?, ?, ?, 'scheduled', ?)
+            INSERT OR IGNORE INTO notifications
+                (user_id, channel, message, status, scheduled_for, idempotency_key, recipient)
+            VALUES (?, ?, ?, 'scheduled', ?, ?, ?)
             """,
-            (user_id, channel, message, scheduled_for),
+            [(user_id, channel, message, due, key, recipient)
+             for (user_id, channel, message, *_), key, recipient in zip(items, keys, recipients)],
         )
         conn.commit()
-        new_id = cur.lastrowid
-        cur.execute("SELECT * FROM notifications WHERE id = ?", (new_id,))
+        ids_by_key = {}
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            cur.execute(
+                f"SELECT id, idempotency_key FROM notifications "
+                f"WHERE idempotency_key IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            ids_by_key.update((r["idempotency_key"], r["id"]) for r in cur.fetchall())
+        conn.close()
+        return [ids_by_key[key] for key in keys]
+
+    def get_notifications_for_user(self, user_id: int, limit: int = 50, before=None):
+        """
+        One page of a user's inbox: delivered notifications, newest first.
+        Scheduled, in-flight and dead ones are not shown. `before` is the
+        (created_at, id) of the last row of the previous page; the
+        (user_id, status, created_at, id) index makes every page cost the
+        same however many notifications the user has.
+        """
+        conn = self._conn()
+        cur = conn.cursor()
+        if before is None:
+            cur.execute(
+                """
+                SELECT * FROM notifications
+                WHERE user_id = ? AND status = 'sent'
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+                """,
+                (user_id, limit),
+            )
+        else:
+            cur.execute(
+                """
+                SELECT * FROM notifications
+                WHERE user_id = ? AND status = 'sent' AND (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+                """,
+                (user_id, before[0], before[1], limit),
+            )
+        rows = cur.fetchall()
+        conn.close()
+        return [dict(r) for r in rows]
+
+    def get_unread_count(self, user_id: int) -> int:
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute("SELECT unread FROM notification_counters WHERE user_id = ?", (user_id,))
+        row = cur.fetchone()
+        conn.close()
+        return row["unread"] if row else 0
+
+    def mark_read(self, notification_id: int):
+        """Mark one notification read; returns its row, or None if it does not exist"""
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE notifications SET read_at = CURRENT_TIMESTAMP WHERE id = ? AND read_at IS NULL",
+            (notification_id,),
+        )
+        conn.commit()
+        cur.execute("SELECT * FROM notifications WHERE id = ?", (notification_id,))
         row = cur.fetchone()
         conn.close()
         return dict(row) if row else None
 
-    def get_notifications_for_user(self, user_id: int):
+    def mark_all_read(self, user_id: int) -> int:
         conn = self._conn()
         cur = conn.cursor()
         cur.execute(
             """
-            SELECT * FROM notifications
-            WHERE user_id = ?
-            ORDER BY created_at DESC
+            UPDATE notifications SET read_at = CURRENT_TIMESTAMP
+            WHERE user_id = ? AND status = 'sent' AND read_at IS NULL
             """,
             (user_id,),
         )
+        updated = cur.rowcount
+        conn.commit()
+        conn.close()
+        return updated
+
+    # ---- dispatcher support ----
+
+    def get_upcoming(self, until: datetime, limit: int):
+        """(id, scheduled_for) of scheduled notifications due up to `until`"""
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT id, scheduled_for FROM notifications
+            WHERE status = 'scheduled' AND scheduled_for <= ?
+            ORDER BY scheduled_for
+            LIMIT ?
+            """,
+            (to_db_timestamp(until), limit),
+        )
+        rows = cur.fetchall()
+        conn.close()
+        return [(r["scheduled_for"], r["id"]) for r in rows]
+
+    def claim_due(self, now: datetime, limit: int, token: str):
+        """
+        Atomically move up to `limit` due notifications to 'dispatching' under
+        `token` and return them. SQLite serializes writers, so two workers can
+        never claim the same row.
+        """
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE notifications
+            SET status = 'dispatching', claim_token = ?, claimed_at = CURRENT_TIMESTAMP
+            WHERE id IN (
+                SELECT id FROM notifications
+                WHERE status = 'scheduled' AND scheduled_for <= ?
+                ORDER BY scheduled_for
+                LIMIT ?
+            )
+            """,
+            (token, to_db_timestamp(now), limit),
+        )
+        conn.commit()
+        cur.execute(
+            "SELECT * FROM notifications WHERE claim_token = ? AND status = 'dispatching'",
+            (token,),
+        )
         rows = cur.fetchall()
         conn.close()
         return [dict(r) for r in rows]
+
+    def mark_dispatched(self, sent_ids, retries=(), dead=()):
+        """
+        Record the outcome of a delivered batch in one transaction.
+        `retries` holds (id, next_attempt_at, error) and `dead` holds
+        (id, error); both count as an attempt. A retried row goes back to
+        'scheduled' with scheduled_for moved to its next attempt time.
+        """
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.executemany(
+            """
+            UPDATE notifications
+            SET status = 'sent', sent_at = CURRENT_TIMESTAMP, attempts = attempts + 1,
+                last_error = NULL
+            WHERE id = ?
+            """,
+            [(i,) for i in sent_ids],
+        )
+        cur.executemany(
+            """
+            UPDATE notifications
+            SET status = 'scheduled', scheduled_for = ?, attempts = attempts + 1,
+                last_error = ?, claim_token = NULL, claimed_at = NULL
+            WHERE id = ?
+            """,
+            [(to_db_timestamp(at), error, i) for i, at, error in retries],
+        )
+        cur.executemany(
+            "UPDATE notifications SET status = 'dead', attempts = attempts + 1, last_error = ? WHERE id = ?",
+            [(error, i) for i, error in dead],
+        )
+        conn.commit()
+        conn.close()
+
+    def count_by_status(self):
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute("SELECT status, COUNT(*) AS count FROM notifications GROUP BY status")
+        rows = cur.fetchall()
+        conn.close()
+        return {r["status"]: r["count"] for r in rows}
+
+    def release_stale_claims(self, older_than: datetime):
+        """Hand claims abandoned by a crashed worker back to the scheduler"""
+        conn = self._conn()
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE notifications
+            SET status = 'scheduled', claim_token = NULL, claimed_at = NULL
+            WHERE status = 'dispatching' AND claimed_at < ?
+            """,
+            (to_db_timestamp(older_than),),
+        )
+        conn.commit()
+        released = cur.rowcount
+        conn.close()
+        return released
@@ -1,7 +1,35 @@
+import string
+
 from flask import Blueprint, request, jsonify
 
+from cursors import decode_cursor, encode_cursor
+
+MAX_BATCH_SIZE = 10000
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_template(template: str):
+    """
+    Split a batch template into (literal, field name) pairs. Only plain
+    {name} placeholders are allowed: no attribute or index lookups,
+    conversions or format specs. Raises ValueError otherwise.
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if field is not None and (not field.isidentifier() or spec or conversion):
+            raise ValueError(f"unsupported placeholder {{{field}}}; use plain {{name}} fields")
+        parts.append((literal, field))
+    return parts
+
 
-def init_routes(notif_model):
+def render_template(parts, params: dict) -> str:
+    """Fill parsed template parts from params; raises KeyError for a missing field"""
+    return "".join(literal + ("" if field is None else str(params[field]))
+                   for literal, field in parts)
+
+
+def init_routes(notif_model, dispatcher=None):
     bp = Blueprint("notification_bp", __name__)
 
     @bp.route("/health", methods=["GET"])
@@ -19,8 +47,67 @@ def init_routes(notif_model):
         if user_id is None or not message:
             return jsonify({"error": "user_id and message are required"}), 400
 
-        notif = notif_model.send_notification(int(user_id), channel, message)
-        return jsonify(notif), 201
+        notif = notif_model.send_notification(int(user_id), channel, message,
+                                              data.get("idempotency_key"), data.get("email"))
+        if dispatcher is not None:
+            dispatcher.wake_now()
+        return jsonify(notif), 202
+
+    # POST /notifications/send-batch
+    # Body: {"notifications": [{"user_id", "channel", "message", "idempotency_key"?, "email"?}, ...]}
+    #   or: {"template": "Hi {name}", "channel": "push",
+    #        "recipients": [{"user_id": 1, "params": {"name": "Ana"}, "email"?}, ...]}
+    @bp.route("/notifications/send-batch", methods=["POST"])
+    def send_batch():
+        data = request.get_json() or {}
+        items = []
+
+        if "template" in data:
+            try:
+                parts = parse_template(str(data.get("template") or ""))
+            except ValueError as e:
+                return jsonify({"error": f"template could not be parsed: {e}"}), 400
+            channel = data.get("channel", "email")
+            recipients = data.get("recipients") or []
+            if not isinstance(recipients, list):
+                return jsonify({"error": "recipients must be a list"}), 400
+            for recipient in recipients:
+                if not isinstance(recipient, dict):
+                    recipient = {"user_id": recipient}
+                params = recipient.get("params") or {}
+                if not isinstance(params, dict):
+                    return jsonify({"error": "params must be an object"}), 400
+                try:
+                    message = render_template(parts, params)
+                except KeyError as e:
+                    return jsonify({"error": f"template could not be rendered: missing {e}"}), 400
+                items.append((recipient.get("user_id"), recipient.get("channel", channel), message,
+                              recipient.get("idempotency_key"), recipient.get("email")))
+        else:
+            notifications = data.get("notifications") or []
+            if not isinstance(notifications, list) or \
+                    not all(isinstance(n, dict) for n in notifications):
+                return jsonify({"error": "notifications must be a list of objects"}), 400
+            for n in notifications:
+                items.append((n.get("user_id"), n.get("channel", "email"), n.get("message", ""),
+                              n.get("idempotency_key"), n.get("email")))
+
+        if not items:
+            return jsonify({"error": "notifications or template with recipients required"}), 400
+        if len(items) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"at most {MAX_BATCH_SIZE} notifications per batch"}), 400
+        try:
+            items = [(int(user_id), channel, message, key, email)
+                     for user_id, channel, message, key, email in items]
+        except (TypeError, ValueError):
+            return jsonify({"error": "every notification needs a numeric user_id"}), 400
+        if not all(item[2] for item in items):
+            return jsonify({"error": "every notification needs a message"}), 400
+
+        ids = notif_model.create_batch(items)
+        if dispatcher is not None:
+            dispatcher.wake_now()
+        return jsonify({"count": len(ids), "ids": ids, "status": "scheduled"}), 201
 
     # POST /notifications/schedule
     @bp.route("/notifications/schedule", methods=["POST"])
@@ -34,13 +121,60 @@ def init_routes(notif_model):
         if user_id is None or not message or not scheduled_for:
             return jsonify({"error": "user_id, message, scheduled_for required"}), 400
 
-        notif = notif_model.schedule_notification(int(user_id), channel, message, scheduled_for)
+        try:
+            notif = notif_model.schedule_notification(int(user_id), channel, message, scheduled_for,
+                                                      data.get("idempotency_key"), data.get("email"))
+        except ValueError:
+            return jsonify({"error": "scheduled_for must be an ISO-8601 timestamp"}), 400
+
+        if dispatcher is not None:
+            dispatcher.schedule(notif)
         return jsonify(notif), 201
 
-    # GET /notifications/user/{userId}
+    # GET /notifications/user/{userId}?limit=50&cursor=...
     @bp.route("/notifications/user/<int:user_id>", methods=["GET"])
     def user_notifications(user_id):
-        notifs = notif_model.get_notifications_for_user(user_id)
-        return jsonify({"notifications": notifs}), 200
+        limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        before = None
+        if request.args.get("cursor"):
+            try:
+                before = decode_cursor(request.args["cursor"])
+            except ValueError:
+                return jsonify({"error": "invalid cursor"}), 400
+
+        notifs = notif_model.get_notifications_for_user(user_id, limit, before)
+        next_cursor = encode_cursor(notifs[-1]) if len(notifs) == limit else None
+        return jsonify({
+            "notifications": notifs,
+            "next_cursor": next_cursor,
+            "unread_count": notif_model.get_unread_count(user_id),
+        }), 200
+
+    # GET /notifications/user/{userId}/unread-count
+    @bp.route("/notifications/user/<int:user_id>/unread-count", methods=["GET"])
+    def unread_count(user_id):
+        return jsonify({"user_id": user_id, "unread_count": notif_model.get_unread_count(user_id)}), 200
+
+    # POST /notifications/user/{userId}/read-all
+    @bp.route("/notifications/user/<int:user_id>/read-all", methods=["POST"])
+    def mark_all_read(user_id):
+        updated = notif_model.mark_all_read(user_id)
+        return jsonify({"user_id": user_id, "marked_read": updated, "unread_count": 0}), 200
+
+    # POST /notifications/{id}/read
+    @bp.route("/notifications/<int:notification_id>/read", methods=["POST"])
+    def mark_read(notification_id):
+        notif = notif_model.mark_read(notification_id)
+        if notif is None:
+            return jsonify({"error": "notification not found"}), 404
+        return jsonify(notif), 200
+
+    # GET /notifications/outbox/metrics
+    @bp.route("/notifications/outbox/metrics", methods=["GET"])
+    def outbox_metrics():
+        metrics = dispatcher.metrics() if dispatcher is not None else {}
+        metrics["outbox"] = notif_model.count_by_status()
+        return jsonify(metrics), 200
 
     return bp
@@ -1,5 +1,9 @@
 import os
 import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
+from database import enable_wal
 
 DB_FILENAME = "notifications.db"
 
@@ -18,6 +22,9 @@ def init_database(db_path=None):
     conn = sqlite3.connect(db_path)
     cur = conn.cursor()
 
+    # WAL lets the dispatcher claim batches while request handlers keep writing
+    enable_wal(conn)
+
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS notifications (
@@ -27,11 +34,124 @@ def init_database(db_path=None):
             message TEXT NOT NULL,
             status TEXT NOT NULL,
             scheduled_for TEXT,
+            claim_token TEXT,
+            claimed_at TIMESTAMP,
+            sent_at TIMESTAMP,
+            idempotency_key TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            read_at TIMESTAMP,
+            recipient TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         """
     )
 
+    # Columns added after the first release of the table
+    columns = [row[1] for row in cur.execute("PRAGMA table_info(notifications)")]
+    for name, decl in (
+        ("claim_token", "TEXT"),
+        ("claimed_at", "TIMESTAMP"),
+        ("sent_at", "TIMESTAMP"),
+        ("idempotency_key", "TEXT"),
+        ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+        ("last_error", "TEXT"),
+        ("read_at", "TIMESTAMP"),
+        ("recipient", "TEXT"),
+    ):
+        if name not in columns:
+            cur.execute(f"ALTER TABLE notifications ADD COLUMN {name} {decl}")
+
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_notifications_status_scheduled
+        ON notifications(status, scheduled_for)
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notifications_claim_token ON notifications(claim_token)"
+    )
+    cur.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_notifications_idempotency_key
+        ON notifications(idempotency_key)
+        """
+    )
+
+    # Inbox pages list delivered notifications newest first per user with a
+    # (created_at, id) cursor
+    cur.execute("DROP INDEX IF EXISTS idx_notifications_user_created")
+    cur.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_status_created
+        ON notifications(user_id, status, created_at, id)
+        """
+    )
+
+    # One counter row per user keeps the unread count O(1). Triggers update it
+    # in the same transaction as every delivery, mark-read and delete; only
+    # delivered ('sent') notifications count, not ones still in the outbox.
+    has_counters = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notification_counters'"
+    ).fetchone()
+    # Databases from before the delivery-time triggers counted on insert
+    counted_on_insert = cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_notifications_unread_insert'"
+    ).fetchone()
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notification_counters (
+            user_id INTEGER PRIMARY KEY,
+            unread INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    if not has_counters or counted_on_insert:
+        cur.execute("DELETE FROM notification_counters")
+        cur.execute(
+            """
+            INSERT INTO notification_counters (user_id, unread)
+            SELECT user_id, SUM(read_at IS NULL) FROM notifications
+            WHERE status = 'sent'
+            GROUP BY user_id
+            """
+        )
+        for name in ("insert", "read", "delete"):
+            cur.execute(f"DROP TRIGGER IF EXISTS trg_notifications_unread_{name}")
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_sent
+        AFTER UPDATE OF status ON notifications
+        WHEN NEW.status = 'sent' AND OLD.status != 'sent' AND NEW.read_at IS NULL
+        BEGIN
+            INSERT INTO notification_counters (user_id, unread) VALUES (NEW.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET unread = unread + 1;
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_sent_read
+        AFTER UPDATE OF read_at ON notifications
+        WHEN NEW.status = 'sent' AND OLD.read_at IS NULL AND NEW.read_at IS NOT NULL
+        BEGIN
+            UPDATE notification_counters SET unread = MAX(unread - 1, 0)
+            WHERE user_id = NEW.user_id;
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_sent_delete
+        AFTER DELETE ON notifications
+        WHEN OLD.status = 'sent' AND OLD.read_at IS NULL
+        BEGIN
+            UPDATE notification_counters SET unread = MAX(unread - 1, 0)
+            WHERE user_id = OLD.user_id;
+        END
+        """
+    )
+
     conn.commit()
     conn.close()
     print(f"[notification-service] DB initialized at {db_path}")
@@ -8,18 +8,28 @@ import sys
 
 # Add parent directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from models import QueueModel, TicketModel
 from routes import init_routes
+from fanout import PositionFanout
 from db.init_db import init_database
+from metrics import instrument
+from tracing import trace_app
+from query_profile import profile_app
 
 # Configuration
 DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '../db/queue.db'))
 PORT = int(os.getenv('QUEUE_SERVICE_PORT', 5003))
+NOTIFICATION_SERVICE_URL = os.getenv('NOTIFICATION_SERVICE_URL', '')
+POSITION_FANOUT_WINDOW = float(os.getenv('POSITION_FANOUT_WINDOW', 0.5))
 
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
+instrument(app)
+trace_app(app, 'queue-service')
+profile_app(app)
 
 # Initialize database
 init_database(DB_PATH)
@@ -28,8 +38,14 @@ init_database(DB_PATH)
 queue_model = QueueModel(DB_PATH)
 ticket_model = TicketModel(DB_PATH)
 
+# Position-change notifications are only sent when a notification service is configured
+fanout = (
+    PositionFanout(NOTIFICATION_SERVICE_URL, window=POSITION_FANOUT_WINDOW)
+    if NOTIFICATION_SERVICE_URL else None
+)
+
 # Register routes
-queue_routes = init_routes(queue_model, ticket_model)
+queue_routes = init_routes(queue_model, ticket_model, fanout)
 app.register_blueprint(queue_routes, url_prefix='/api')
 
 
@@ -45,6 +61,7 @@ def index():
             'create_queue': '/api/queues [POST]',
             'get_queue': '/api/queues/<id> [GET]',
             'business_queues': '/api/queues/business/<business_id> [GET]',
+            'queue_sizes': '/api/queues/sizes?business_ids=1,2,3 [GET]',
             'update_queue': '/api/queues/<id> [PUT]',
             'delete_queue': '/api/queues/<id> [DELETE]',
             'join_queue': '/api/queues/<id>/join [POST]',
@@ -0,0 +1,86 @@
+"""
+Coalesced position-change notifications for queue mutations
+"""
+import threading
+
+import requests
+
+DEFAULT_TEMPLATE = 'Queue update: you are now number {position} in line'
+
+
+class PositionFanout:
+    """
+    Turns position changes into one notification job per queue.
+
+    Serving or cancelling a ticket moves everyone behind it. Instead of one
+    message per moved ticket, changes are buffered per queue for `window`
+    seconds (so a burst of serves collapses into a single job), keyed by
+    user so only the latest position of each recipient survives, and then
+    sent to notification-service as one batch request.
+    """
+
+    def __init__(self, notification_service_url, window=0.5, channel='push',
+                 template=DEFAULT_TEMPLATE, timeout=5):
+        self.notification_service_url = notification_service_url
+        self.window = window
+        self.channel = channel
+        self.template = template
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        self._pending = {}  # queue_id -> {user_id: position}
+        self._timers = {}
+        self._lock = threading.Lock()
+
+    def record(self, queue_id, changes, departed=None):
+        """
+        Buffer (user_id, position) changes caused by one mutation of a queue.
+        `departed` is the user who was served or left; any position still
+        buffered for them is dropped.
+        """
+        with self._lock:
+            pending = self._pending.setdefault(queue_id, {})
+            if departed is not None:
+                pending.pop(departed, None)
+            for user_id, position in changes:
+                pending[user_id] = position
+            if pending and queue_id not in self._timers:
+                timer = threading.Timer(self.window, self.flush, args=(queue_id,))
+                timer.daemon = True
+                self._timers[queue_id] = timer
+                timer.start()
+
+    def flush(self, queue_id):
+        """Send everything buffered for a queue as one batch; returns the batch size"""
+        with self._lock:
+            timer = self._timers.pop(queue_id, None)
+            pending = self._pending.pop(queue_id, None)
+        if timer is not None:
+            timer.cancel()
+        if not pending:
+            return 0
+
+        payload = {
+            'template': self.template,
+            'channel': self.channel,
+            'recipients': [
+                {'user_id': user_id, 'params': {'position': position, 'queue_id': queue_id}}
+                for user_id, position in sorted(pending.items(), key=lambda item: item[1])
+            ],
+        }
+        try:
+            response = self.session.post(
+                f"{self.notification_service_url}/notifications/send-batch",
+                json=payload,
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"Warning: position notifications for queue {queue_id} not sent: {e}")
+        return len(pending)
+
+    def flush_all(self):
+        with self._lock:
+            queue_ids = list(self._pending)
+        for queue_id in queue_ids:
+            self.flush(queue_id)
@@ -92,6 +92,27 @@ class QueueModel:
             return results[0]['size']
         return 0
 
+    def get_active_queues_for_businesses(self, business_ids):
+        """
+        Active queues with their current size for many businesses in one
+        query, as {business_id: [queue, ...]}. Businesses without active
+        queues are left out.
+        """
+        placeholders = ', '.join('?' for _ in business_ids)
+        query = f"""
+            SELECT q.id, q.business_id, q.name, q.avg_service_time, q.is_active,
+                   COUNT(h.id) AS size
+            FROM queues q
+            LEFT JOIN queue_history h ON h.queue_id = q.id AND h.status = 'active'
+            WHERE q.is_active = 1 AND q.business_id IN ({placeholders})
+            GROUP BY q.id
+            ORDER BY q.business_id, q.created_at
+        """
+        queues = {}
+        for row in self.db.execute_query(query, tuple(business_ids)):
+            queues.setdefault(row['business_id'], []).append(dict(row))
+        return queues
+
     def get_active_tickets(self, queue_id):
         """Get all active tickets in queue"""
         query = """
@@ -237,6 +258,17 @@ class TicketModel:
         except Exception as e:
             print(f"Error recalculating positions: {e}")
 
+    def get_positions_from(self, queue_id, position):
+        """Get (user_id, position) of active tickets at or behind a position"""
+        query = """
+            SELECT user_id, position
+            FROM queue_history
+            WHERE queue_id = ? AND status = 'active' AND position >= ?
+            ORDER BY position
+        """
+        results = self.db.execute_query(query, (queue_id, position))
+        return [(row['user_id'], row['position']) for row in results]
+
     def get_user_history(self, user_id, limit=50):
         """Get user's queue history with queue and business names"""
         # Note: This query doesn't join with businesses table since it's in a different service
@@ -255,6 +287,40 @@ class TicketModel:
         results = self.db.execute_query(query, (user_id, limit))
         return [dict(row) for row in results]
 
+    def get_served_history(self, queue_id, since=None, limit=1000):
+        """
+        Served tickets of a queue in the order they were called, for
+        analytics-service: the oldest `limit` called at or after `since`, or
+        the newest `limit` without it. service_seconds is the time since the
+        previous call, when this customer was already waiting then (the
+        counter was busy); otherwise it is None.
+        """
+        if since is None:
+            window = "ORDER BY leave_time DESC, id DESC LIMIT ?"
+            params = (queue_id, limit)
+        else:
+            window = "AND leave_time >= ? ORDER BY leave_time, id LIMIT ?"
+            params = (queue_id, since, limit)
+        query = f"""
+            SELECT ticket_id, join_time, leave_time,
+                   strftime('%s', leave_time) - strftime('%s', join_time) AS wait_seconds,
+                   CASE WHEN join_time <= previous_call
+                        THEN strftime('%s', leave_time) - strftime('%s', previous_call)
+                   END AS service_seconds
+            FROM (
+                SELECT id, ticket_id, join_time, leave_time,
+                       LAG(leave_time) OVER (ORDER BY leave_time, id) AS previous_call
+                FROM (
+                    SELECT id, ticket_id, join_time, leave_time
+                    FROM queue_history
+                    WHERE queue_id = ? AND status = 'completed' {window}
+                )
+            )
+            ORDER BY leave_time, id
+        """
+        results = self.db.execute_query(query, params)
+        return [dict(row) for row in results]
+
     def calculate_eta(self, queue_id, position):
         """Calculate estimated wait time"""
         # Get queue's average service time
@@ -12,10 +12,23 @@ from auth_middleware import token_required
 
 queue_bp = Blueprint('queue', __name__)
 
+MAX_BULK_BUSINESSES = 500
+MAX_HISTORY_PAGE = 5000
 
-def init_routes(queue_model, ticket_model):
+
+def init_routes(queue_model, ticket_model, fanout=None):
     """Initialize routes with models"""
 
+    def notify_positions(queue_id, removed_ticket):
+        """Hand the tickets that moved up to the coalescing fan-out"""
+        if fanout is None:
+            return
+        fanout.record(
+            queue_id,
+            ticket_model.get_positions_from(queue_id, removed_ticket['position']),
+            departed=removed_ticket['user_id']
+        )
+
     @queue_bp.route('/health', methods=['GET'])
     def health():
         """Health check endpoint"""
@@ -72,6 +85,53 @@ def init_routes(queue_model, ticket_model):
 
         return success_response(data={'queues': queues})
 
+    @queue_bp.route('/queues/sizes', methods=['GET'])
+    def get_queue_sizes():
+        """
+        Active queues, their sizes and totals for many businesses
+        (?business_ids=1,2,3)
+        """
+        try:
+            business_ids = [int(value) for value in request.args.get('business_ids', '').split(',') if value]
+        except ValueError:
+            return error_response('business_ids must be a comma-separated list of integers', 400)
+        if not business_ids:
+            return error_response('business_ids is required', 400)
+        if len(business_ids) > MAX_BULK_BUSINESSES:
+            return error_response(f'At most {MAX_BULK_BUSINESSES} business_ids per request', 400)
+
+        queues = queue_model.get_active_queues_for_businesses(business_ids)
+        sizes = {}
+        for business_id in business_ids:
+            business_queues = queues.get(business_id, [])
+            sizes[str(business_id)] = {
+                'queues': len(business_queues),
+                'waiting': sum(queue['size'] for queue in business_queues),
+                'active_queues': business_queues
+            }
+        return success_response(data={'sizes': sizes})
+
+    @queue_bp.route('/queues/<int:queue_id>/history', methods=['GET'])
+    def get_queue_history(queue_id):
+        """
+        Served tickets with wait and service times, oldest first
+        (?since=<leave_time>&limit=N); analytics-service syncs from here
+        """
+        queue = queue_model.get_queue_by_id(queue_id)
+        if not queue:
+            return error_response('Queue not found', 404)
+        try:
+            limit = min(max(1, int(request.args.get('limit', 1000))), MAX_HISTORY_PAGE)
+        except ValueError:
+            return error_response('limit must be a number', 400)
+
+        tickets = ticket_model.get_served_history(queue_id, request.args.get('since'), limit)
+        return success_response(data={
+            'queue_id': queue_id,
+            'business_id': queue['business_id'],
+            'tickets': tickets
+        })
+
     @queue_bp.route('/queues/<int:queue_id>', methods=['PUT'])
     @token_required
     def update_queue(queue_id):
@@ -160,11 +220,15 @@ def init_routes(queue_model, ticket_model):
     @token_required
     def cancel_ticket(ticket_id):
         """Cancel a ticket (leave queue)"""
+        ticket = ticket_model.get_ticket_by_id(ticket_id) if fanout else None
         success, error = ticket_model.cancel_ticket(ticket_id, request.user_id)
 
         if not success:
             return error_response(error or 'Failed to cancel ticket', 400)
 
+        if ticket and ticket['status'] == 'active':
+            notify_positions(ticket['queue_id'], ticket)
+
         return success_response(message='Ticket cancelled successfully')
 
     @queue_bp.route('/queues/<int:queue_id>/serve-next', methods=['POST'])
@@ -176,6 +240,8 @@ def init_routes(queue_model, ticket_model):
         if error:
             return error_response(error, 400)
 
+        notify_positions(queue_id, ticket)
+
         return success_response(
             data={'served_ticket': ticket},
             message='Customer served successfully'
@@ -0,0 +1,244 @@
+"""
+Benchmark for QueueModel and TicketModel operations at scale.
+
+Fills a database with `--history` finished tickets spread over many queues
+and users, then for each queue depth in `--depths` builds a queue with that
+many waiting customers and times every model operation the API uses:
+joining, serving and cancelling (front, middle and back of the queue), and
+the reads behind the ticket, queue and history pages. Operations that
+change the queue are undone after each timed call (untimed), so every run
+sees the same depth.
+
+Results are written as JSON and compared against a stored baseline, per
+operation and depth; `growth` is the measured exponent between the two
+largest depths (about 0 for constant time, 1 for linear).
+
+    python benchmarks/bench_models.py                         # compare with baseline_models.json
+    python benchmarks/bench_models.py --save-baseline         # record a new baseline
+    python benchmarks/bench_models.py --depths 10,1000,100000 --history 10000000 --json out.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../app'))
+from db.init_db import init_database
+from models import QueueModel, TicketModel
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_models.json')
+# Finished tickets per user in the generated history
+VISITS_PER_USER = 25
+# User ids of waiting customers start here, clear of the history users
+WAITING_USERS = 100_000_000
+
+
+def fill_history(db_path, rows, queues):
+    """`rows` finished tickets, round-robin over queues and users, newest last"""
+    users = max(1, rows // VISITS_PER_USER)
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO queues (business_id, name, avg_service_time) VALUES (?, ?, 5)",
+        ((i + 1, f'Queue {i + 1}') for i in range(queues))
+    )
+    conn.executemany(
+        """
+        INSERT INTO queue_history (queue_id, user_id, ticket_id, position, join_time,
+                                   leave_time, wait_time, status)
+        VALUES (?, ?, ?, 1, datetime('now', ?), datetime('now', ?), 4, ?)
+        """,
+        (
+            (i % queues + 1, i % users + 1, f'history-{i}', f'-{rows - i + 300} seconds',
+             f'-{rows - i} seconds', 'cancelled' if i % 10 == 0 else 'completed')
+            for i in range(rows)
+        )
+    )
+    conn.commit()
+    conn.close()
+
+
+def fill_queue(db_path, queue_id, depth):
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO queue_history (queue_id, user_id, ticket_id, position, status) "
+        "VALUES (?, ?, ?, ?, 'active')",
+        ((queue_id, WAITING_USERS + queue_id * 1_000_000 + p, f'q{queue_id}-{p}', p)
+         for p in range(1, depth + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+class Bench:
+    def __init__(self, db_path, repeat):
+        self.queues = QueueModel(db_path)
+        self.tickets = TicketModel(db_path)
+        self.db = self.tickets.db
+        self.repeat = repeat
+        self._users = WAITING_USERS // 2
+
+    def time(self, fn, undo=None, prepare=None):
+        runs = []
+        for _ in range(self.repeat):
+            args = prepare() if prepare else ()
+            started = time.perf_counter()
+            fn(*args)
+            runs.append(time.perf_counter() - started)
+            if undo:
+                undo()
+        return {'median_ms': statistics.median(runs) * 1000, 'min_ms': min(runs) * 1000,
+                'runs': len(runs)}
+
+    def at_position(self, queue_id, position):
+        rows = self.db.execute_query(
+            "SELECT ticket_id, user_id FROM queue_history "
+            "WHERE queue_id = ? AND status = 'active' AND position = ?",
+            (queue_id, position)
+        )
+        return rows[0]['ticket_id'], rows[0]['user_id']
+
+    def join(self, queue_id):
+        """Put a new customer at the back"""
+        self._users += 1
+        self.tickets.create_ticket(queue_id, self._users)
+
+    def drop_last(self, queue_id):
+        """Remove the customer at the back without shifting anyone"""
+        self.db.execute_update(
+            "DELETE FROM queue_history WHERE id = (SELECT id FROM queue_history "
+            "WHERE queue_id = ? AND status = 'active' ORDER BY position DESC LIMIT 1)",
+            (queue_id,)
+        )
+
+    def run(self, queue_id, depth):
+        results = {}
+        results['create_ticket'] = self.time(
+            lambda: self.join(queue_id),
+            undo=lambda: self.drop_last(queue_id)
+        )
+        results['serve_next_customer'] = self.time(
+            lambda: self.tickets.serve_next_customer(queue_id),
+            undo=lambda: self.join(queue_id)
+        )
+        for where, position in (('front', 1), ('middle', (depth + 1) // 2), ('back', depth)):
+            results[f'cancel_ticket[{where}]'] = self.time(
+                lambda ticket_id, user_id: self.tickets.cancel_ticket(ticket_id, user_id),
+                undo=lambda: self.join(queue_id),
+                prepare=lambda: self.at_position(queue_id, position)
+            )
+        results['get_active_tickets'] = self.time(lambda: self.queues.get_active_tickets(queue_id))
+        results['get_queue_size'] = self.time(lambda: self.queues.get_queue_size(queue_id))
+        _ticket_id, waiting_user = self.at_position(queue_id, (depth + 1) // 2)
+        results['get_user_active_ticket'] = self.time(
+            lambda: self.tickets.get_user_active_ticket(waiting_user)
+        )
+        results['get_user_history'] = self.time(lambda: self.tickets.get_user_history(1))
+        return results
+
+
+def growth(results, depths):
+    """Exponent k in time ~ depth^k between the two largest depths, per operation"""
+    if len(depths) < 2:
+        return {}
+    low, high = depths[-2], depths[-1]
+    exponents = {}
+    for operation, timing in results[str(high)].items():
+        before = results[str(low)][operation]['min_ms']
+        exponents[operation] = round(math.log(max(timing['min_ms'], 1e-6) / max(before, 1e-6))
+                                     / math.log(high / low), 2)
+    return exponents
+
+
+def compare(report, baseline, tolerance):
+    """Print timings against the baseline; returns the number of regressions"""
+    if baseline['config']['history'] != report['config']['history']:
+        print(f"Warning: baseline was recorded with history={baseline['config']['history']}")
+    regressions = 0
+    print(f"\n{'operation':<28}{'depth':>8}{'baseline ms':>13}{'now ms':>11}{'ratio':>8}")
+    for depth, operations in report['results'].items():
+        for operation, timing in operations.items():
+            before = baseline['results'].get(depth, {}).get(operation)
+            if before is None:
+                continue
+            ratio = timing['median_ms'] / max(before['median_ms'], 1e-6)
+            flag = ''
+            if ratio > tolerance:
+                flag = '  REGRESSION'
+                regressions += 1
+            elif ratio < 1 / tolerance:
+                flag = '  faster'
+            print(f"{operation:<28}{depth:>8}{before['median_ms']:>13.3f}"
+                  f"{timing['median_ms']:>11.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark queue-service model operations')
+    parser.add_argument('--depths', default='10,100,1000,10000,100000',
+                        help='comma-separated queue depths')
+    parser.add_argument('--history', type=int, default=1_000_000,
+                        help='finished tickets already in the database (up to 10M is practical)')
+    parser.add_argument('--repeat', type=int, default=15, help='timed calls per operation and depth')
+    parser.add_argument('--json', metavar='PATH', help='write results here')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='write results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='median slowdown over baseline reported as a regression')
+    args = parser.parse_args()
+    depths = sorted(int(depth) for depth in args.depths.split(','))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'queue.db')
+        init_database(db_path)
+        queues = max(50, len(depths))
+        started = time.perf_counter()
+        fill_history(db_path, args.history, queues)
+        print(f"inserted {args.history} finished tickets over {queues} queues in "
+              f"{time.perf_counter() - started:.1f}s")
+
+        bench = Bench(db_path, args.repeat)
+        results = {}
+        for queue_id, depth in enumerate(depths, start=1):
+            fill_queue(db_path, queue_id, depth)
+            results[str(depth)] = bench.run(queue_id, depth)
+            print(f"\ndepth {depth}")
+            for operation, timing in results[str(depth)].items():
+                print(f"  {operation:<26} median={timing['median_ms']:9.3f}ms "
+                      f"best={timing['min_ms']:9.3f}ms")
+
+    report = {
+        'config': {'depths': depths, 'history': args.history, 'repeat': args.repeat,
+                   'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                   'machine': platform.machine()},
+        'results': results,
+        'growth': growth(results, depths),
+    }
+    if report['growth']:
+        print(f"\ngrowth from depth {depths[-2]} to {depths[-1]} (0 = constant, 1 = linear):")
+        for operation, exponent in report['growth'].items():
+            print(f"  {operation:<26} {exponent:5.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nbaseline written to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{regressions} regressions over {args.tolerance}x baseline")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
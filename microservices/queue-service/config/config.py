@@ -7,6 +7,8 @@ import os
 class Config:
     """Base configuration"""
     DB_PATH = os.getenv('DB_PATH', '../db/queue.db')
+    NOTIFICATION_SERVICE_URL = os.getenv('NOTIFICATION_SERVICE_URL', '')
+    POSITION_FANOUT_WINDOW = float(os.getenv('POSITION_FANOUT_WINDOW', 0.5))
 
 
 class DevelopmentConfig(Config):
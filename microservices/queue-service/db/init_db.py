@@ -48,6 +48,16 @@ def init_database(db_path):
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_queue_id ON queue_history(queue_id)
     """)
+
+    # Queue sizes count only active tickets, however long the history grows;
+    # leave_time orders the served tickets analytics-service syncs
+    cursor.execute("""
+        DROP INDEX IF EXISTS idx_queue_history_queue_status
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_queue_history_queue_status_leave
+        ON queue_history(queue_id, status, leave_time)
+    """)
     cursor.execute("""
         CREATE INDEX IF NOT EXISTS idx_user_id ON queue_history(user_id)
     """)
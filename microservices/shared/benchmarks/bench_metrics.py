@@ -0,0 +1,121 @@
+"""
+Benchmark for the cost of metrics.instrument and the timed SQLite cursor.
+
+Times the RequestMetrics middleware around a bare WSGI app, the same
+requests through a small Flask app with and without instrument(app), and
+the same indexed lookup through a plain connection and a TimedConnection,
+and reports the added microseconds per request and per query.
+
+    python shared/benchmarks/bench_metrics.py [iterations]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from flask import Flask, jsonify
+from werkzeug.test import EnvironBuilder
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from database import TimedConnection  # noqa: E402
+from metrics import RequestMetrics, instrument  # noqa: E402
+
+
+def make_app(instrumented):
+    app = Flask(__name__)
+    if instrumented:
+        instrument(app)
+
+    @app.route('/api/items/<int:item_id>')
+    def item(item_id):
+        return jsonify({'id': item_id})
+
+    return app
+
+
+def per_call(fn, iterations, runs=7):
+    """Best of several runs, in microseconds per call"""
+    best = float('inf')
+    for _ in range(runs):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return best / iterations * 1e6
+
+
+def start_response(status, headers, exc_info=None):
+    pass
+
+
+def bench_middleware(iterations):
+    app = make_app(False)
+    environ = EnvironBuilder(path='/api/items/7').get_environ()
+    environ['metrics.route'] = '/api/items/<int:item_id>'
+
+    def bare(environ, start_response):
+        start_response('200 OK', [])
+        return [b'']
+
+    wrapped = RequestMetrics(bare)
+    return {False: per_call(lambda: bare(environ, start_response), iterations),
+            True: per_call(lambda: wrapped(environ, start_response), iterations)}
+
+
+def bench_requests(iterations):
+    environ = EnvironBuilder(path='/api/items/7').get_environ()
+    results = {}
+    for instrumented in (False, True):
+        app = make_app(instrumented)
+
+        def call():
+            b''.join(app(dict(environ), start_response))
+
+        call()
+        results[instrumented] = per_call(call, iterations)
+    return results
+
+
+def bench_queries(iterations):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        setup = sqlite3.connect(path)
+        setup.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, category TEXT)")
+        setup.executemany("INSERT INTO items (name, category) VALUES (?, ?)",
+                          [(f'item {i}', 'Bank') for i in range(10000)])
+        setup.commit()
+        setup.close()
+        for timed in (False, True):
+            conn = sqlite3.connect(path, factory=TimedConnection if timed else sqlite3.Connection)
+            conn.row_factory = sqlite3.Row
+
+            def query():
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM items WHERE id = ?", (4242,))
+                return cursor.fetchall()
+
+            query()
+            results[timed] = per_call(query, iterations)
+            conn.close()
+    return results
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    middleware = bench_middleware(iterations)
+    print(f"wsgi     bare  {middleware[False]:7.2f} us  instrumented {middleware[True]:7.2f} us  "
+          f"overhead {middleware[True] - middleware[False]:5.2f} us")
+    requests = bench_requests(iterations)
+    print(f"request  plain {requests[False]:7.2f} us  instrumented {requests[True]:7.2f} us  "
+          f"overhead {requests[True] - requests[False]:5.2f} us")
+    queries = bench_queries(iterations)
+    print(f"query    plain {queries[False]:7.2f} us  timed        {queries[True]:7.2f} us  "
+          f"overhead {queries[True] - queries[False]:5.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""
+Benchmark for choosing gunicorn worker counts per CPU limit.
+
+Starts business-service under shared/gunicorn.conf.py with a seeded
+database, once per (workers, threads) combination, and drives it with
+concurrent keep-alive clients reading directory pages, single businesses
+and suggestions. A CPU limit below the machine's core count is imposed
+the way a CFS quota behaves: the server's process group is stopped for
+the rest of every 100 ms period once it has had its share. Reports
+requests per second and latency percentiles; the best worker count for
+each limit is what serving.recommended_workers encodes.
+
+    python shared/benchmarks/bench_workers.py [seconds] [cpus ...]
+"""
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SHARED = os.path.dirname(HERE)
+SERVICE = os.path.join(SHARED, '..', 'business-service')
+PORT = 5890
+CLIENTS = 16
+PERIOD = 0.1
+
+
+def seed(db_path, count=5000):
+    sys.path.insert(0, SERVICE)
+    from db.init_db import init_database
+    import sqlite3
+    init_database(db_path)
+    rng = random.Random(7)
+    words = ['central', 'city', 'green', 'royal', 'family', 'express', 'golden', 'corner',
+             'market', 'north', 'dental', 'beauty', 'kitchen', 'savings', 'plaza']
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO businesses (name, description, category, address, owner_id) VALUES (?, ?, ?, ?, 1)",
+        [(' '.join(rng.sample(words, 2)).title(), 'x' * 200,
+          rng.choice(['Bank', 'Clinic', 'Salon', 'Restaurant']), f'{i} Main St')
+         for i in range(count)]
+    )
+    conn.commit()
+    conn.close()
+    return count
+
+
+def start_server(db_path, workers, threads):
+    env = dict(os.environ,
+               DB_PATH=db_path, PORT=str(PORT), WEB_WORKERS=str(workers), WEB_THREADS=str(threads),
+               WEB_ACCESS_LOG='', OUTBOX_RELAY_ENABLED='false',
+               PYTHONPATH=os.pathsep.join([SERVICE, SHARED]))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', os.path.join(SHARED, 'gunicorn.conf.py'),
+         '--pythonpath', os.path.join(SERVICE, 'app'), 'app:app'],
+        cwd=SERVICE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', PORT), timeout=0.2).close()
+            requests.get(f'http://127.0.0.1:{PORT}/api/health', timeout=5)
+            return server
+        except (OSError, requests.RequestException):
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError('server did not start')
+
+
+def throttle(server, cpus, stop):
+    """Let the server's process group run for `cpus` of every period, like a CFS quota"""
+    run_for = PERIOD * cpus
+    while not stop.is_set():
+        time.sleep(run_for)
+        os.killpg(server.pid, signal.SIGSTOP)
+        time.sleep(PERIOD - run_for)
+        os.killpg(server.pid, signal.SIGCONT)
+
+
+def load(count, seconds):
+    base = f'http://127.0.0.1:{PORT}/api'
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    end = time.monotonic() + seconds
+
+    def client(seed_value):
+        rng = random.Random(seed_value)
+        session = requests.Session()
+        mine = []
+        while time.monotonic() < end:
+            roll = rng.random()
+            if roll < 0.4:
+                url = f'{base}/businesses?limit=20'
+            elif roll < 0.8:
+                url = f'{base}/businesses/{rng.randint(1, count)}'
+            else:
+                url = f'{base}/businesses/suggest?q={rng.choice(["ce", "gol", "ma", "no", "sav"])}'
+            started = time.perf_counter()
+            try:
+                ok = session.get(url, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            if ok:
+                mine.append(time.perf_counter() - started)
+            else:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), errors[0]
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    cores = os.cpu_count() or 1
+    limits = [float(value) for value in sys.argv[2:]] or [0.2, 0.5, 1.0, float(cores)]
+    sys.path.insert(0, SHARED)
+    from serving import recommended_workers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'business.db')
+        count = seed(db_path)
+        print(f"{count} businesses, {CLIENTS} keep-alive clients, {seconds:.0f}s per run, {cores} core(s)")
+
+        for cpus in sorted(set(limits)):
+            print(f"\nCPU limit {cpus:g} (recommended_workers -> {recommended_workers(cpus)})")
+            for workers in sorted({1, 2, max(1, int(cpus)), max(1, int(cpus)) * 2 + 1}):
+                for threads in (1, 4, 8):
+                    server = start_server(db_path, workers, threads)
+                    stop = threading.Event()
+                    throttler = None
+                    if cpus < cores:
+                        throttler = threading.Thread(target=throttle, args=(server, cpus, stop), daemon=True)
+                        throttler.start()
+                    try:
+                        latencies, errors = load(count, seconds)
+                    finally:
+                        stop.set()
+                        if throttler:
+                            throttler.join()
+                        os.killpg(server.pid, signal.SIGCONT)
+                        os.killpg(server.pid, signal.SIGTERM)
+                        server.wait()
+                    if not latencies:
+                        print(f"  {workers} worker(s) x {threads} thread(s): no successful requests")
+                        continue
+                    pick = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+                    print(f"  {workers} worker(s) x {threads} thread(s): {len(latencies) / seconds:7.1f} req/s  "
+                          f"p50 {pick(0.5):6.1f}ms  p99 {pick(0.99):7.1f}ms  errors {errors}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Following row changes recorded by triggers
+"""
+import threading
+import time
+
+
+class ChangeFeed:
+    """
+    Reads the keys that triggers append to a change table, so each process
+    can refresh its own in-memory copy of rows that another process changed.
+
+    The table needs an increasing integer `id` and a key column. poll()
+    returns the keys changed since the previous call, each once, and asks
+    the database at most once every `interval` seconds, so it can sit on a
+    hot read path.
+    """
+
+    def __init__(self, db, table, key_column, interval=1.0):
+        self.db = db
+        self.table = table
+        self.key_column = key_column
+        self.interval = interval
+        self._last_id = 0
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def mark_current(self):
+        """Skip everything recorded so far; call before (re)loading the full copy"""
+        rows = self.db.execute_query(f"SELECT COALESCE(MAX(id), 0) AS id FROM {self.table}")
+        with self._lock:
+            self._last_id = rows[0]['id']
+            self._next_check = time.monotonic() + self.interval
+
+    def poll(self):
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_check:
+                return []
+            self._next_check = now + self.interval
+            rows = self.db.execute_query(
+                f"SELECT id, {self.key_column} AS key FROM {self.table} WHERE id > ? ORDER BY id",
+                (self._last_id,)
+            )
+            if rows:
+                self._last_id = rows[-1]['id']
+        return list(dict.fromkeys(row['key'] for row in rows))
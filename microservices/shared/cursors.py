@@ -0,0 +1,23 @@
+"""
+Opaque keyset-pagination cursors shared by the list endpoints
+
+A cursor encodes the (created_at, id) of the last row on a page; the next
+page continues strictly after it in (created_at DESC, id DESC) order.
+"""
+import base64
+import binascii
+
+
+def encode_cursor(row):
+    """Cursor pointing just past `row` (needs its created_at and id)"""
+    raw = f"{row['created_at']}|{row['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return created_at, int(row_id)
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
@@ -1,29 +1,207 @@
 """
 Shared database utilities for microservices
 """
+import os
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 
+import query_profile
+import tracing
+from metrics import QUERY_DURATION, QUERY_ERRORS, statement_label
+
+# Seconds a writer waits for another process's write lock before giving up;
+# well under the server's WEB_TIMEOUT, so a stuck lock fails the request
+# instead of getting the worker killed
+BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', 5))
+
+
+def enable_wal(conn):
+    """
+    Put a database in WAL mode. Several server workers share each file;
+    WAL keeps their reads off the write lock.
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor that records each statement in db_query_duration_seconds, and
+    as a span of the current trace.
+
+    A query's time runs from execute until its rows are fetched: it is
+    recorded after fetchall, when fetchone/fetchmany run out, or when the
+    cursor runs another statement or is closed; everything else is
+    recorded as soon as execute returns.
+    """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        return self._timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(super().executemany, sql, seq_of_parameters)
+
+    def _timed(self, run, sql, parameters):
+        self._record()
+        label = statement_label(sql)
+        started = time.perf_counter()
+        try:
+            run(sql, parameters)
+        except sqlite3.Error as e:
+            error = 'locked' if 'locked' in str(e) else type(e).__name__
+            QUERY_ERRORS.inc((label, error))
+            self._finished(label, started, time.perf_counter() - started, {'error': error})
+            raise
+        elapsed = time.perf_counter() - started
+        if self.description is None:
+            self._finished(label, started, elapsed)
+        else:
+            self._pending = [label, started, elapsed]
+        return self
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._record(time.perf_counter() - started)
+        return rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(time.perf_counter() - started, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(time.perf_counter() - started, len(rows) < (size or self.arraysize))
+        return rows
+
+    def close(self):
+        self._record()
+        super().close()
+
+    def __del__(self):
+        self._record()
+
+    def _fetched(self, elapsed, exhausted):
+        if self._pending is not None:
+            self._pending[2] += elapsed
+            if exhausted:
+                self._record()
+
+    def _record(self, extra=0.0):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            self._finished(pending[0], pending[1], pending[2] + extra)
+
+    def _finished(self, label, started, elapsed, attrs=None):
+        QUERY_DURATION.observe((label,), elapsed)
+        tracing.record(label, 'db', started, elapsed, attrs)
+
+
+class ProfiledCursor(TimedCursor):
+    """
+    TimedCursor that also hands statements slower than SLOW_QUERY_MS to
+    query_profile, with the SQL and parameters needed to explain them.
+    Only used when SLOW_QUERY_MS is set.
+    """
+
+    _statement = None
+
+    def execute(self, sql, parameters=()):
+        self._record()
+        self._statement = (sql, parameters)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._record()
+        # The parameters may be an iterator that is gone by the time it is slow
+        self._statement = (sql, None)
+        return super().executemany(sql, seq_of_parameters)
+
+    def _finished(self, label, started, elapsed, attrs=None):
+        super()._finished(label, started, elapsed, attrs)
+        if elapsed >= query_profile.THRESHOLD and self._statement is not None:
+            sql, parameters = self._statement
+            query_profile.slow_statement(self.connection, label, sql, parameters, elapsed)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including conn.execute's, are TimedCursors"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class ProfiledConnection(TimedConnection):
+    """TimedConnection whose cursors are ProfiledCursors"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+
+# Plain timing unless the slow-query log is on, so it costs nothing when off
+CONNECTION_FACTORY = TimedConnection if query_profile.THRESHOLD is None else ProfiledConnection
+
 
 class Database:
-    """Database connection manager"""
+    """
+    Database connection manager.
+
+    Each thread keeps one connection and reuses it, so a request does not
+    pay for opening the database and re-reading its schema on every query.
+    Connections belong to the process that opened them: after a fork (a
+    preforked server worker) the first use opens a fresh one. Databases are
+    switched to WAL so readers in other workers never wait on a writer.
+    Every statement is timed for /metrics (see TimedCursor), and checked
+    against the slow-query log when SLOW_QUERY_MS is set (see
+    query_profile).
+    """
 
     def __init__(self, db_path):
         self.db_path = db_path
+        self._local = threading.local()
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT, factory=CONNECTION_FACTORY)
+            conn.row_factory = sqlite3.Row
+            enable_wal(conn)
+            local.conn, local.pid, local.depth = conn, os.getpid(), 0
+        return local.conn
 
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """
+        Context manager for database connections. The outermost block
+        commits on success and rolls back on error; nested blocks in the
+        same thread share its transaction.
+        """
+        conn = self._connection()
+        local = self._local
+        local.depth += 1
         try:
             yield conn
-            conn.commit()
+            if local.depth == 1:
+                conn.commit()
         except Exception as e:
-            conn.rollback()
+            if local.depth == 1:
+                conn.rollback()
             raise e
         finally:
-            conn.close()
+            local.depth -= 1
 
     def execute_query(self, query, params=None):
         """Execute a query and return results"""
@@ -0,0 +1,70 @@
+"""
+Gunicorn settings shared by every service.
+
+    gunicorn --config shared/gunicorn.conf.py --pythonpath app app:app
+
+Everything is tuned through the environment:
+
+    PORT                    listen port (set in each service's Dockerfile)
+    WEB_WORKERS             worker processes (default: from the CPU limit,
+                            see serving.recommended_workers)
+    WEB_THREADS             threads per worker for the gthread class (4)
+    WEB_WORKER_CLASS        gthread, sync, or gevent (needs gevent installed)
+    WEB_WORKER_CONNECTIONS  concurrent clients per gevent worker (100)
+    WEB_TIMEOUT             seconds a request may run before its worker is
+                            killed and replaced (30)
+    WEB_GRACEFUL_TIMEOUT    seconds in-flight requests get to finish on
+                            reload (SIGHUP) or shutdown (SIGTERM) (30)
+    WEB_KEEPALIVE           seconds to hold idle keep-alive connections (5)
+    WEB_MAX_REQUESTS        recycle a worker after this many requests, with
+                            10% jitter; 0 disables (0)
+    METRICS_DIR             where workers share their /metrics counts
+                            (a fresh temporary directory)
+
+The app is imported once in the master (preload_app) so database setup and
+migrations run a single time before workers fork. Per-process resources are
+registered with serving.on_worker_start and started in post_fork.
+"""
+import os
+import sys
+import tempfile
+
+# Read by metrics at import, so it must be set before the app is loaded
+os.environ.setdefault('METRICS_DIR', tempfile.mkdtemp(prefix='metrics-'))
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import metrics  # noqa: E402
+import serving  # noqa: E402
+
+serving.enable_prefork()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = serving.web_workers()
+worker_class = os.getenv('WEB_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('WEB_THREADS', 4))
+worker_connections = int(os.getenv('WEB_WORKER_CONNECTIONS', 100))
+timeout = int(os.getenv('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('WEB_KEEPALIVE', 5))
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = os.getenv('WEB_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+
+def on_starting(server):
+    metrics.clear_directory()
+
+
+def post_fork(server, worker):
+    serving.worker_started()
+
+
+def worker_exit(server, worker):
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    metrics.process_exited(worker.pid)
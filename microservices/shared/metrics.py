@@ -0,0 +1,355 @@
+"""
+Prometheus metrics shared by the services
+
+Every service calls instrument(app) once, which records per-route request
+latency, status codes and in-flight requests and serves everything in the
+Prometheus text format on /metrics. shared.Database records per-statement
+query timings into the same registry.
+
+Under the preforked server each worker keeps its own counters and writes
+them to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds; /metrics adds up
+every worker's file, and the counts of workers that have exited, so a
+scrape sees the whole container whichever worker answers it.
+"""
+import bisect
+import json
+import os
+import re
+import threading
+import time
+
+from flask import Response, request
+
+from serving import on_worker_start
+
+METRICS_DIR = os.getenv('METRICS_DIR')
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 1))
+
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                 0.05, 0.1, 0.25, 1, 5)
+
+# Where the matched route template is left for RequestMetrics
+ROUTE_KEY = 'metrics.route'
+
+# Counts of workers that have exited, folded together by the server
+EXITED_FILE = 'exited.json'
+
+
+class Metric:
+    """A named family of series, one per tuple of label values"""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value if not isinstance(value, list) else list(value)]
+                    for labels, value in self._series.items()]
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram(Metric):
+    """
+    Bucketed observations. Each series is a list of per-bucket counts (the
+    last one for values above every bound) followed by the running sum.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def clear(self):
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in list(self._metrics.items())}
+
+    def collect(self):
+        """This process's series merged with the other workers' files"""
+        totals = {name: {} for name in self._metrics}
+        _merge(totals, self.snapshot())
+        if METRICS_DIR:
+            own = f'{os.getpid()}.json'
+            for filename in _process_files():
+                if filename != own:
+                    _merge(totals, _read(filename))
+        return totals
+
+    def render(self):
+        lines = []
+        totals = self.collect()
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(totals[name].items()):
+                pairs = list(zip(metric.labelnames, labels))
+                if metric.kind != 'histogram':
+                    lines.append(f'{name}{_labels(pairs)} {_number(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ('+Inf',), value):
+                    cumulative += count
+                    bound = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f'{name}_bucket{_labels(pairs + [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{_labels(pairs)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(pairs)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+REQUEST_DURATION = histogram(
+    'http_request_duration_seconds', 'Time to handle a request, by route template',
+    ('route', 'method')
+)
+REQUESTS = counter('http_requests_total', 'Requests handled, by route template and status',
+                   ('route', 'method', 'status'))
+IN_FLIGHT = gauge('http_requests_in_flight', 'Requests currently being handled')
+QUERY_DURATION = histogram(
+    'db_query_duration_seconds', 'Time to run a statement and fetch its rows',
+    ('statement',), QUERY_BUCKETS
+)
+QUERY_ERRORS = counter('db_query_errors_total', 'Statements that failed, by error',
+                       ('statement', 'error'))
+UPSTREAM_DURATION = histogram(
+    'upstream_request_duration_seconds', 'Time waiting on calls to other services',
+    ('upstream', 'method')
+)
+
+
+_WHITESPACE = re.compile(r'\s+')
+_PLACEHOLDERS = re.compile(r'\?(?:\s*,\s*\?)+')
+_statements = {}
+
+
+def statement_label(sql):
+    """
+    SQL text on one line with runs of placeholders collapsed, so an IN list
+    of any length is one series. Cached, as the same few strings repeat.
+    """
+    label = _statements.get(sql)
+    if label is None:
+        label = _PLACEHOLDERS.sub('?, ...', _WHITESPACE.sub(' ', sql).strip())
+        if len(_statements) < 2000:
+            _statements[sql] = label
+    return label
+
+
+def upstream_label(url):
+    """scheme://host:port of a URL"""
+    return '/'.join(url.split('/', 3)[:3])
+
+
+def instrument(app):
+    """Record request metrics for `app` and serve them on /metrics"""
+    app.wsgi_app = RequestMetrics(app.wsgi_app)
+    app.url_value_preprocessor(_remember_route)
+    app.add_url_rule('/metrics', 'metrics', lambda: Response(
+        REGISTRY.render(), mimetype='text/plain; version=0.0.4'
+    ))
+    on_worker_start(_worker_started)
+    return app
+
+
+class RequestMetrics:
+    """
+    WSGI middleware timing each request until its response is ready.
+
+    Plain WSGI rather than Flask's before/after request hooks, which cost
+    several microseconds each. The matched route template is left in the
+    environ by _remember_route.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        status = []
+
+        def capture(status_line, headers, exc_info=None):
+            status.append(status_line)
+            return start_response(status_line, headers, exc_info)
+
+        started = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            return self.wsgi_app(environ, capture)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            route = environ.get(ROUTE_KEY, 'unmatched')
+            method = environ.get('REQUEST_METHOD', 'GET')
+            REQUEST_DURATION.observe((route, method), elapsed)
+            REQUESTS.inc((route, method, status[0].split(' ', 1)[0] if status else '500'))
+
+
+def _remember_route(endpoint, values):
+    # URL value preprocessors are the one per-request callback Flask makes
+    # without wrapping; this one only records which rule matched
+    rule = request.url_rule
+    if rule is not None:
+        request.environ[ROUTE_KEY] = rule.rule
+
+
+def _worker_started():
+    # Counts inherited from the preloading server would repeat in every worker
+    REGISTRY.clear()
+    if METRICS_DIR:
+        threading.Thread(target=_flush_forever, name='metrics-flush', daemon=True).start()
+
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        flush()
+
+
+def flush():
+    """Write this process's series to METRICS_DIR"""
+    if METRICS_DIR:
+        _write(f'{os.getpid()}.json', REGISTRY.snapshot())
+
+
+def process_exited(pid):
+    """
+    Fold an exited worker's counts into EXITED_FILE so they keep adding up.
+    Its gauges are dropped: nothing is in flight in a dead process.
+    """
+    if not METRICS_DIR:
+        return
+    filename = f'{pid}.json'
+    snapshot = _read(filename)
+    try:
+        os.remove(os.path.join(METRICS_DIR, filename))
+    except OSError:
+        pass
+    if not snapshot:
+        return
+    totals = {}
+    _merge(totals, _read(EXITED_FILE))
+    _merge(totals, {name: series for name, series in snapshot.items()
+                    if not isinstance(REGISTRY._metrics.get(name), Gauge)})
+    _write(EXITED_FILE, {name: [[list(labels), value] for labels, value in series.items()]
+                         for name, series in totals.items()})
+
+
+def clear_directory():
+    """Forget files left by an earlier server"""
+    if METRICS_DIR:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        for filename in _process_files():
+            os.remove(os.path.join(METRICS_DIR, filename))
+
+
+def _merge(totals, snapshot):
+    for name, series in snapshot.items():
+        merged = totals.setdefault(name, {})
+        for labels, value in series:
+            labels = tuple(labels)
+            current = merged.get(labels)
+            if current is None:
+                merged[labels] = list(value) if isinstance(value, list) else value
+            elif isinstance(value, list):
+                merged[labels] = [a + b for a, b in zip(current, value)]
+            else:
+                merged[labels] = current + value
+
+
+def _process_files():
+    try:
+        return [name for name in os.listdir(METRICS_DIR) if name.endswith('.json')]
+    except OSError:
+        return []
+
+
+def _read(filename):
+    try:
+        with open(os.path.join(METRICS_DIR, filename)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(filename, snapshot):
+    path = os.path.join(METRICS_DIR, filename)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (f'{key}="{_escape(value)}"' for key, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,141 @@
+"""
+Slow-query log and statement report
+
+Off unless SLOW_QUERY_MS is set. When it is, shared.Database opens its
+connections with ProfiledCursor: each statement that takes at least
+SLOW_QUERY_MS milliseconds (until its rows are fetched) is counted in
+db_slow_queries_total, and logged to stderr along with the plan SQLite
+chose for it (EXPLAIN QUERY PLAN, run with the same parameters). To keep a
+hot slow statement from flooding the log, each is logged at most once
+every SLOW_QUERY_LOG_INTERVAL seconds per worker; every occurrence is
+still counted.
+
+profile_app(app) serves the report on /debug/queries: the top statements
+by total time, from db_query_duration_seconds across all workers, with
+their slow counts and the latest plan this worker captured.
+
+    SLOW_QUERY_MS=20 gunicorn ...
+    curl 'localhost:5003/debug/queries?limit=10&sort=mean'
+
+When SLOW_QUERY_MS is unset connections use the plain TimedCursor and
+nothing here runs.
+"""
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from flask import request
+
+from metrics import QUERY_DURATION, REGISTRY, counter
+from response import error_response, success_response
+
+THRESHOLD = float(os.environ['SLOW_QUERY_MS']) / 1000 if os.getenv('SLOW_QUERY_MS') else None
+LOG_INTERVAL = float(os.getenv('SLOW_QUERY_LOG_INTERVAL', 60))
+
+SLOW_QUERIES = counter('db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS',
+                       ('statement',))
+
+SORT_KEYS = ('total', 'mean', 'count', 'slow')
+
+# statement label -> latest logged occurrence: {'seconds', 'plan', 'at'}
+_captured = {}
+_captured_lock = threading.Lock()
+
+
+def slow_statement(conn, label, sql, parameters, elapsed):
+    """Count a statement over THRESHOLD and log it with its plan, rate-limited per statement"""
+    SLOW_QUERIES.inc((label,))
+    now = time.time()
+    with _captured_lock:
+        previous = _captured.get(label)
+        if previous is not None and now - previous['at'] < LOG_INTERVAL:
+            return
+        # Claimed before explaining, so concurrent threads do not explain it twice
+        _captured[label] = {'seconds': elapsed, 'plan': None, 'at': now}
+    plan = explain(conn, sql, parameters)
+    with _captured_lock:
+        _captured[label].update(plan=plan)
+    lines = '\n'.join(f'    {line}' for line in plan or ['(no plan)'])
+    print(f"Slow query {elapsed * 1000:.1f} ms: {label}\n{lines}", file=sys.stderr, flush=True)
+
+
+def explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN output as indented lines, like the sqlite3 shell, or None"""
+    if parameters is None:
+        return None
+    try:
+        # A plain cursor, so the EXPLAIN is neither timed nor profiled itself
+        cursor = conn.cursor(sqlite3.Cursor)
+        try:
+            rows = cursor.execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+        finally:
+            cursor.close()
+    except (sqlite3.Error, ValueError):
+        return None
+    depth = {0: -1}
+    lines = []
+    for node, parent, _unused, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+
+def profile_app(app):
+    """Serve the statement report on /debug/queries, if profiling is on"""
+    if THRESHOLD is not None:
+        app.add_url_rule('/debug/queries', 'debug_queries', report)
+    return app
+
+
+def report():
+    """
+    Top statements: ?limit=N (default 20) and ?sort=total|mean|count|slow.
+    Times are in seconds; p95_under is the histogram bucket bound the 95th
+    percentile falls under.
+    """
+    sort = request.args.get('sort', 'total')
+    if sort not in SORT_KEYS:
+        return error_response(f"sort must be one of: {', '.join(SORT_KEYS)}", 400)
+    try:
+        limit = max(1, int(request.args.get('limit', 20)))
+    except ValueError:
+        return error_response('limit must be a number', 400)
+
+    totals = REGISTRY.collect()
+    slow = {labels[0]: value for labels, value in totals[SLOW_QUERIES.name].items()}
+    with _captured_lock:
+        captured = {label: dict(entry) for label, entry in _captured.items()}
+    statements = []
+    for (label,), series in totals[QUERY_DURATION.name].items():
+        count = sum(series[:-1])
+        if not count:
+            continue
+        statements.append({
+            'statement': label,
+            'count': count,
+            'total': series[-1],
+            'mean': series[-1] / count,
+            'p95_under': _quantile_bound(series, 0.95),
+            'slow': slow.get(label, 0),
+            'logged_seconds': captured.get(label, {}).get('seconds'),
+            'plan': captured.get(label, {}).get('plan'),
+        })
+    statements.sort(key=lambda entry: entry[sort], reverse=True)
+    return success_response(data={
+        'threshold_ms': THRESHOLD * 1000,
+        'sort': sort,
+        'statements': statements[:limit],
+    })
+
+
+def _quantile_bound(series, fraction):
+    """Upper bound of the histogram bucket holding the given quantile, None if past the last"""
+    target = fraction * sum(series[:-1])
+    cumulative = 0
+    for bound, count in zip(QUERY_DURATION.buckets, series):
+        cumulative += count
+        if cumulative >= target:
+            return bound
+    return None
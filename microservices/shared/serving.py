@@ -0,0 +1,83 @@
+"""
+Shared helpers for running services under a preforking WSGI server
+"""
+import math
+import os
+
+# Set by gunicorn.conf.py: the app is imported once in the master and then
+# forked, so per-process resources must wait for the worker.
+_prefork = False
+_worker_hooks = []
+
+
+def enable_prefork():
+    global _prefork
+    _prefork = True
+
+
+def on_worker_start(fn):
+    """
+    Run `fn` in every process that serves requests.
+
+    Use it for anything that must not cross a fork: background threads,
+    process pools, open sockets. Under the prefork server the call is
+    deferred until each worker has forked; otherwise (the development
+    server, scripts) `fn` runs immediately.
+    """
+    if _prefork:
+        _worker_hooks.append(fn)
+    else:
+        fn()
+    return fn
+
+
+def worker_started():
+    """Called by the server in each freshly forked worker"""
+    for fn in _worker_hooks:
+        fn()
+
+
+def cpu_limit():
+    """
+    CPUs this container may use: CPU_LIMIT_MILLICORES (set from the pod's
+    limits.cpu), else the cgroup quota, else the machine's CPU count.
+    """
+    millicores = os.getenv('CPU_LIMIT_MILLICORES')
+    if millicores:
+        return int(millicores) / 1000
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as f:  # cgroup v2: "<quota> <period>"
+            quota, period = f.read().split()
+        if quota != 'max':
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:  # cgroup v1
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return float(os.cpu_count() or 1)
+
+
+def recommended_workers(cpus=None):
+    """
+    Worker processes for a CPU allowance: one per CPU, rounded up.
+
+    The services spend much of a request in SQLite and in calls to other
+    services, which the threads of each worker overlap. Extra processes on
+    the same CPU only add memory and context switches: with a 0.2-1 CPU
+    limit, 1 or 2 workers serve the same rate and 3 serve fewer
+    (benchmarks/bench_workers.py).
+    """
+    cpus = cpu_limit() if cpus is None else cpus
+    return max(1, math.ceil(cpus))
+
+
+def web_workers():
+    """Worker processes the server runs: WEB_WORKERS, else recommended_workers()"""
+    return int(os.getenv('WEB_WORKERS') or recommended_workers())
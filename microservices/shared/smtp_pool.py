@@ -0,0 +1,158 @@
+import queue
+import smtplib
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+# Errors after which a connection can no longer be trusted. SMTPException is
+# itself an OSError, so OSError cannot be listed here wholesale.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, socket.timeout)
+
+
+class SMTPConnectionPool:
+    """
+    Keeps a small number of authenticated SMTP connections open.
+
+    Connecting, STARTTLS and login are paid once per connection instead of
+    once per message. Connections idle for longer than `keepalive` seconds
+    are checked with NOOP before reuse, connections that have sent
+    `max_messages` messages are recycled, and a message that hits a dropped
+    connection is retried once on a fresh one.
+    """
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '',
+                 size: int = 4, use_tls: bool = True, timeout: float = 30,
+                 keepalive: float = 30, max_messages: int = 500):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.keepalive = keepalive
+        self.max_messages = max_messages
+
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        server._pool_sent = 0
+        server._pool_last_used = time.monotonic()
+        return server
+
+    @staticmethod
+    def _discard(server: Optional[smtplib.SMTP]):
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        try:
+            server = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+        if time.monotonic() - server._pool_last_used > self.keepalive:
+            try:
+                if server.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected('NOOP failed')
+            except CONNECTION_ERRORS:
+                self._discard(server)
+                return self._connect()
+        return server
+
+    def _checkin(self, server: smtplib.SMTP):
+        server._pool_last_used = time.monotonic()
+        if self._closed or server._pool_sent >= self.max_messages:
+            self._discard(server)
+        else:
+            self._idle.put(server)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is dropped instead of returned if it broke"""
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._checkout()
+            yield server
+        except CONNECTION_ERRORS:
+            self._discard(server)
+            server = None
+            raise
+        finally:
+            if server is not None:
+                self._checkin(server)
+            self._slots.release()
+
+    def send_message(self, msg, server: Optional[smtplib.SMTP] = None):
+        """
+        Send one message, on `server` if given (a connection already borrowed
+        through connection()), otherwise on a connection from the pool.
+        """
+        if server is not None:
+            server.send_message(msg)
+            server._pool_sent += 1
+            return
+
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    conn.send_message(msg)
+                    conn._pool_sent += 1
+                return
+            except CONNECTION_ERRORS:
+                if attempt:
+                    raise
+
+    def send_many(self, messages) -> List[bool]:
+        """
+        Send messages back to back over one borrowed connection, moving to a
+        fresh connection if it drops. Returns a success flag per message.
+        """
+        results = []
+        index = 0
+        reconnected = False
+        while index < len(messages):
+            try:
+                with self.connection() as server:
+                    while index < len(messages):
+                        try:
+                            self.send_message(messages[index], server)
+                            results.append(True)
+                            reconnected = False
+                        except CONNECTION_ERRORS:
+                            raise
+                        except Exception as e:
+                            print(f"Email sending failed: {str(e)}")
+                            results.append(False)
+                        index += 1
+            except OSError as e:  # also covers SMTPException raised while connecting
+                # Retry the current message once on a new connection; if that
+                # fails too the server is unreachable, so fail the rest at once.
+                if reconnected:
+                    print(f"Email sending failed for {len(messages) - index} messages: {str(e)}")
+                    results.extend([False] * (len(messages) - index))
+                    return results
+                reconnected = True
+        return results
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,260 @@
+"""
+Request tracing across services
+
+The gateway starts a trace for each request and every hop passes it on in
+a W3C `traceparent` header. Each service records timed spans for the
+request it handles, every SQL statement run through shared.Database and
+every call made with a TracedSession, and appends them as JSON lines to
+TRACE_FILE when the request finishes. Responses carry the trace id as
+X-Request-ID; `python shared/waterfall.py <id>` draws the request.
+
+Tracing is off unless TRACE_FILE is set. Services can share one file on a
+common volume or keep their own; the waterfall tool reads any number of
+files. docker-compose mounts ./traces into every service:
+
+    TRACE_FILE=/app/traces/spans.jsonl docker compose up
+    python shared/waterfall.py --file traces/spans.jsonl <request id>
+
+TRACE_SAMPLE_RATE (default 1) is the share of new traces recorded; a
+service always follows the decision made upstream.
+"""
+import contextvars
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+from metrics import ROUTE_KEY
+
+TRACE_FILE = os.getenv('TRACE_FILE')
+SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 1))
+# Spans kept per request; statements in a long loop beyond this are counted, not stored
+MAX_SPANS = int(os.getenv('TRACE_MAX_SPANS', 1000))
+
+# perf_counter() + _EPOCH is wall-clock time, for lining up spans across services
+_EPOCH = time.time() - time.perf_counter()
+
+# (Trace, span id) of the span code is currently running in
+_current = contextvars.ContextVar('trace_span', default=None)
+
+
+class Trace:
+    """The spans one service records for one request"""
+
+    def __init__(self, trace_id, sampled, service):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.service = service
+        self.spans = []
+        self.dropped = 0
+
+    def add(self, span_id, parent_id, name, kind, started, elapsed, attrs=None):
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append({
+            'trace_id': self.trace_id,
+            'span_id': span_id,
+            'parent_id': parent_id,
+            'service': self.service,
+            'name': name,
+            'kind': kind,
+            'start': round(started + _EPOCH, 6),
+            'duration': round(elapsed, 6),
+            'attrs': attrs or {},
+        })
+
+    def write(self):
+        _append(''.join(json.dumps(span) + '\n' for span in self.spans))
+
+
+def trace_app(app, service):
+    """Record a span for every request `app` handles, if tracing is on"""
+    if TRACE_FILE:
+        app.wsgi_app = TraceRequests(app.wsgi_app, service)
+    return app
+
+
+class TraceRequests:
+    """WSGI middleware that continues or starts a trace for each request"""
+
+    def __init__(self, wsgi_app, service):
+        self.wsgi_app = wsgi_app
+        self.service = service
+
+    def __call__(self, environ, start_response):
+        parent = parse_traceparent(environ.get('HTTP_TRACEPARENT'))
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = _new_id(16), None
+            sampled = random.random() < SAMPLE_RATE
+        trace = Trace(trace_id, sampled, self.service)
+        span_id = _new_id(8)
+        status = []
+
+        def capture(status_line, headers, exc_info=None):
+            status.append(status_line)
+            headers.append(('X-Request-ID', trace_id))
+            return start_response(status_line, headers, exc_info)
+
+        started = time.perf_counter()
+
+        def finish():
+            elapsed = time.perf_counter() - started
+            if sampled:
+                route = environ.get(ROUTE_KEY) or environ.get('PATH_INFO', '')
+                attrs = {'status': int(status[0].split(' ', 1)[0]) if status else 500}
+                if trace.dropped:
+                    attrs['dropped_spans'] = trace.dropped
+                trace.add(span_id, parent_id, f"{environ.get('REQUEST_METHOD', 'GET')} {route}",
+                          'server', started, elapsed, attrs)
+                trace.write()
+
+        token = _current.set((trace, span_id))
+        try:
+            body = self.wsgi_app(environ, capture)
+        except BaseException:
+            finish()
+            raise
+        finally:
+            _current.reset(token)
+        return TracedBody(body, (trace, span_id), finish)
+
+
+class TracedBody:
+    """
+    A response iterable that stays in its request's span.
+
+    Streamed responses (stream_with_context) do their work while the server
+    iterates them, after the WSGI app has returned; each chunk is produced
+    with the request's span current, and the span ends when the server
+    calls close().
+    """
+
+    def __init__(self, body, current, finish):
+        self.body = body
+        self.current = current
+        self.finish = finish
+
+    def __iter__(self):
+        iterator = iter(self.body)
+        while True:
+            token = _current.set(self.current)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _current.reset(token)
+            yield chunk
+
+    def close(self):
+        token = _current.set(self.current)
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            _current.reset(token)
+            self.finish()
+
+
+@contextmanager
+def span(name, kind='internal', **attrs):
+    """
+    Time a block as a child of the current span; work done inside it
+    (queries, calls to other services) nests under it. Yields the span's
+    attributes so the block can add to them, or None when not tracing.
+    """
+    current = _current.get()
+    if current is None or not current[0].sampled:
+        yield None
+        return
+    trace, parent_id = current
+    span_id = _new_id(8)
+    token = _current.set((trace, span_id))
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs['error'] = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        _current.reset(token)
+        trace.add(span_id, parent_id, name, kind, started, time.perf_counter() - started, attrs)
+
+
+def record(name, kind, started, elapsed, attrs=None):
+    """Add an already-timed child span (`started` from perf_counter)"""
+    current = _current.get()
+    if current is not None and current[0].sampled:
+        trace, parent_id = current
+        trace.add(_new_id(8), parent_id, name, kind, started, elapsed, attrs)
+
+
+def traceparent():
+    """Header value that makes the next hop a child of the current span, or None"""
+    current = _current.get()
+    if current is None:
+        return None
+    trace, span_id = current
+    return f"00-{trace.trace_id}-{span_id}-{'01' if trace.sampled else '00'}"
+
+
+def parse_traceparent(value):
+    """(trace id, parent span id, sampled) from a traceparent header, or None"""
+    if not value:
+        return None
+    parts = value.strip().split('-')
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3][:2], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class TracedSession(requests.Session):
+    """
+    requests.Session whose calls pass on the current trace and are
+    recorded as client spans. Outside a traced request it behaves exactly
+    like requests.Session.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        if _current.get() is None:
+            return super().request(method, url, *args, **kwargs)
+        with span(f"{method.upper()} {url.split('?', 1)[0]}", 'client') as attrs:
+            headers = dict(kwargs.pop('headers', None) or {})
+            header = traceparent()
+            if header:
+                headers['traceparent'] = header
+            response = super().request(method, url, *args, headers=headers, **kwargs)
+            if attrs is not None:
+                attrs['status'] = response.status_code
+            return response
+
+
+_file = None
+_file_lock = threading.Lock()
+
+
+def _new_id(size):
+    # The module-level generator is reseeded in forked workers, so ids differ per worker
+    return f'{random.getrandbits(size * 8):0{size * 2}x}'
+
+
+def _append(lines):
+    global _file
+    with _file_lock:
+        if _file is None or _file[0] != os.getpid():
+            # One descriptor per process; O_APPEND keeps each request's lines together
+            _file = (os.getpid(), os.open(TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644))
+        fd = _file[1]
+    os.write(fd, lines.encode())
@@ -0,0 +1,112 @@
+"""
+Draw the spans of one traced request as a waterfall.
+
+    python shared/waterfall.py [--file SPANS ...] REQUEST_ID
+    python shared/waterfall.py [--file SPANS ...] --list [N]
+
+REQUEST_ID is the X-Request-ID a traced service returned (a unique prefix
+is enough). Span files default to $TRACE_FILE. --list shows the N slowest
+requests the files hold, newest first among equals.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+BAR_WIDTH = 40
+
+
+def load(paths):
+    spans = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        try:
+                            spans.append(json.loads(line))
+                        except ValueError:
+                            pass  # a line cut short by a crash
+    return spans
+
+
+def roots(spans):
+    """Spans whose parent was not recorded: the entry point of each request"""
+    ids = {span['span_id'] for span in spans}
+    return [span for span in spans if span['parent_id'] not in ids]
+
+
+def list_traces(spans, count):
+    entries = sorted(roots(spans), key=lambda span: (-span['duration'], -span['start']))
+    for span in entries[:count]:
+        status = span['attrs'].get('status', '')
+        print(f"{span['trace_id']}  {span['duration'] * 1000:9.1f} ms  {status!s:>3}  "
+              f"{span['service']}  {span['name']}")
+
+
+def draw(spans, trace_id):
+    matches = {span['trace_id'] for span in spans if span['trace_id'].startswith(trace_id)}
+    if not matches:
+        sys.exit(f'no spans for request {trace_id}')
+    if len(matches) > 1:
+        sys.exit(f'{trace_id} matches {len(matches)} requests; give more of the id')
+    trace_id = matches.pop()
+    spans = [span for span in spans if span['trace_id'] == trace_id]
+
+    children = {}
+    for span in spans:
+        children.setdefault(span['parent_id'], []).append(span)
+    for siblings in children.values():
+        siblings.sort(key=lambda span: span['start'])
+
+    begin = min(span['start'] for span in spans)
+    end = max(span['start'] + span['duration'] for span in spans)
+    total = max(end - begin, 1e-6)
+    name_width = 60
+
+    print(f"request {trace_id}  {total * 1000:.1f} ms  {len(spans)} spans")
+    print(f"{'start':>9} {'duration':>10}  {'service':<22}{'span':<{name_width}}")
+
+    def walk(span, depth):
+        offset = span['start'] - begin
+        left = int(offset / total * BAR_WIDTH)
+        width = max(1, round(span['duration'] / total * BAR_WIDTH))
+        bar = ' ' * left + '#' * min(width, BAR_WIDTH - left)
+        name = '  ' * depth + span['name']
+        if len(name) > name_width - 1:
+            name = name[:name_width - 4] + '...'
+        notes = ' '.join(f'{key}={value}' for key, value in span['attrs'].items())
+        print(f"{offset * 1000:7.1f}ms {span['duration'] * 1000:8.2f}ms  "
+              f"{span['service']:<22}{name:<{name_width}}|{bar:<{BAR_WIDTH}}| {notes}")
+        for child in children.get(span['span_id'], []):
+            walk(child, depth + 1)
+
+    for span in roots(spans):
+        walk(span, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Draw a traced request as a waterfall')
+    parser.add_argument('request_id', nargs='?', help='X-Request-ID of the request, or a prefix')
+    parser.add_argument('--file', action='append', dest='files',
+                        help='span file or glob; repeatable (default: $TRACE_FILE)')
+    parser.add_argument('--list', nargs='?', const=20, type=int, metavar='N',
+                        help='list the N slowest requests instead')
+    args = parser.parse_args()
+
+    files = args.files or ([os.environ['TRACE_FILE']] if os.getenv('TRACE_FILE') else [])
+    if not files:
+        parser.error('no span files: pass --file or set TRACE_FILE')
+    spans = load(files)
+    if args.list is not None:
+        list_traces(spans, args.list)
+    elif args.request_id:
+        draw(spans, args.request_id)
+    else:
+        parser.error('give a request id or --list')
+
+
+if __name__ == '__main__':
+    main()
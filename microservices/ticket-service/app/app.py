@@ -5,16 +5,21 @@ import sys
 
 # Allow imports from parent folder
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
 
 from models import TicketHistory
 from routes import init_routes
 from db.init_db import init_database
+from metrics import instrument
+from tracing import trace_app
 
 DB_PATH = os.getenv('DB_PATH', os.path.join(os.path.dirname(__file__), '../db/ticket.db'))
 PORT = int(os.getenv('TICKET_SERVICE_PORT', 5004))
 
 app = Flask(__name__)
 CORS(app)
+instrument(app)
+trace_app(app, 'ticket-service')
 
 # Init DB and table
 init_database(DB_PATH)
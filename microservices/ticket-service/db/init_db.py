@@ -1,5 +1,9 @@
 import os
 import sqlite3
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../shared'))
+from database import enable_wal
 
 DB_FILENAME = "ticket.db"
 
@@ -18,6 +22,8 @@ def init_database(db_path=None):
     conn = sqlite3.connect(db_path)
     cur = conn.cursor()
 
+    enable_wal(conn)
+
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS queue_history (
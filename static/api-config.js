@@ -15,15 +15,37 @@ const API = {
     logout: "/auth/logout",
     verify: "/auth/verify",
     profile: "/auth/profile",
+    users: (ids) => `/auth/users?ids=${ids.join(",")}`,
   },
   // Business endpoints
   business: {
     create: "/api/businesses",
     list: "/api/businesses",
+    page: (cursor = null, category = null) => {
+      const params = new URLSearchParams();
+      if (cursor) params.set("cursor", cursor);
+      if (category) params.set("category", category);
+      const query = params.toString();
+      return "/api/businesses" + (query ? `?${query}` : "");
+    },
+    suggest: (q) => `/api/businesses/suggest?q=${encodeURIComponent(q)}`,
+    nearby: (lat, lon, radius = 5) =>
+      `/api/businesses/nearby?lat=${lat}&lon=${lon}&radius=${radius}&include_queues=true`,
     detail: (id) => `/api/businesses/${id}`,
     myBusinesses: "/api/businesses/my-businesses",
     stats: (id) => `/api/businesses/${id}/stats`,
   },
+  // Business pages composed with their queues and live queue sizes
+  directory: {
+    page: (cursor = null, category = null) => {
+      const params = new URLSearchParams();
+      if (cursor) params.set("cursor", cursor);
+      if (category) params.set("category", category);
+      const query = params.toString();
+      return "/api/directory" + (query ? `?${query}` : "");
+    },
+    mine: "/api/directory/mine",
+  },
   // Queue endpoints
   queue: {
     create: "/api/queues",
@@ -41,9 +63,17 @@ const API = {
   },
   // Feedback endpoints
   feedback: {
-    businessFeedback: (businessId) => `/api/feedback/business/${businessId}`,
+    businessFeedback: (businessId, cursor = null) =>
+      `/api/feedback/business/${businessId}` +
+      (cursor ? `?cursor=${encodeURIComponent(cursor)}` : ""),
+    search: (businessId, q, offset = 0) =>
+      `/api/feedback/business/${businessId}/search?q=${encodeURIComponent(q)}&offset=${offset}`,
+    businessExport: (businessId) =>
+      `/api/feedback/business/${businessId}/export`,
     businessAverage: (businessId) =>
       `/api/feedback/business/${businessId}/average`,
+    ratings: (businessIds) =>
+      `/api/feedback/ratings?business_ids=${businessIds.join(",")}`,
   },
 };
 
@@ -11,7 +11,7 @@ async function loadMyBusinesses() {
   const noBusinessesMsg = document.getElementById("noBusinessesMsg");
 
   try {
-    const data = await apiRequest(API.business.myBusinesses, {
+    const data = await apiRequest(API.directory.mine, {
       headers: {
         Authorization: `Bearer ${getToken()}`,
       },
@@ -33,122 +33,200 @@ async function loadMyBusinesses() {
   }
 }
 
-async function renderMyBusinesses(businesses) {
+// Each business arrives with its active queues (API.directory.mine), so the
+// dashboard needs no request per business.
+function renderMyBusinesses(businesses) {
   const container = document.getElementById("businessesContainer");
   container.innerHTML = "";
 
   for (const business of businesses) {
-    // Fetch queues for this business
-    try {
-      const queuesData = await apiRequest(API.queue.businessQueues(business.id));
-      const queues = queuesData.success ? queuesData.data.queues : [];
-
-      const businessCard = document.createElement("div");
-      businessCard.className =
-        "bg-white rounded-xl shadow-md p-6 hover:shadow-lg transition";
-
-      businessCard.innerHTML = `
-        <h2 class="text-xl font-bold text-gray-900 mb-2">${business.name}</h2>
-        <p class="text-gray-600 mb-1">${business.category}</p>
-        <p class="text-sm text-gray-500 mb-4">${business.address}</p>
-
-        <div class="border-t pt-4 mt-4">
-          <div class="flex justify-between items-center mb-3">
-            <h3 class="text-sm font-semibold text-gray-700">Queues:</h3>
-            <button onclick="openCreateQueueModal(${business.id})" 
-                    class="px-3 py-1 text-xs bg-primary text-white rounded-lg hover:bg-accent1 transition">
-              + Create Queue
-            </button>
-          </div>
-          <div id="queues-${business.id}" class="space-y-2 mb-4"></div>
-          <a href="/business/${business.id}/feedback-list"
-             class="block w-full text-center px-4 py-2 bg-accent3 text-white rounded-lg hover:bg-primary transition">
-            View Customer Feedback
-          </a>
+    const queues = business.queues || [];
+    const businessCard = document.createElement("div");
+    businessCard.className =
+      "bg-white rounded-xl shadow-md p-6 hover:shadow-lg transition";
+
+    businessCard.innerHTML = `
+      <h2 class="text-xl font-bold text-gray-900 mb-2">${business.name}</h2>
+      <p class="text-gray-600 mb-1">${business.category}</p>
+      <p class="text-sm text-gray-500 mb-4">${business.address}</p>
+
+      <div class="border-t pt-4 mt-4">
+        <div class="flex justify-between items-center mb-3">
+          <h3 class="text-sm font-semibold text-gray-700">Queues:</h3>
+          <button onclick="openCreateQueueModal(${business.id})" 
+                  class="px-3 py-1 text-xs bg-primary text-white rounded-lg hover:bg-accent1 transition">
+            + Create Queue
+          </button>
         </div>
-      `;
+        <div id="queues-${business.id}" class="space-y-2 mb-4"></div>
+        <a href="/business/${business.id}/feedback-list"
+           class="block w-full text-center px-4 py-2 bg-accent3 text-white rounded-lg hover:bg-primary transition">
+          View Customer Feedback
+        </a>
+      </div>
+    `;
 
-      container.appendChild(businessCard);
-
-      // Render queues
-      const queuesDiv = document.getElementById(`queues-${business.id}`);
-      if (queues.length > 0) {
-        queues.forEach((queue) => {
-          const queueLink = document.createElement("a");
-          queueLink.href = `/business/${business.id}/queue/${queue.id}`;
-          queueLink.className =
-            "block px-4 py-2 bg-gray-100 hover:bg-accent2 hover:text-white rounded-lg transition";
-          queueLink.innerHTML = `
-            ${queue.name}
-            <span class="text-xs">${queue.is_active ? "(Active)" : "(Inactive)"}</span>
-          `;
-          queuesDiv.appendChild(queueLink);
-        });
-      } else {
-        queuesDiv.innerHTML =
-          '<p class="text-sm text-gray-500 italic">No queues available</p>';
-      }
-    } catch (error) {
-      console.error(`Error loading queues for business ${business.id}:`, error);
+    container.appendChild(businessCard);
+
+    // Render queues
+    const queuesDiv = document.getElementById(`queues-${business.id}`);
+    if (queues.length > 0) {
+      queues.forEach((queue) => {
+        const queueLink = document.createElement("a");
+        queueLink.href = `/business/${business.id}/queue/${queue.id}`;
+        queueLink.className =
+          "block px-4 py-2 bg-gray-100 hover:bg-accent2 hover:text-white rounded-lg transition";
+        queueLink.innerHTML = `
+          ${queue.name}
+          <span class="text-xs">${queue.is_active ? "(Active)" : "(Inactive)"}</span>
+          <span class="text-xs float-right">${queue.size} waiting</span>
+        `;
+        queuesDiv.appendChild(queueLink);
+      });
+    } else if (business.queues) {
+      queuesDiv.innerHTML =
+        '<p class="text-sm text-gray-500 italic">No queues available</p>';
+    } else {
+      queuesDiv.innerHTML =
+        '<p class="text-sm text-gray-500 italic">Queues unavailable right now</p>';
     }
   }
 }
 
 // Business List Functions
-async function loadAllBusinesses() {
+let businessesCursor = null;
+let businessesCategory = null;
+let businessesLoading = false;
+let businessesObserver = null;
+
+function renderBusinessCard(business) {
+  return `
+    <div class="bg-white rounded-xl shadow-md p-6 hover:shadow-lg transition">
+      <div class="mb-4">
+        <span class="inline-block px-3 py-1 text-xs font-semibold rounded-full bg-accent2 text-white">
+          ${business.category || "General"}
+        </span>
+      </div>
+      <h2 class="text-xl font-bold text-gray-900 mb-2">${business.name}</h2>
+      <p class="text-gray-600 mb-2">${
+        business.description || "No description available"
+      }</p>
+      <p class="text-sm text-gray-500 mb-4">${business.address || ""}</p>
+      ${
+        business.queues
+          ? `<p class="text-sm text-gray-700">${business.queues.length} open queue${
+              business.queues.length === 1 ? "" : "s"
+            } &middot; ${business.waiting} waiting</p>`
+          : ""
+      }
+
+      <div class="border-t pt-4 mt-4">
+        <a href="/business/${business.id}/queues"
+           class="block w-full text-center px-4 py-2 bg-primary text-white rounded-lg hover:bg-accent1 transition">
+          View Queues
+        </a>
+      </div>
+    </div>
+  `;
+}
+
+// Loads the first page of the directory (optionally for one category) and
+// keeps fetching further pages as the sentinel below the grid scrolls into view.
+async function loadAllBusinesses(category = null) {
+  const container = document.getElementById("businesses-container");
+  businessesCursor = null;
+  businessesCategory = category;
+  container.innerHTML = `
+    <div id="businesses-grid" class="grid gap-6 md:grid-cols-2 lg:grid-cols-3"></div>
+    <div id="businesses-sentinel" class="text-center py-8 text-gray-500"></div>
+  `;
+
+  await loadMoreBusinesses(true);
+
+  if (businessesObserver) businessesObserver.disconnect();
+  businessesObserver = new IntersectionObserver((entries) => {
+    if (entries.some((entry) => entry.isIntersecting)) loadMoreBusinesses();
+  });
+  businessesObserver.observe(document.getElementById("businesses-sentinel"));
+}
+
+async function loadMoreBusinesses(first = false) {
+  if (businessesLoading || (!first && !businessesCursor)) return;
   const container = document.getElementById("businesses-container");
+  const grid = document.getElementById("businesses-grid");
+  const sentinel = document.getElementById("businesses-sentinel");
+  const category = businessesCategory;
+  businessesLoading = true;
+  sentinel.textContent = "Loading businesses...";
 
   try {
-    const result = await apiRequest(API.business.list);
+    const result = await apiRequest(API.directory.page(businessesCursor, category));
+    // A filter change while this page was in flight makes it stale
+    if (category !== businessesCategory) return;
 
-    if (result.success && result.data.businesses && result.data.businesses.length > 0) {
-      const businesses = result.data.businesses;
-      container.innerHTML = `
-        <div class="grid gap-6 md:grid-cols-2 lg:grid-cols-3">
-          ${businesses
-            .map(
-              (business) => `
-            <div class="bg-white rounded-xl shadow-md p-6 hover:shadow-lg transition">
-              <div class="mb-4">
-                <span class="inline-block px-3 py-1 text-xs font-semibold rounded-full bg-accent2 text-white">
-                  ${business.category || "General"}
-                </span>
-              </div>
-              <h2 class="text-xl font-bold text-gray-900 mb-2">${business.name}</h2>
-              <p class="text-gray-600 mb-2">${
-                business.description || "No description available"
-              }</p>
-              <p class="text-sm text-gray-500 mb-4">${business.address || ""}</p>
-
-              <div class="border-t pt-4 mt-4">
-                <a href="/business/${business.id}/queues"
-                   class="block w-full text-center px-4 py-2 bg-primary text-white rounded-lg hover:bg-accent1 transition">
-                  View Queues
-                </a>
-              </div>
-            </div>
-          `
-            )
-            .join("")}
-        </div>
-      `;
-    } else {
+    const businesses = (result.success && result.data.businesses) || [];
+    if (first && businesses.length === 0) {
       container.innerHTML = `
         <div class="text-center py-12">
           <p class="text-gray-500 text-lg">No businesses available yet.</p>
         </div>
       `;
+      return;
     }
+    grid.insertAdjacentHTML("beforeend", businesses.map(renderBusinessCard).join(""));
+    businessesCursor = result.data.next_cursor;
+    sentinel.textContent = "";
+    if (!businessesCursor && businessesObserver) businessesObserver.disconnect();
   } catch (error) {
     console.error("Error loading businesses:", error);
-    container.innerHTML = `
-      <div class="text-center py-12">
-        <p class="text-red-500 text-lg">Error loading businesses. Please try again later.</p>
-      </div>
-    `;
+    if (first) {
+      container.innerHTML = `
+        <div class="text-center py-12">
+          <p class="text-red-500 text-lg">Error loading businesses. Please try again later.</p>
+        </div>
+      `;
+    } else {
+      sentinel.textContent = "Could not load more businesses.";
+    }
+  } finally {
+    businessesLoading = false;
   }
 }
 
+// Autocomplete for the business search box: asks for suggestions as the
+// user types (dropping answers to older keystrokes) and links to each match.
+function initBusinessSearch(input, list) {
+  let latest = 0;
+  input.addEventListener("input", async () => {
+    const q = input.value.trim();
+    const request = ++latest;
+    if (!q) {
+      list.innerHTML = "";
+      list.classList.add("hidden");
+      return;
+    }
+    try {
+      const result = await apiRequest(API.business.suggest(q));
+      if (request !== latest) return;
+      const suggestions = (result.success && result.data.suggestions) || [];
+      list.innerHTML = suggestions
+        .map(
+          (business) => `
+        <a href="/business/${business.id}/queues"
+           class="flex justify-between px-4 py-2 hover:bg-gray-100">
+          <span class="text-gray-900">${business.name}</span>
+          <span class="text-sm text-gray-500">${business.category || ""}</span>
+        </a>
+      `
+        )
+        .join("");
+      list.classList.toggle("hidden", suggestions.length === 0);
+    } catch (error) {
+      console.error("Error loading suggestions:", error);
+    }
+  });
+}
+
 // Business Queues Page Functions
 async function loadBusinessAndQueues(businessId) {
   try {
@@ -0,0 +1,201 @@
+from collections import Counter, defaultdict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class AlertSubscription:
+    def __init__(self, queue_id: Hashable, ticket_id: str, threshold: int,
+                 channels: Iterable[str], contact: Optional[Dict[str, Any]] = None):
+        self.queue_id = queue_id
+        self.ticket_id = ticket_id
+        self.threshold = threshold
+        self.channels = list(channels)
+        self.contact = contact or {}
+        self.position = None
+        self.sent = False
+
+
+def channels_from_flags(ticket: Dict[str, Any]) -> List[str]:
+    """
+    Map ticket-service's alert_email/alert_sms/alert_push flags (a ticket row,
+    or a form posting the same fields) to channel names
+    """
+    return [channel for channel in ('email', 'sms', 'push')
+            if str(ticket.get(f'alert_{channel}') or '').lower() in ('1', 'true', 'on', 'yes')]
+
+
+class _Line:
+    """
+    The tickets of one queue in join order. A Fenwick tree over join
+    sequence numbers counts who is still waiting, so a ticket's position,
+    its removal and the ticket at a given position are all O(log n).
+    Sequence numbers are compacted whenever the tree fills up.
+    """
+
+    def __init__(self):
+        self._seq = {}                    # ticket_id -> sequence number
+        self._reset([])
+
+    def _reset(self, ticket_ids):
+        size = 16
+        while size < 2 * len(ticket_ids) + 1:
+            size *= 2
+        self._size = size
+        self._tickets = [None] + list(ticket_ids) + [None] * (size - len(ticket_ids))
+        self._tree = [0] * (size + 1)
+        for seq in range(1, len(ticket_ids) + 1):
+            self._tree[seq] += 1
+            parent = seq + (seq & -seq)
+            if parent <= size:
+                self._tree[parent] += self._tree[seq]
+        for seq in range(len(ticket_ids) + 1, size + 1):
+            parent = seq + (seq & -seq)
+            if parent <= size:
+                self._tree[parent] += self._tree[seq]
+        self._seq = {ticket_id: seq for seq, ticket_id in enumerate(ticket_ids, start=1)}
+        self._next = len(ticket_ids) + 1
+
+    def __len__(self):
+        return len(self._seq)
+
+    def append(self, ticket_id) -> int:
+        if self._next > self._size:
+            self._reset([t for t in self._tickets[1:] if t is not None])
+        seq = self._next
+        self._next += 1
+        self._seq[ticket_id] = seq
+        self._tickets[seq] = ticket_id
+        self._add(seq, 1)
+        return len(self._seq)
+
+    def position(self, ticket_id) -> Optional[int]:
+        seq = self._seq.get(ticket_id)
+        return None if seq is None else self._prefix(seq)
+
+    def remove(self, ticket_id) -> Optional[int]:
+        """Take a ticket out of the line; returns the position it had"""
+        seq = self._seq.pop(ticket_id, None)
+        if seq is None:
+            return None
+        position = self._prefix(seq)
+        self._tickets[seq] = None
+        self._add(seq, -1)
+        return position
+
+    def at(self, position: int):
+        """Ticket id at a 1-based position"""
+        if not 0 < position <= len(self._seq):
+            return None
+        seq, step = 0, self._size
+        while step:
+            if seq + step <= self._size and self._tree[seq + step] < position:
+                seq += step
+                position -= self._tree[seq]
+            step //= 2
+        return self._tickets[seq + 1]
+
+    def _add(self, seq, amount):
+        while seq <= self._size:
+            self._tree[seq] += amount
+            seq += seq & -seq
+
+    def _prefix(self, seq):
+        total = 0
+        while seq:
+            total += self._tree[seq]
+            seq -= seq & -seq
+        return total
+
+
+class PositionAlertEngine:
+    """
+    Fires "your turn is approaching" alerts the moment a ticket's position
+    reaches its threshold, instead of scanning every ticket on a timer.
+
+    Positions only ever move one step at a time: removing the ticket at
+    position r moves everyone behind it forward by one. A ticket with
+    threshold t therefore crosses it exactly when it moves from t + 1 to t,
+    and after a removal the only candidate for threshold t is whoever now
+    stands at position t (if t >= r). With each queue's line in a Fenwick
+    tree (see _Line) and subscribers counted per threshold, a join costs
+    O(log n) and a serve or cancel O((1 + distinct thresholds) * log n) for
+    a queue of n tickets, independent of how many tickets are subscribed.
+    """
+
+    def __init__(self, send_alert: Callable[[AlertSubscription], None]):
+        self.send_alert = send_alert
+        self._lines = defaultdict(_Line)         # queue_id -> tickets in position order
+        self._subscriptions = defaultdict(dict)  # queue_id -> ticket_id -> subscription
+        self._thresholds = defaultdict(Counter)  # queue_id -> threshold -> pending count
+        self._lock = Lock()
+
+    def ticket_joined(self, queue_id: Hashable, ticket_id: str) -> int:
+        """Append a ticket to the back of a queue; returns its position"""
+        with self._lock:
+            return self._lines[queue_id].append(ticket_id)
+
+    def ticket_left(self, queue_id: Hashable, ticket_id: str) -> List[AlertSubscription]:
+        """Remove a served or cancelled ticket and send the alerts its departure triggered"""
+        with self._lock:
+            position = self._lines[queue_id].remove(ticket_id)
+            if position is None:
+                return []
+            self._drop(queue_id, ticket_id)
+            fired = self._collect_crossings(queue_id, removed_position=position)
+
+        for subscription in fired:
+            self.send_alert(subscription)
+        return fired
+
+    def subscribe(self, queue_id: Hashable, ticket_id: str, threshold: int,
+                  channels: Iterable[str], **contact) -> Optional[AlertSubscription]:
+        """
+        (Re)register alert preferences for a ticket. If the ticket already
+        stands at or inside its threshold the alert is sent right away.
+        Returns the subscription if it fired.
+        """
+        subscription = AlertSubscription(queue_id, ticket_id, threshold, channels, contact)
+        with self._lock:
+            self._drop(queue_id, ticket_id)
+            position = self._lines[queue_id].position(ticket_id)
+            if position is not None and position <= threshold:
+                subscription.sent = True
+                subscription.position = position
+            else:
+                self._thresholds[queue_id][threshold] += 1
+            self._subscriptions[queue_id][ticket_id] = subscription
+
+        if subscription.sent:
+            self.send_alert(subscription)
+            return subscription
+        return None
+
+    def unsubscribe(self, queue_id: Hashable, ticket_id: str):
+        with self._lock:
+            self._drop(queue_id, ticket_id)
+
+    def _drop(self, queue_id, ticket_id):
+        subscription = self._subscriptions[queue_id].pop(ticket_id, None)
+        if subscription is not None and not subscription.sent:
+            self._release_threshold(queue_id, subscription.threshold)
+
+    def _release_threshold(self, queue_id, threshold):
+        counts = self._thresholds[queue_id]
+        counts[threshold] -= 1
+        if counts[threshold] <= 0:
+            del counts[threshold]
+
+    def _collect_crossings(self, queue_id, removed_position):
+        line = self._lines[queue_id]
+        subscriptions = self._subscriptions[queue_id]
+        fired = []
+        for threshold in list(self._thresholds[queue_id]):
+            if threshold < removed_position or threshold > len(line):
+                continue
+            subscription = subscriptions.get(line.at(threshold))
+            if subscription and not subscription.sent and subscription.threshold == threshold:
+                subscription.sent = True
+                subscription.position = threshold
+                self._release_threshold(queue_id, threshold)
+                fired.append(subscription)
+        return fired
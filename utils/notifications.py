@@ -1,7 +1,9 @@
-import smtplib
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Tuple
+
+from microservices.shared.smtp_pool import SMTPConnectionPool
 
 class NotificationManager:
     def __init__(self, email_config: Dict[str, Any] = None):
@@ -9,25 +11,69 @@ class NotificationManager:
             'SMTP_SERVER': os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
             'SMTP_PORT': int(os.getenv('SMTP_PORT', 587)),
             'SMTP_USERNAME': os.getenv('SMTP_USERNAME', ''),
-            'SMTP_PASSWORD': os.getenv('SMTP_PASSWORD', '')
+            'SMTP_PASSWORD': os.getenv('SMTP_PASSWORD', ''),
+            'SMTP_FROM': os.getenv('SMTP_FROM', ''),
+            'SMTP_USE_TLS': os.getenv('SMTP_USE_TLS', 'true').lower() == 'true',
+            'SMTP_POOL_SIZE': int(os.getenv('SMTP_POOL_SIZE', 4)),
+            'SMS_GATEWAY_DOMAIN': os.getenv('SMS_GATEWAY_DOMAIN', '')
         }
+        self.smtp_pool = SMTPConnectionPool(
+            self.email_config['SMTP_SERVER'],
+            self.email_config['SMTP_PORT'],
+            username=self.email_config['SMTP_USERNAME'],
+            password=self.email_config['SMTP_PASSWORD'],
+            size=self.email_config.get('SMTP_POOL_SIZE', 4),
+            use_tls=self.email_config.get('SMTP_USE_TLS', True)
+        )
+
+    def _build_email(self, to_email: str, subject: str, message: str) -> MIMEText:
+        msg = MIMEText(message)
+        msg['Subject'] = subject
+        msg['From'] = self.email_config.get('SMTP_FROM') or self.email_config['SMTP_USERNAME']
+        msg['To'] = to_email
+        return msg
 
     def send_email(self, to_email: str, subject: str, message: str) -> bool:
         try:
-            msg = MIMEText(message)
-            msg['Subject'] = subject
-            msg['From'] = self.email_config['SMTP_USERNAME']
-            msg['To'] = to_email
-
-            with smtplib.SMTP(self.email_config['SMTP_SERVER'], self.email_config['SMTP_PORT']) as server:
-                server.starttls()
-                server.login(self.email_config['SMTP_USERNAME'], self.email_config['SMTP_PASSWORD'])
-                server.send_message(msg)
+            self.smtp_pool.send_message(self._build_email(to_email, subject, message))
             return True
         except Exception as e:
             print(f"Email sending failed: {str(e)}")
             return False
 
+    def send_sms(self, phone: str, message: str) -> bool:
+        """Text a phone number through the carrier's email-to-SMS gateway (SMS_GATEWAY_DOMAIN)"""
+        gateway = self.email_config.get('SMS_GATEWAY_DOMAIN')
+        if not gateway:
+            print("SMS sending failed: SMS_GATEWAY_DOMAIN is not set")
+            return False
+        digits = ''.join(ch for ch in phone if ch.isdigit())
+        return self.send_email(f'{digits}@{gateway}', 'Queue Update', message)
+
+    def send_bulk_email(self, emails: Iterable[Tuple[str, str, str]]) -> List[bool]:
+        """
+        Send many (to_email, subject, message) emails, spread across the pooled
+        connections and sent back to back on each. Returns a flag per email,
+        in input order.
+        """
+        messages = [self._build_email(*email) for email in emails]
+        if not messages:
+            return []
+
+        workers = min(self.smtp_pool.size, len(messages))
+        # Interleave so every connection gets an even share
+        shares = [messages[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            share_results = list(executor.map(self.smtp_pool.send_many, shares))
+
+        results = [False] * len(messages)
+        for i, flags in enumerate(share_results):
+            results[i::workers] = flags
+        return results
+
+    def close(self):
+        self.smtp_pool.close()
+
     def send_browser_notification(self, ticket_data: Dict[str, Any]) -> Dict[str, Any]:
         return {
             'type': 'notification',